@@ -0,0 +1,155 @@
+"""Head-to-head comparison of the eye-detection backends on face crops.
+
+Each backend runs through FaceDetector's own preprocessing (canonical face height, eye size
+bounds). On synthetic crops the true eye positions are known, so the eye hit rate and false
+detections are reported. On recorded crops only eyes per face can be counted.
+
+    python -m benchmarks.eye_backends --output eye_backends.json
+    python -m benchmarks.eye_backends --session sessions/opening
+"""
+import argparse
+import glob
+import os
+import cv2
+from benchmarks.synthetic import eye_boxes, synthetic_frame
+from benchmarks.timing import time_calls, summarize, write_results, print_results
+from src.eye_backends import BACKENDS
+from src.face_detection import FaceDetector
+from src.utils import frameNorm
+
+DEFAULT_FACE_SIZES = [60, 120, 240, 400]
+SEEDS_PER_SIZE = 5
+MARGIN = 20  # Background around each synthetic face
+
+
+def synthetic_crops(face_sizes, seeds=SEEDS_PER_SIZE):
+    """(BGR face crop, true eye boxes in crop coordinates) for synthetic faces of each size."""
+    crops = []
+    for size in face_sizes:
+        for seed in range(seeds):
+            box = (MARGIN, MARGIN, MARGIN + size, MARGIN + size)
+            canvas = synthetic_frame([box], width=size + 2 * MARGIN, height=size + 2 * MARGIN, seed=seed)
+            face = canvas[MARGIN:MARGIN + size, MARGIN:MARGIN + size]
+            truth = [(x1 - MARGIN, y1 - MARGIN, x2 - MARGIN, y2 - MARGIN) for x1, y1, x2, y2 in eye_boxes(box)]
+            crops.append((face, truth))
+    return crops
+
+
+def session_crops(path, limit):
+    """Face crops cut from a recorded session with its recorded detections (no ground truth)."""
+    from src.recording import RecordedSession
+
+    session = RecordedSession(path)
+    crops = []
+    for index in range(len(session)):
+        detections = session.detections(index)
+        if not detections:
+            continue
+        frame = session.frame(index)
+        for detection in detections:
+            x1, y1, x2, y2 = frameNorm(frame, (detection.xmin, detection.ymin, detection.xmax, detection.ymax))
+            if x2 > x1 and y2 > y1:
+                crops.append((frame[y1:y2, x1:x2], None))
+        if len(crops) >= limit:
+            break
+    return crops[:limit]
+
+
+def image_crops(crops_dir):
+    """Face crop images from a directory, at their own size (no ground truth)."""
+    paths = sorted(
+        path for pattern in ("*.png", "*.jpg", "*.jpeg") for path in glob.glob(os.path.join(crops_dir, pattern))
+    )
+    images = [cv2.imread(path) for path in paths]
+    return [(image, None) for image in images if image is not None]
+
+
+def score(found, truth):
+    """(true eyes hit, false detections): an eye is hit when a found box contains its centre."""
+    centers = [((x1 + x2) / 2, (y1 + y2) / 2) for x1, y1, x2, y2 in truth]
+    hit = [False] * len(centers)
+    false_detections = 0
+    for x, y, w, h in found:
+        inside = [i for i, (cx, cy) in enumerate(centers) if x <= cx <= x + w and y <= cy <= y + h]
+        if inside:
+            for i in inside:
+                hit[i] = True
+        else:
+            false_detections += 1
+    return sum(hit), false_detections
+
+
+def bench_backend(name, crops, iterations):
+    try:
+        backend = BACKENDS[name]()
+    except (FileNotFoundError, ValueError, cv2.error) as error:
+        print(f"Skipping {name}: {error}")
+        return {"stage": f"eye_backend[{name}]", "skipped": str(error)}
+
+    detector = FaceDetector(None)
+    detector.eye_backend = backend
+    detect = lambda face: detector._detect_eyes(backend, face)
+
+    samples = []
+    eyes_found = true_eyes = eyes_hit = false_detections = 0
+    for face, truth in crops:
+        # Each backend gets the input it takes in the app: grayscale for the cascades, BGR for the DNN
+        if not backend.color_input:
+            face = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+        samples.extend(time_calls(lambda: detect(face), iterations, warmup=1))
+        found = detect(face)
+        eyes_found += len(found)
+        if truth is not None:
+            hit, false = score(found, truth)
+            true_eyes += len(truth)
+            eyes_hit += hit
+            false_detections += false
+    detector.close()
+
+    result = {
+        "stage": f"eye_backend[{name}]",
+        "faces": len(crops),
+        "relative_cost": backend.cost.relative_cost,
+        "scales_with": backend.cost.scales_with,
+        "eyes_per_face": eyes_found / max(1, len(crops)),
+        **summarize(samples),
+    }
+    if true_eyes:
+        result["hit_rate"] = eyes_hit / true_eyes
+        result["false_per_face"] = false_detections / len(crops)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma-separated backends to compare")
+    parser.add_argument("--face-sizes", default=",".join(map(str, DEFAULT_FACE_SIZES)),
+                        help="synthetic face sizes in pixels")
+    parser.add_argument("--session", help="recorded session to cut face crops from instead of synthetic faces")
+    parser.add_argument("--crops-dir", help="directory of face crop images instead of synthetic faces")
+    parser.add_argument("--max-faces", type=int, default=200, help="max crops taken from a session")
+    parser.add_argument("--iterations", type=int, default=10, help="timed runs per crop")
+    parser.add_argument("--output", default="eye_backends.json", help="machine-readable results file")
+    args = parser.parse_args(argv)
+
+    if args.session:
+        crops, source = session_crops(args.session, args.max_faces), "session"
+    elif args.crops_dir:
+        crops, source = image_crops(args.crops_dir), "crops"
+    else:
+        sizes = [int(size) for size in args.face_sizes.split(",") if size.strip()]
+        crops, source = synthetic_crops(sizes), "synthetic"
+    print(f"{len(crops)} {source} face crops")
+
+    results = [bench_backend(name.strip(), crops, args.iterations) for name in args.backends.split(",") if name.strip()]
+    timed = [result for result in results if "skipped" not in result]
+    print_results(timed)
+    for result in timed:
+        accuracy = f"hit rate {result['hit_rate']:.0%}, {result['false_per_face']:.2f} false/face" if "hit_rate" in result else ""
+        print(f"{result['stage']:<28} {result['eyes_per_face']:.2f} eyes/face {accuracy}")
+    write_results(args.output, results, meta={"source": source, "faces": len(crops), "iterations": args.iterations})
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Offline benchmark of the detection and compositing hot paths.
+
+Runs headless, without a device: frames are synthetic (or loaded from --frames-dir) and NN
+detections are faked. Results go to a JSON file with p50/p95/p99 latency per stage and face count.
+
+    python -m benchmarks.hot_paths --output bench_results.json
+"""
+import argparse
+import itertools
+import numpy as np
+from benchmarks.synthetic import face_boxes, eye_boxes, synthetic_frame, fake_detections, load_frames
+from benchmarks.timing import time_calls, summarize, write_results, print_results
+from src.face_detection import FaceDetector
+from src.display import Display
+from src.compositor import create_compositor
+from src.boxes import EyeBox
+from src.config import GRID_ROWS, GRID_COLS
+
+DEFAULT_FACE_COUNTS = [0, 1, 4, 12, 30]
+DISPLAY_MODES = ["FULL_GRID", "PARSE_MODE_X3", "PARSE_MODE_X2"]
+COMPOSITORS = ["TILES", "REMAP"]
+MOVING_VARIANTS = 8  # Distinct jittered box sets cycled through in the "moving" runs (defeats the map cache)
+
+
+def build_scene(num_faces, frames, seed=0):
+    """(frame, detections, eyes) for a scene with num_faces faces."""
+    boxes = face_boxes(num_faces, seed=seed)
+    if frames:
+        frame = frames[seed % len(frames)].copy()
+    else:
+        frame = synthetic_frame(boxes, seed=seed)
+    eyes = sorted(itertools.chain.from_iterable(eye_boxes(box) for box in boxes), key=lambda eye: eye[0])
+    return frame, fake_detections(boxes), eyes
+
+
+def bench_detection(num_faces, scene, iterations):
+    frame, detections, _ = scene
+    results = []
+
+    detector = FaceDetector(None)
+    samples = time_calls(lambda: detector.process_detections(frame, detections), iterations)
+    results.append({"stage": "process_detections", "faces": num_faces, **summarize(samples)})
+
+    # Cascade on every face every frame (detect-then-track disabled)
+    detector.eye_tracker = None
+    samples = time_calls(lambda: detector.process_detections(frame, detections), iterations)
+    results.append({"stage": "process_detections[cascade_every_frame]", "faces": num_faces, **summarize(samples)})
+
+    detector.close()
+    return results
+
+
+def bench_display(num_faces, scene, iterations):
+    frame, _, eyes = scene
+    results = []
+    display = Display()
+
+    for mode, color, flip in itertools.product(DISPLAY_MODES, (True, False), (False, True)):
+        display.display_mode = mode
+        display.color = color
+        display.vertical_flip = flip
+        display.refresh_render_plan()
+        samples = time_calls(lambda: display.create_output_screen(list(eyes), frame), iterations)
+        stage = f"create_output_screen[{mode},{'color' if color else 'gray'}{',flip' if flip else ''}]"
+        results.append({"stage": stage, "faces": num_faces, **summarize(samples)})
+    return results
+
+
+def jittered_eyes(eyes, variants, seed=0):
+    """variants copies of eyes, each shifted by a few pixels (stable IDs kept)."""
+    rng = np.random.default_rng(seed)
+    result = []
+    for _ in range(variants):
+        shifted = []
+        for eye_id, (x1, y1, x2, y2) in enumerate(eyes):
+            dx, dy = (int(value) for value in rng.integers(-3, 4, size=2))
+            shifted.append(EyeBox((max(0, x1 + dx), max(0, y1 + dy), x2 + dx, y2 + dy), eye_id))
+        result.append(shifted)
+    return result
+
+
+def bench_compositors(num_faces, scene, iterations):
+    """Per-tile vs single-remap compositing, with stable boxes (map cache hits) and moving boxes."""
+    frame, _, eyes = scene
+    if not eyes:
+        return []
+    results = []
+    moving = jittered_eyes(eyes, MOVING_VARIANTS)
+    display = Display()
+
+    for kind, mode in itertools.product(COMPOSITORS, ("FULL_GRID", "PARSE_MODE_X3")):
+        display.compositor = create_compositor(display.width, display.height, GRID_ROWS, GRID_COLS, kind)
+        display.display_mode = mode
+        display.refresh_render_plan()
+
+        samples = time_calls(lambda: display.create_output_screen(list(eyes), frame), iterations)
+        results.append({"stage": f"compose[{kind},{mode},stable]", "faces": num_faces, **summarize(samples)})
+
+        counter = itertools.count()
+        samples = time_calls(lambda: display.create_output_screen(list(moving[next(counter) % MOVING_VARIANTS]), frame), iterations)
+        results.append({"stage": f"compose[{kind},{mode},moving]", "faces": num_faces, **summarize(samples)})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faces", default=",".join(map(str, DEFAULT_FACE_COUNTS)),
+                        help="comma-separated face counts to sweep")
+    parser.add_argument("--iterations", type=int, default=100, help="timed iterations per stage")
+    parser.add_argument("--frames-dir", help="directory of recorded frames to use instead of synthetic ones")
+    parser.add_argument("--output", default="bench_results.json", help="machine-readable results file")
+    args = parser.parse_args(argv)
+
+    face_counts = [int(count) for count in args.faces.split(",") if count.strip()]
+    frames = load_frames(args.frames_dir) if args.frames_dir else []
+
+    results = []
+    for num_faces in face_counts:
+        scene = build_scene(num_faces, frames)
+        results.extend(bench_detection(num_faces, scene, args.iterations))
+        results.extend(bench_display(num_faces, scene, args.iterations))
+        results.extend(bench_compositors(num_faces, scene, args.iterations))
+
+    print_results(results)
+    write_results(args.output, results, meta={"face_counts": face_counts, "iterations": args.iterations,
+                                               "frames": "recorded" if frames else "synthetic"})
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
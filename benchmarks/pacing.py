@@ -0,0 +1,82 @@
+"""Frame pacing on a simulated clock: capture-to-present latency and cadence jitter.
+
+The simulated camera timestamps frames at FPS, with arrival jitter. The simulated host loop
+takes the newest arrived frame, spends a random processing time on it and presents it. The
+same frame stream runs unpaced (MEASURE: presented as soon as ready, latency tracked only)
+and paced (CADENCE). No camera is needed and no real time passes.
+
+    python -m benchmarks.pacing --output pacing.json
+    python -m benchmarks.pacing --work-ms 40 --spike-rate 0.05 --max-latency 0.15
+"""
+import argparse
+import numpy as np
+from benchmarks.timing import write_results
+from src.config import FPS, PACING_MAX_LATENCY
+from src.pacing import FramePacer, SimulatedClock
+
+MODES = ["MEASURE", "CADENCE"]
+
+
+def synthetic_stream(frames, fps, transfer_ms, arrival_jitter_ms, work_ms, work_jitter_ms, spike_rate, spike_ms, seed=0):
+    """Per frame: (capture timestamp, host arrival time, processing seconds)."""
+    rng = np.random.default_rng(seed)
+    captures = np.arange(frames) / fps
+    arrivals = captures + (transfer_ms + np.abs(rng.normal(0, arrival_jitter_ms, frames))) / 1000.0
+    work = np.maximum(0.001, rng.normal(work_ms, work_jitter_ms, frames) / 1000.0)
+    work += (rng.random(frames) < spike_rate) * spike_ms / 1000.0  # Occasional stalls (GC, big crowds)
+    return list(zip(captures, np.maximum.accumulate(arrivals), work))
+
+
+def simulate(stream, mode, fps, max_latency):
+    """Run the host loop over stream with the given pacing mode; return the pacer's statistics."""
+    clock = SimulatedClock(start=stream[0][0])  # Timestamps share the simulated host clock
+    pacer = FramePacer(fps=fps, mode=mode, max_latency=max_latency, history=len(stream),
+                       clock=clock, sleep=clock.sleep)
+    index = 0
+    while index < len(stream):
+        if stream[index][1] > clock():
+            clock.advance(stream[index][1] - clock())  # Idle until the next frame arrives
+        # Like the synchronizer: take the newest frame that has arrived, skip older ones
+        newest = index
+        while newest + 1 < len(stream) and stream[newest + 1][1] <= clock():
+            newest += 1
+        pacer.skip(newest - index)
+        timestamp, _, work = stream[newest]
+        index = newest + 1
+
+        clock.advance(work)
+        if pacer.pace(timestamp):
+            pacer.presented(timestamp)
+    return pacer.get_stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=3000, help="simulated frames")
+    parser.add_argument("--fps", type=float, default=FPS, help="camera rate and presentation cadence")
+    parser.add_argument("--transfer-ms", type=float, default=15.0, help="capture to host arrival")
+    parser.add_argument("--arrival-jitter-ms", type=float, default=5.0)
+    parser.add_argument("--work-ms", type=float, default=30.0, help="mean detection + compositing time per frame")
+    parser.add_argument("--work-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--spike-rate", type=float, default=0.02, help="fraction of frames with a processing stall")
+    parser.add_argument("--spike-ms", type=float, default=120.0, help="length of a stall")
+    parser.add_argument("--max-latency", type=float, default=PACING_MAX_LATENCY, help="CADENCE drop threshold in seconds")
+    parser.add_argument("--output", default="pacing.json", help="machine-readable results file")
+    args = parser.parse_args(argv)
+
+    stream = synthetic_stream(args.frames, args.fps, args.transfer_ms, args.arrival_jitter_ms,
+                              args.work_ms, args.work_jitter_ms, args.spike_rate, args.spike_ms)
+    results = []
+    for mode in MODES:
+        stats = simulate(stream, mode, args.fps, args.max_latency)
+        results.append({"stage": f"pacing[{mode}]", **stats})
+        print(f"{mode:<8} presented={stats['presented']:5d} dropped_late={stats['dropped_late']:4d} "
+              f"superseded={stats['superseded']:4d} latency p50={stats['latency_p50_ms']:6.1f}ms "
+              f"p99={stats['latency_p99_ms']:6.1f}ms | {stats['fps']:5.1f} fps jitter p50={stats['jitter_p50_ms']:5.1f}ms "
+              f"p95={stats['jitter_p95_ms']:5.1f}ms")
+    write_results(args.output, results, meta={key: value for key, value in vars(args).items() if key != "output"})
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Headless soak test: hours of synthetic crowd through detection and compositing.
+
+A synthetic crowd arrives, moves and leaves. Its size follows a triangle sweep from 0 to
+--max-faces and back every --cycle-frames frames. Along the way the 'w' / 'x' / 'c' / 'r'
+keys are pressed through Display's own key handler. Every sweep cycle sees the same load, so
+each cycle is one comparable sample. Per cycle it records frame-time percentiles, RSS, live
+object count and the size of the tracking state. The run fails (exit code 1) when memory
+grows or latency degrades beyond the limits.
+
+    python -m benchmarks.soak --hours 8 --output soak.jsonl
+    python -m benchmarks.soak --cycles 3 --cycle-frames 200     # quick check
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import numpy as np
+from benchmarks.synthetic import draw_face, fake_detections, synthetic_frame
+from benchmarks.timing import summarize
+from src.config import RGB_RESOLUTION
+from src.display import Display
+from src.face_detection import FaceDetector
+from src.render_sink import NullSink, NO_KEY
+
+TOGGLE_KEYS = "wxcr"
+ARRIVALS_PER_FRAME = 2  # A crowd trickles in rather than appearing at once
+
+
+def rss_mb():
+    """Resident set size of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        import resource  # No /proc: fall back to the peak RSS (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+class ScriptedKeySink(NullSink):
+    """NullSink whose poll_key() replays queued key presses."""
+
+    def __init__(self, width=None, height=None):
+        super().__init__(width, height)
+        self.keys = []
+
+    def press(self, key):
+        self.keys.append(ord(key))
+
+    def poll_key(self, delay=1):
+        return self.keys.pop(0) if self.keys else NO_KEY
+
+
+class SyntheticCrowd:
+    """Faces that walk across the frame; step(target) moves them and adds or removes faces toward target."""
+
+    def __init__(self, width=RGB_RESOLUTION[0], height=RGB_RESOLUTION[1], seed=0):
+        self.width = width
+        self.height = height
+        self.rng = np.random.default_rng(seed)
+        self.faces = []  # [x, y, size, vx, vy]
+        self.background = synthetic_frame([], width, height, seed)
+        self.frame = np.empty_like(self.background)
+
+    def _spawn(self):
+        size = int(self.rng.integers(self.height // 12, self.height // 5))
+        x = float(self.rng.integers(0, self.width - size))
+        y = float(self.rng.integers(0, self.height - size))
+        vx, vy = self.rng.normal(0, 4, size=2)
+        self.faces.append([x, y, size, vx, vy])
+
+    def step(self, target):
+        for face in self.faces:
+            face[0] += face[3]
+            face[1] += face[4]
+        # Faces walking out of frame leave; the oldest leave first when the crowd thins out
+        faces = [
+            face for face in self.faces
+            if 0 <= face[0] <= self.width - face[2] and 0 <= face[1] <= self.height - face[2]
+        ]
+        self.faces = faces[max(0, len(faces) - target):]
+        for _ in range(min(ARRIVALS_PER_FRAME, target - len(self.faces))):
+            self._spawn()
+
+        boxes = [(int(x), int(y), int(x) + size, int(y) + size) for x, y, size, _, _ in self.faces]
+        np.copyto(self.frame, self.background)
+        for box in boxes:
+            draw_face(self.frame, box)
+        return self.frame, fake_detections(boxes, self.width, self.height)
+
+
+def sweep_target(frame_index, cycle_frames, max_faces):
+    """Triangle wave: 0 -> max_faces -> 0 once per cycle."""
+    phase = (frame_index % cycle_frames) / cycle_frames
+    return int(round(max_faces * (1 - abs(2 * phase - 1))))
+
+
+def state_sizes(detector, display):
+    """Sizes of the long-lived tracking structures suspected of growing."""
+    tracker = detector.eye_tracker
+    return {
+        "tracked_eyes": len(display.tracked_eyes),
+        "grid_positions": sum(len(data.get("grid_positions", {})) for data in display.tracked_eyes.values()),
+        "display_next_eye_id": display.next_eye_id,
+        "tracker_faces": len(tracker.faces) if tracker is not None else 0,
+        "tracker_next_eye_id": tracker.next_eye_id if tracker is not None else 0,
+        "previous_eyes": len(detector.previous_eyes),
+    }
+
+
+def check_limits(cycles, baseline, args, slow_streak):
+    """Failure messages for the latest cycle compared with the baseline cycle."""
+    latest = cycles[-1]
+    failures = []
+    rss_growth = latest["rss_mb"] - baseline["rss_mb"]
+    if rss_growth > args.max_rss_growth_mb:
+        failures.append(f"RSS grew {rss_growth:.1f} MB (limit {args.max_rss_growth_mb} MB)")
+    object_growth = latest["objects"] / max(1, baseline["objects"]) - 1
+    if object_growth > args.max_object_growth:
+        failures.append(f"live objects grew {object_growth:.1%} (limit {args.max_object_growth:.0%})")
+    if slow_streak >= args.patience:
+        ratio = latest["frame"]["p95_ms"] / baseline["frame"]["p95_ms"]
+        failures.append(f"frame p95 {ratio:.2f}x the baseline for {slow_streak} cycles (limit {args.max_latency_ratio}x)")
+    return failures
+
+
+def run_cycle(crowd, detector, display, sink, start_frame, args):
+    detect_samples, compose_samples, frame_samples, face_counts = [], [], [], []
+    for frame_index in range(start_frame, start_frame + args.cycle_frames):
+        frame, detections = crowd.step(sweep_target(frame_index, args.cycle_frames, args.max_faces))
+        if frame_index % args.key_interval == args.key_interval - 1:
+            sink.press(TOGGLE_KEYS[crowd.rng.integers(len(TOGGLE_KEYS))])
+
+        start = time.perf_counter()
+        eyes = detector.process_detections(frame, detections)
+        eyes.sort(key=lambda eye: eye[0])
+        detected = time.perf_counter()
+        display.create_output_screen(eyes, frame)
+        composed = time.perf_counter()
+        display.check_keyboard_interaction(None)
+
+        detect_samples.append(detected - start)
+        compose_samples.append(composed - detected)
+        frame_samples.append(composed - start)
+        face_counts.append(len(detections))
+
+    gc.collect()
+    return {
+        "faces_mean": round(float(np.mean(face_counts)), 2),
+        "faces_max": int(max(face_counts)),
+        "detect": summarize(detect_samples),
+        "compose": summarize(compose_samples),
+        "frame": summarize(frame_samples),
+        "rss_mb": round(rss_mb(), 2),
+        "objects": len(gc.get_objects()),
+        **state_sizes(detector, display),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, default=1.0, help="how long to run")
+    parser.add_argument("--cycles", type=int, help="stop after this many sweep cycles instead")
+    parser.add_argument("--cycle-frames", type=int, default=1200, help="frames per 0 -> max -> 0 sweep")
+    parser.add_argument("--max-faces", type=int, default=40, help="crowd size at the top of the sweep")
+    parser.add_argument("--key-interval", type=int, default=150, help="frames between simulated key presses")
+    parser.add_argument("--warmup-cycles", type=int, default=1, help="cycles before the baseline is taken")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=64.0, help="allowed RSS growth over the baseline")
+    parser.add_argument("--max-object-growth", type=float, default=0.05, help="allowed live-object growth (fraction)")
+    parser.add_argument("--max-latency-ratio", type=float, default=1.5, help="allowed frame p95 relative to the baseline")
+    parser.add_argument("--patience", type=int, default=3, help="consecutive slow cycles before latency fails")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="soak.jsonl", help="one JSON line per cycle")
+    args = parser.parse_args(argv)
+
+    crowd = SyntheticCrowd(seed=args.seed)
+    detector = FaceDetector(None)
+    display = Display()
+    sink = display.sink = ScriptedKeySink()
+
+    deadline = time.time() + args.hours * 3600
+    cycles = []
+    baseline = None
+    slow_streak = 0
+    failures = []
+    with open(args.output, "w") as log:
+        while time.time() < deadline and (args.cycles is None or len(cycles) < args.cycles):
+            result = run_cycle(crowd, detector, display, sink, len(cycles) * args.cycle_frames, args)
+            result["cycle"] = len(cycles)
+            result["elapsed_s"] = round(time.time() - deadline + args.hours * 3600, 1)
+            cycles.append(result)
+
+            if len(cycles) == args.warmup_cycles + 1:
+                baseline = result
+            elif baseline is not None:
+                slow = result["frame"]["p95_ms"] > baseline["frame"]["p95_ms"] * args.max_latency_ratio
+                slow_streak = slow_streak + 1 if slow else 0
+                failures = check_limits(cycles, baseline, args, slow_streak)
+            result["failures"] = failures
+
+            log.write(json.dumps(result) + "\n")
+            log.flush()
+            print(f"[soak] cycle {result['cycle']} frame p50={result['frame']['p50_ms']:.2f}ms "
+                  f"p95={result['frame']['p95_ms']:.2f}ms p99={result['frame']['p99_ms']:.2f}ms "
+                  f"rss={result['rss_mb']:.1f}MB objects={result['objects']} "
+                  f"tracked_eyes={result['tracked_eyes']} next_eye_id={result['display_next_eye_id']}/"
+                  f"{result['tracker_next_eye_id']}")
+            if failures:
+                break
+
+    detector.close()
+    display.destroy_all_windows()
+    print(f"Results written to {args.output}")
+    if failures:
+        print("[soak] FAILED: " + "; ".join(failures))
+        return 1
+    print(f"[soak] passed {len(cycles)} cycles")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Synthetic 1440p frames, faces and detections for running the hot paths without a camera."""
+import glob
+import os
+import cv2
+import numpy as np
+from src.config import RGB_RESOLUTION
+
+
+class FakeDetection:
+    """Stand-in for a DepthAI ImgDetection: normalised face box plus label/confidence."""
+
+    def __init__(self, xmin, ymin, xmax, ymax, confidence=1.0, label=1):
+        self.xmin = xmin
+        self.ymin = ymin
+        self.xmax = xmax
+        self.ymax = ymax
+        self.confidence = confidence
+        self.label = label
+
+
+def face_boxes(num_faces, width=RGB_RESOLUTION[0], height=RGB_RESOLUTION[1], seed=0):
+    """Pixel face boxes (x1, y1, x2, y2) spread over the frame on a jittered grid, sized like a crowd."""
+    if num_faces == 0:
+        return []
+    rng = np.random.default_rng(seed)
+    cols = int(np.ceil(np.sqrt(num_faces * width / height)))
+    rows = int(np.ceil(num_faces / cols))
+    cell_w, cell_h = width // cols, height // rows
+    size = int(min(cell_w, cell_h) * 0.7)
+
+    boxes = []
+    for i in range(num_faces):
+        row, col = divmod(i, cols)
+        x1 = col * cell_w + int(rng.integers(0, max(1, cell_w - size)))
+        y1 = row * cell_h + int(rng.integers(0, max(1, cell_h - size)))
+        boxes.append((x1, y1, x1 + size, y1 + size))
+    return boxes
+
+
+def eye_boxes(face_box):
+    """The two eye boxes (x1, y1, x2, y2) drawn for a synthetic face."""
+    x1, y1, x2, y2 = face_box
+    size = x2 - x1
+    eye_w, eye_h = int(size * 0.22), int(size * 0.14)
+    eye_y = y1 + int(size * 0.32)
+    return [
+        (x1 + int(size * 0.18), eye_y, x1 + int(size * 0.18) + eye_w, eye_y + eye_h),
+        (x1 + int(size * 0.60), eye_y, x1 + int(size * 0.60) + eye_w, eye_y + eye_h),
+    ]
+
+
+def draw_face(frame, face_box):
+    """Draw a crude face with two eyes, enough texture for the eye cascade to have something to chew on."""
+    x1, y1, x2, y2 = face_box
+    center = ((x1 + x2) // 2, (y1 + y2) // 2)
+    axes = ((x2 - x1) // 2, (y2 - y1) // 2)
+    cv2.ellipse(frame, center, axes, 0, 0, 360, (140, 170, 210), -1)
+    for ex1, ey1, ex2, ey2 in eye_boxes(face_box):
+        eye_center = ((ex1 + ex2) // 2, (ey1 + ey2) // 2)
+        cv2.ellipse(frame, eye_center, ((ex2 - ex1) // 2, (ey2 - ey1) // 2), 0, 0, 360, (245, 245, 245), -1)
+        cv2.circle(frame, eye_center, max(2, (ey2 - ey1) // 2), (60, 40, 30), -1)
+        cv2.circle(frame, eye_center, max(1, (ey2 - ey1) // 5), (0, 0, 0), -1)
+        cv2.line(frame, (ex1, ey1 - (ey2 - ey1) // 2), (ex2, ey1 - (ey2 - ey1) // 2), (40, 40, 60), 3)
+
+
+def synthetic_frame(boxes, width=RGB_RESOLUTION[0], height=RGB_RESOLUTION[1], seed=0):
+    """A noisy 1440p background with a synthetic face drawn in each box."""
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(60, 120, (height, width, 3), dtype=np.uint8)
+    frame = cv2.GaussianBlur(frame, (5, 5), 0)
+    for box in boxes:
+        draw_face(frame, box)
+    return frame
+
+
+def fake_detections(boxes, width=RGB_RESOLUTION[0], height=RGB_RESOLUTION[1]):
+    return [FakeDetection(x1 / width, y1 / height, x2 / width, y2 / height) for (x1, y1, x2, y2) in boxes]
+
+
+def load_frames(frames_dir, width=RGB_RESOLUTION[0], height=RGB_RESOLUTION[1]):
+    """Recorded frames (png/jpg) from a directory, resized to the working resolution."""
+    paths = sorted(
+        path for pattern in ("*.png", "*.jpg", "*.jpeg") for path in glob.glob(os.path.join(frames_dir, pattern))
+    )
+    frames = []
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is not None:
+            frames.append(cv2.resize(frame, (width, height)) if frame.shape[:2] != (height, width) else frame)
+    return frames
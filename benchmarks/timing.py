@@ -0,0 +1,54 @@
+"""Timing helpers shared by the benchmark scripts."""
+import json
+import platform
+import time
+import cv2
+import numpy as np
+
+
+def time_calls(func, iterations, warmup=3):
+    """Call func() warmup + iterations times and return the timed durations in seconds."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples):
+    """p50/p95/p99/mean latency in milliseconds."""
+    ms = np.asarray(samples, dtype=np.float64) * 1000.0
+    if ms.size == 0:
+        return {"iterations": 0}
+    return {
+        "iterations": int(ms.size),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "mean_ms": round(float(ms.mean()), 4),
+    }
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "opencv_threads": cv2.getNumThreads(),
+    }
+
+
+def write_results(path, results, meta=None):
+    report = {"environment": environment(), "meta": meta or {}, "results": results}
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def print_results(results):
+    for result in results:
+        label = result["stage"] + (f" faces={result['faces']}" if "faces" in result else "")
+        print(f"{label:60s} p50={result.get('p50_ms', 0):9.3f}ms p95={result.get('p95_ms', 0):9.3f}ms p99={result.get('p99_ms', 0):9.3f}ms")
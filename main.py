@@ -1,49 +1,254 @@
+import argparse
+import contextlib
+import signal
+import sys
+import time
 import depthai as dai
 from src.face_detection import FaceDetector
 from src.display import Display  # , DebugDisplay
 from src.performance_monitor import PerformanceMonitor
-from src.config import DEBUG_MODE
+from src.pipeline import ThreadedPipeline
+from src.sync import MessageWaiter
+from src.telemetry import TelemetrySampler, TelemetryHttpServer, stage_timer
+from src.recording import SessionRecorder, ReplaySource
+from src.multi_source import InputSource, MultiSourceRunner
+from src.quality import QualityController
+from src.pacing import FramePacer
+from src.config import DEBUG_MODE, PIPELINE_MODE, TELEMETRY_ENABLED, TELEMETRY_HTTP_PORT, QUALITY_ADAPTIVE, EVENT_WAIT_TIMEOUT, PACING_MODE
 
-def main():
-    pipeline = dai.Pipeline()
-    detector = FaceDetector(pipeline)
-    display = Display()
-    # debug_display = DebugDisplay(fps=5) if DEBUG_MODE else None
-    performance_monitor = PerformanceMonitor(pipeline)
 
-    with dai.Device(pipeline) as device:
-        q_rgb = device.getOutputQueue("rgb")
-        q_nn = device.getOutputQueue("nn")
-        system_queue = device.getOutputQueue("system_logger")
+def run_serial(detector, display, q_rgb, q_nn, telemetry=None, recorder=None, quality=None, pacer=None, replay=None):
+    waiter = MessageWaiter([q_rgb, q_nn])
+    while True:
+        packet = detector.read(q_rgb, q_nn)
+
+        if packet is None:
+            if replay is not None and replay.finished:
+                break  # Replay without --loop ran out
+            # Sleep until the device delivers something; on an idle timeout still poll the keyboard once
+            if not waiter.wait(EVENT_WAIT_TIMEOUT):
+                display.check_keyboard_interaction(None)
+        else:
+            frame_start = time.perf_counter()
+            if recorder is not None:
+                recorder.record_packet(packet)
 
-        while True:
-            frame = detector.get_frame(q_rgb)
-            detections = detector.get_detections(q_nn)
+            frame = packet.frame
+            with stage_timer(telemetry, "stage_detect"):
+                eyes_bounding_boxes = detector.process_detections(frame, packet.detections, packet.sequence)
 
-            if frame is not None:
-                eyes_bounding_boxes = detector.process_detections(frame, detections)
-                
                 # Sort eyes left to right to avoid duplication issues
                 eyes_bounding_boxes.sort(key=lambda eye: eye[0])
 
+            if replay is not None:
+                # Key presses recorded at this frame change the mode it is composed in
+                for key in replay.events_for(packet.sequence):
+                    display.handle_key(key)
+
+            with stage_timer(telemetry, "stage_composite"):
                 output_screen = display.create_output_screen(eyes_bounding_boxes, frame)
 
-                # Get performance data (but don't display it to reduce compute)
-                # perf_data = performance_monitor.get_performance_data(system_queue)
-                
-                display.show_output_screen(output_screen)
+            # Get performance data (but don't display it to reduce compute)
+            # perf_data = performance_monitor.get_performance_data(system_queue)
+
+            busy_time = time.perf_counter() - frame_start
+            # Wait for this frame's slot in the FPS cadence, or drop it if it would be shown too late
+            if pacer is None or pacer.pace(packet.timestamp):
+                present_start = time.perf_counter()
+                with stage_timer(telemetry, "stage_present"):
+                    display.show_output_screen(output_screen)
+                busy_time += time.perf_counter() - present_start
+                if pacer is not None:
+                    pacer.presented(packet.timestamp)
+                if telemetry is not None:
+                    telemetry.count("frames_presented")
+                    if pacer is not None and pacer.last_latency is not None:
+                        telemetry.record_timing("capture_to_present", pacer.last_latency)
+            if quality is not None:
+                quality.observe(busy_time)  # Pacing waits are not work
+
+            # Debug display commented out to reduce compute load
+            # if debug_display:
+            #     debug_screen = debug_display.create_debug_screen(frame, eyes_bounding_boxes)
+            #     debug_display.overlay_performance_data(debug_screen, perf_data)
+            #     debug_display.show_debug_screen(debug_screen)
+
+            # Handle keyboard interactions (fullscreen toggle, color mode, save screenshot) - one poll per frame
+            display.check_keyboard_interaction(output_screen)
+            display.release_output_screen(output_screen)  # Shown or dropped; 's' has copied it
+
+        if display.check_exit_condition():
+            break
+
+
+def run_threaded(detector, display, q_rgb, q_nn, telemetry=None, recorder=None, quality=None, pacer=None, replay=None):
+    pipeline = ThreadedPipeline(detector, display, q_rgb, q_nn, telemetry, recorder, quality, pacer, replay)
+    pipeline.run()
+    print(pipeline.format_stats())
+
+
+def run(detector, display, q_rgb, q_nn, telemetry=None, recorder=None, replay=None):
+    # Adaptive quality: degrade cascade / compositing settings when frames exceed the FPS budget
+    quality = QualityController(detector, display) if QUALITY_ADAPTIVE else None
+    if quality is not None and telemetry is not None:
+        telemetry.add_gauge("quality_level", lambda: quality.level)
+    # Frame pacing: fixed FPS cadence, late frames dropped, capture-to-present latency tracked
+    pacer = FramePacer() if PACING_MODE != "OFF" else None
+    if pacer is not None and telemetry is not None:
+        telemetry.add_gauge("pacing_dropped_late", lambda: pacer.dropped_late)
+        telemetry.add_gauge("pacing_superseded", lambda: pacer.superseded)
+    if PIPELINE_MODE == "THREADED":
+        run_threaded(detector, display, q_rgb, q_nn, telemetry, recorder, quality, pacer, replay)
+    else:
+        run_serial(detector, display, q_rgb, q_nn, telemetry, recorder, quality, pacer, replay)
+    if pacer is not None:
+        print(pacer.format_stats())
+
+
+def run_multi_source(sources, display, telemetry=None):
+    runner = MultiSourceRunner(sources, display, telemetry)
+    runner.run()
+    print(runner.format_stats())
+
+
+def start_telemetry(performance_monitor, system_queue, detector=None):
+    """Start the background telemetry sampler (and its HTTP endpoint, if configured)."""
+    telemetry = TelemetrySampler(performance_monitor, system_queue)
+    if detector is not None and detector.synchronizer is not None:
+        telemetry.add_gauge("sync_frames_dropped", lambda: detector.synchronizer.dropped)
+        telemetry.add_gauge("sync_frames_unmatched", lambda: detector.synchronizer.unmatched)
+    if detector is not None and detector.eye_cropper is not None:
+        telemetry.add_gauge("eye_crops_received", lambda: detector.eye_cropper.received)
+        telemetry.add_gauge("eye_crops_fallbacks", lambda: detector.eye_cropper.fallbacks)
+    telemetry.start()
+
+    http_server = None
+    if TELEMETRY_HTTP_PORT is not None:
+        try:
+            http_server = TelemetryHttpServer(telemetry)
+        except OSError as e:
+            # Port taken (e.g. a second instance) or not allowed: run on without the endpoint
+            print(f"Telemetry endpoint disabled: cannot listen on port {TELEMETRY_HTTP_PORT}: {e}")
+        else:
+            http_server.start()
+            print(f"Telemetry at http://127.0.0.1:{TELEMETRY_HTTP_PORT}/metrics")
+    return telemetry, http_server
+
+
+def stop_telemetry(telemetry, http_server):
+    if http_server is not None:
+        http_server.stop()
+    if telemetry is not None:
+        telemetry.stop()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Watching You Looking at Everything but Me")
+    parser.add_argument("--record", metavar="DIR", help="record frames, detections and key presses to a session directory")
+    parser.add_argument("--replay", metavar="DIR", action="append",
+                        help="replay a recorded session instead of using the camera (repeat for several sources)")
+    parser.add_argument("--all-devices", action="store_true", help="use every connected camera, merged onto one wall")
+    parser.add_argument("--realtime", action="store_true", help="replay at the original timing instead of as fast as possible")
+    parser.add_argument("--loop", action="store_true", help="loop the replayed session")
+    args = parser.parse_args(argv)
+    if args.record and (args.all_devices or (args.replay and len(args.replay) > 1)):
+        parser.error("--record needs a single source")
+    return args
+
+
+def open_devices(stack):
+    """One InputSource per connected camera, each with its own pipeline and FaceDetector."""
+    sources = []
+    for device_info in dai.Device.getAllAvailableDevices():
+        pipeline = dai.Pipeline()
+        detector = FaceDetector(pipeline)
+        device = stack.enter_context(dai.Device(pipeline, device_info))
+        detector.connect(device)
+        sources.append(InputSource(device_info.getMxId(), detector, device.getOutputQueue("rgb"), device.getOutputQueue("nn")))
+        print(f"Opened camera {device_info.getMxId()}")
+    return sources
+
+
+def main_multi_source(args, display):
+    detectors = []
+    with contextlib.ExitStack() as stack:
+        if args.all_devices:
+            sources = open_devices(stack)
+        else:
+            sources = []
+            for index, path in enumerate(args.replay):
+                replay = ReplaySource(path, realtime=args.realtime, loop=args.loop)
+                sources.append(InputSource(f"replay{index}", FaceDetector(None), replay.q_rgb, replay.q_nn, replay))
+        detectors = [source.detector for source in sources]
+
+        telemetry, http_server = start_telemetry(None, None) if TELEMETRY_ENABLED else (None, None)
+        run_multi_source(sources, display, telemetry)
+        stop_telemetry(telemetry, http_server)
+
+    display.destroy_all_windows()
+    for detector in detectors:
+        detector.close()
+
+
+def main_single_source(args, display):
+    # debug_display = DebugDisplay(fps=5) if DEBUG_MODE else None
+    recorder = SessionRecorder(args.record) if args.record else None
+    if recorder is not None:
+        display.key_callback = recorder.record_event
+
+    if args.replay:
+        # No device: the replay source stands in for the "rgb" and "nn" queues
+        detector = FaceDetector(None)
+        source = ReplaySource(args.replay[0], realtime=args.realtime, loop=args.loop)
+        telemetry, http_server = start_telemetry(None, None, detector) if TELEMETRY_ENABLED else (None, None)
+        run(detector, display, source.q_rgb, source.q_nn, telemetry, recorder, source)
+        stop_telemetry(telemetry, http_server)
+    else:
+        pipeline = dai.Pipeline()
+        detector = FaceDetector(pipeline)
+        performance_monitor = PerformanceMonitor(pipeline)
+
+        with dai.Device(pipeline) as device:
+            detector.connect(device)
+            q_rgb = device.getOutputQueue("rgb")
+            q_nn = device.getOutputQueue("nn")
+            system_queue = device.getOutputQueue("system_logger")
+
+            telemetry, http_server = start_telemetry(performance_monitor, system_queue, detector) if TELEMETRY_ENABLED else (None, None)
+            run(detector, display, q_rgb, q_nn, telemetry, recorder)
+            stop_telemetry(telemetry, http_server)
+
+    if recorder is not None:
+        recorder.close()
+    display.destroy_all_windows()
+    detector.close()
+
+
+def request_exit(display):
+    """SIGINT handler. The headless sinks (RAW_VIDEO, NULL) have no 'q' key, so Ctrl-C is their way out."""
+    if display.exit_requested:
+        raise KeyboardInterrupt  # Second Ctrl-C: stop at once
+    print("Stopping after the current frame (Ctrl-C again to abort)")
+    display.exit_requested = True
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    display = Display()
+    if hasattr(signal, "SIGUSR1"):
+        # `kill -USR1 <pid>` profiles the next PROFILE_FRAMES frames, like the 'p' key
+        signal.signal(signal.SIGUSR1, display.profiler.request)
+    # Ctrl-C ends the loop after the current frame, so recordings and raw video are flushed and closed
+    signal.signal(signal.SIGINT, lambda signum, frame: request_exit(display))
 
-                # Debug display commented out to reduce compute load
-                # if debug_display:
-                #     debug_screen = debug_display.create_debug_screen(frame, eyes_bounding_boxes)
-                #     debug_display.overlay_performance_data(debug_screen, perf_data)
-                #     debug_display.show_debug_screen(debug_screen)
+    # RAW_VIDEO to stdout: console messages go to stderr, out of the video stream
+    uses_stdout = getattr(display.sink, "uses_stdout", False)
+    with contextlib.redirect_stdout(sys.stderr) if uses_stdout else contextlib.nullcontext():
+        if args.all_devices or (args.replay and len(args.replay) > 1):
+            main_multi_source(args, display)
+        else:
+            main_single_source(args, display)
 
-                # Handle keyboard interactions (fullscreen toggle, color mode, save screenshot)
-                display.check_keyboard_interaction(output_screen)
 
-            if display.check_exit_condition():
-                break
-            
 if __name__ == "__main__":
     main()
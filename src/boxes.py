@@ -0,0 +1,145 @@
+import numpy as np
+
+
+class EyeBox(tuple):
+    """(x1, y1, x2, y2) eye box that also carries the detector's stable track ID (None if untracked).
+
+    In multi-source mode it is also tagged with its source and carries its own crop (image),
+    since eyes from different cameras do not share a frame. In PREVIEW_CROPS mode the image is
+    the full-resolution crop cut on the device.
+    """
+
+    def __new__(cls, bbox, eye_id=None, source=None, image=None):
+        box = super().__new__(cls, bbox)
+        box.eye_id = eye_id
+        box.source = source
+        box.image = image
+        return box
+
+
+def as_boxes(boxes):
+    """Convert a sequence of (x1, y1, x2, y2) boxes into an (N, 4) float array."""
+    return np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+
+def box_areas(boxes):
+    boxes = as_boxes(boxes)
+    return np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+
+
+def intersection_matrix(boxes_a, boxes_b):
+    """(N, M) matrix of intersection areas between every box in boxes_a and every box in boxes_b."""
+    a = as_boxes(boxes_a)[:, None, :]
+    b = as_boxes(boxes_b)[None, :, :]
+    width = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    height = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    return width * height
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """(N, M) intersection-over-union matrix."""
+    intersection = intersection_matrix(boxes_a, boxes_b)
+    union = box_areas(boxes_a)[:, None] + box_areas(boxes_b)[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def intersection_over_min_matrix(boxes_a, boxes_b):
+    """(N, M) matrix of intersection divided by the smaller of the two box areas."""
+    intersection = intersection_matrix(boxes_a, boxes_b)
+    min_area = np.minimum(box_areas(boxes_a)[:, None], box_areas(boxes_b)[None, :])
+    return np.divide(intersection, min_area, out=np.zeros_like(intersection), where=min_area > 0)
+
+
+def linear_assignment(cost):
+    """Minimum-cost assignment of rows to columns (Hungarian algorithm, shortest augmenting path).
+
+    Works on rectangular matrices; every row of the smaller side gets exactly one partner.
+    Returns (row_indices, col_indices) sorted by row.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+
+    # 1-based potentials and matching as in the classic formulation; column 0 is a virtual start
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=int)  # p[j] = row matched to column j (0 = unmatched)
+    way = np.zeros(m + 1, dtype=int)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free_cols = np.flatnonzero(~used[1:]) + 1
+            reduced = cost[i0 - 1, free_cols - 1] - u[i0] - v[free_cols]
+            better = reduced < minv[free_cols]
+            minv[free_cols[better]] = reduced[better]
+            way[free_cols[better]] = j0
+
+            j1 = free_cols[np.argmin(minv[free_cols])]
+            delta = minv[j1]
+            used_cols = np.flatnonzero(used)
+            u[p[used_cols]] += delta
+            v[used_cols] -= delta
+            minv[free_cols] -= delta
+
+            j0 = j1
+            if p[j0] == 0:
+                break
+
+        # Flip the augmenting path
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    cols = np.flatnonzero(p[1:])
+    rows = p[cols + 1] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def match_boxes(boxes_a, boxes_b, threshold, overlap=intersection_over_min_matrix):
+    """Optimally pair boxes_a with boxes_b, keeping only pairs whose overlap exceeds threshold.
+
+    Returns a list of (index_a, index_b) pairs.
+    """
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return []
+    overlaps = overlap(boxes_a, boxes_b)
+    rows, cols = linear_assignment(1.0 - overlaps)
+    keep = overlaps[rows, cols] > threshold
+    return list(zip(rows[keep].tolist(), cols[keep].tolist()))
+
+
+def non_max_suppression(boxes, threshold, scores=None, overlap=iou_matrix):
+    """Indices of boxes kept after greedy non-maximum suppression.
+
+    Without scores, larger boxes win. Kept indices are returned in their original order.
+    """
+    boxes = as_boxes(boxes)
+    if len(boxes) == 0:
+        return []
+    scores = box_areas(boxes) if scores is None else np.asarray(scores, dtype=np.float64)
+
+    overlaps = overlap(boxes, boxes)
+    order = np.argsort(-scores, kind="stable")
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    keep = []
+    for index in order:
+        if suppressed[index]:
+            continue
+        keep.append(index)
+        suppressed |= overlaps[index] > threshold
+    return sorted(int(index) for index in keep)
@@ -0,0 +1,231 @@
+import threading
+from collections import OrderedDict, deque
+import cv2
+import numpy as np
+from src.config import OUTPUT_BUFFER_COUNT, COMPOSITOR, REMAP_CACHE_SIZE
+
+
+class GridCompositor:
+    """Draws eye crops into a small pool of persistent output buffers.
+
+    A buffer handed out by next_buffer() stays leased until release() is called with it, after
+    it has been shown or dropped, so a screen still waiting to be presented is never drawn over.
+    Each buffer has precomputed views for every grid cell, in normal and vertically flipped
+    layout. A unique eye crop is resized once, straight into its first cell, and then copied
+    into any repeat cells. Flip and grayscale are applied to the crop, never to a whole frame.
+    """
+
+    def __init__(self, width, height, rows, cols, buffer_count=OUTPUT_BUFFER_COUNT):
+        self.rows = rows
+        self.cols = cols
+        self.cell_width = width // cols
+        self.cell_height = height // rows
+
+        self.buffers = [np.zeros((height, width, 3), dtype=np.uint8) for _ in range(buffer_count)]
+        self.cell_views = [self._make_cell_views(buffer, flipped=False) for buffer in self.buffers]
+        self.flipped_cell_views = [self._make_cell_views(buffer, flipped=True) for buffer in self.buffers]
+        # Layout (flipped or not) that painted every cell of a buffer last time, or None if it did not
+        self._covered_by = [None] * buffer_count
+        self._index = -1
+        self._free = deque(range(buffer_count))  # Buffers not on their way to the screen
+        self._leased = deque()                   # Handed out and not released yet, oldest first
+        self._free_condition = threading.Condition()
+
+        # Scratch cells for crops that are flipped and/or grayscaled on their way into a cell
+        self._gray_cell = np.empty((self.cell_height, self.cell_width), dtype=np.uint8)
+        self._flipped_gray_cell = np.empty_like(self._gray_cell)
+        self._color_cell = np.empty((self.cell_height, self.cell_width, 3), dtype=np.uint8)
+
+    def _make_cell_views(self, buffer, flipped):
+        # Flipped: row r sits where a full-frame vertical flip would put it
+        height = buffer.shape[0]
+        views = []
+        for row in range(self.rows):
+            for col in range(self.cols):
+                start_x = col * self.cell_width
+                start_y = height - (row + 1) * self.cell_height if flipped else row * self.cell_height
+                views.append(buffer[start_y:start_y + self.cell_height, start_x:start_x + self.cell_width])
+        return views
+
+    def _acquire(self, wait):
+        """Index of a free buffer, or None if none was released within wait seconds.
+
+        With wait=None the oldest leased buffer is reused when none is free: for callers that
+        present each screen before composing the next one.
+        """
+        with self._free_condition:
+            if not self._free:
+                if wait is None:
+                    self._free.append(self._leased.popleft())
+                elif not self._free_condition.wait_for(lambda: self._free, wait):
+                    return None
+            index = self._free.popleft()
+            self._leased.append(index)
+            return index
+
+    def release(self, buffer):
+        """Put a buffer back in the free list once it was shown or dropped; other arrays are ignored."""
+        with self._free_condition:
+            for index in self._leased:
+                if self.buffers[index] is buffer:
+                    self._leased.remove(index)
+                    self._free.append(index)
+                    self._free_condition.notify()
+                    return
+
+    def next_buffer(self, full_cover=False, flipped=False, wait=None):
+        """Return a free (buffer, cell_views) pair, or None if none was released within wait seconds.
+
+        The buffer is cleared unless both its previous and upcoming content paint every cell
+        of the same layout.
+        """
+        index = self._acquire(wait)
+        if index is None:
+            return None
+        self._index = index
+        buffer = self.buffers[self._index]
+        if not (full_cover and self._covered_by[self._index] == flipped):
+            buffer.fill(0)
+        self._covered_by[self._index] = flipped if full_cover else None
+        views = self.flipped_cell_views if flipped else self.cell_views
+        return buffer, views[self._index]
+
+    def _draw_crop(self, eye_img, cell, flip, gray):
+        size = (self.cell_width, self.cell_height)
+        if gray:
+            # Convert the small crop, resize one channel, expand to BGR straight into the cell
+            small_gray = cv2.cvtColor(eye_img, cv2.COLOR_BGR2GRAY)
+            cv2.resize(small_gray, size, dst=self._gray_cell)
+            gray_cell = self._gray_cell
+            if flip:
+                cv2.flip(gray_cell, 0, dst=self._flipped_gray_cell)
+                gray_cell = self._flipped_gray_cell
+            cv2.cvtColor(gray_cell, cv2.COLOR_GRAY2BGR, dst=cell)
+        elif flip:
+            cv2.resize(eye_img, size, dst=self._color_cell)
+            cv2.flip(self._color_cell, 0, dst=cell)
+        else:
+            cv2.resize(eye_img, size, dst=cell)
+
+    def compose(self, frame, placements, cell_views, flip=False, gray=False):
+        """Draw placements, a list of (bbox, [cell indices]), into cell_views.
+
+        The crop is cut from frame, unless the bbox carries its own image (multi-source eyes).
+        flip mirrors each crop vertically (use with flipped cell views); gray renders it in grayscale.
+        """
+        for bbox, cell_indices in placements:
+            if not cell_indices:
+                continue
+
+            eye_img = getattr(bbox, 'image', None)
+            if eye_img is None:
+                x1, y1, x2, y2 = bbox
+                eye_img = frame[y1:y2, x1:x2]
+            if eye_img.size == 0:
+                for cell_index in cell_indices:
+                    cell_views[cell_index].fill(0)
+                continue
+
+            first_cell = cell_views[cell_indices[0]]
+            self._draw_crop(eye_img, first_cell, flip, gray)
+            for cell_index in cell_indices[1:]:
+                cell_views[cell_index][...] = first_cell
+
+
+class RemapCompositor(GridCompositor):
+    """Builds the whole wall from the source frame with a single cv2.remap call.
+
+    The placements (eye boxes and their cells) and the flip are compiled into one fixed-point
+    coordinate map covering every output pixel; pixels outside any placed cell map outside the
+    frame and come out black. Maps are cached by placement, so they are reused while the boxes
+    stay stable. Eyes that carry their own crop (multi-source) fall back to per-tile compositing.
+    """
+
+    def __init__(self, width, height, rows, cols, buffer_count=OUTPUT_BUFFER_COUNT, cache_size=REMAP_CACHE_SIZE):
+        super().__init__(width, height, rows, cols, buffer_count)
+        self.width = width
+        self.height = height
+        self.cache_size = cache_size
+        self._maps = OrderedDict()  # (frame shape, flip, placements) -> (map1, map2)
+        self.map_builds = 0
+        self.map_hits = 0
+
+        # Top-left corner of every cell in the normal and the flipped layout
+        self._cell_origins = {
+            flipped: [
+                (height - (row + 1) * self.cell_height if flipped else row * self.cell_height, col * self.cell_width)
+                for row in range(rows) for col in range(cols)
+            ]
+            for flipped in (False, True)
+        }
+        self._buffer = None
+
+    def next_buffer(self, full_cover=False, flipped=False, wait=None):
+        # remap writes every pixel of the buffer, so it never needs clearing first
+        index = self._acquire(wait)
+        if index is None:
+            return None
+        self._index = index
+        self._buffer = self.buffers[self._index]
+        self._covered_by[self._index] = None  # Per-tile fallback must clear it
+        views = self.flipped_cell_views if flipped else self.cell_views
+        return self._buffer, views[self._index]
+
+    def _build_maps(self, frame_shape, placements, flip):
+        # Far outside the frame: BORDER_CONSTANT turns unplaced pixels black
+        map_x = np.full((self.height, self.width), -16.0, dtype=np.float32)
+        map_y = np.full((self.height, self.width), -16.0, dtype=np.float32)
+        cell_u = np.arange(self.cell_width, dtype=np.float32) + 0.5
+        cell_v = np.arange(self.cell_height, dtype=np.float32) + 0.5
+        origins = self._cell_origins[flip]
+
+        for (x1, y1, x2, y2), cell_indices in placements:
+            x2, y2 = min(x2, frame_shape[1]), min(y2, frame_shape[0])
+            if not cell_indices or x2 <= x1 or y2 <= y1:
+                continue
+            # Same sampling positions as cv2.resize(INTER_LINEAR), clamped to the crop like its border handling
+            xs = np.clip(x1 + cell_u * ((x2 - x1) / self.cell_width) - 0.5, x1, x2 - 1)
+            ys = np.clip(y1 + cell_v * ((y2 - y1) / self.cell_height) - 0.5, y1, y2 - 1)
+            if flip:
+                ys = ys[::-1]
+            for cell_index in cell_indices:
+                top, left = origins[cell_index]
+                map_x[top:top + self.cell_height, left:left + self.cell_width] = xs[None, :]
+                map_y[top:top + self.cell_height, left:left + self.cell_width] = ys[:, None]
+
+        self.map_builds += 1
+        # Fixed-point maps make remap itself considerably faster than float maps
+        return cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+
+    def _get_maps(self, frame_shape, placements, flip):
+        key = (frame_shape[:2], flip, tuple((tuple(bbox), tuple(cells)) for bbox, cells in placements))
+        maps = self._maps.get(key)
+        if maps is None:
+            maps = self._build_maps(frame_shape, placements, flip)
+            self._maps[key] = maps
+            if len(self._maps) > self.cache_size:
+                self._maps.popitem(last=False)
+        else:
+            self.map_hits += 1
+            self._maps.move_to_end(key)
+        return maps
+
+    def compose(self, frame, placements, cell_views, flip=False, gray=False):
+        """Draw placements, a list of (bbox, [cell indices]), into the current buffer in one remap."""
+        if any(getattr(bbox, 'image', None) is not None for bbox, _ in placements):
+            self._buffer.fill(0)
+            return super().compose(frame, placements, cell_views, flip, gray)
+
+        map1, map2 = self._get_maps(frame.shape, placements, flip)
+        cv2.remap(frame, map1, map2, cv2.INTER_LINEAR, dst=self._buffer,
+                  borderMode=cv2.BORDER_CONSTANT, borderValue=(0, 0, 0))
+        if gray:
+            # Whole-wall conversion; the per-tile path converts each crop instead
+            gray_wall = cv2.cvtColor(self._buffer, cv2.COLOR_BGR2GRAY)
+            cv2.cvtColor(gray_wall, cv2.COLOR_GRAY2BGR, dst=self._buffer)
+
+
+def create_compositor(width, height, rows, cols, kind=COMPOSITOR):
+    if kind == "REMAP":
+        return RemapCompositor(width, height, rows, cols)
+    return GridCompositor(width, height, rows, cols)
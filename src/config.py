@@ -1,4 +1,4 @@
-import blobconverter
+import os
 import cv2
 
 
@@ -11,11 +11,142 @@ EDDA_RESOLUTION = (3024, 1964)
 # RGB_RESOLUTION = (3840, 2160)  # 4K UHD - too demanding for device
 # RGB_RESOLUTION = (1280, 720)   # HD 16:9
 
-FACE_DETECT_MODEL = blobconverter.from_zoo('face-detection-retail-0004', shaves=6)
+# Face detection model (resolved lazily from the local model cache when the device pipeline is built)
+FACE_DETECT_MODEL_NAME = 'face-detection-retail-0004'
+FACE_DETECT_MODEL_SHAVES = 6
+FACE_DETECT_MODEL_SHA256 = None  # Pinned sha256 of the blob: paste the hash `python -m src.model_cache` prints from a trusted download
+MODEL_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+MODEL_ALLOW_DOWNLOAD = True   # False = never touch the network; a cold cache is an error (use `python -m src.model_cache`)
+MODEL_REQUIRE_PIN = True      # Refuse to load a model blob while its sha256 is not pinned; False = trust the first download (warns on every start)
 CONFIDENCE_THRESHOLD = 0.5
 
+# Device -> host transfer (XLink)
+STREAM_MODE = "FULL"          # "FULL" or "PREVIEW_CROPS"
+# FULL: the whole 2560x1440 planar frame goes to the host (~166 MB/s at 15 FPS); eyes are cropped on the host
+# PREVIEW_CROPS: a downscaled preview goes to the host for eye detection; full-resolution eye crops are cut
+#   on the device (ImageManip) for just the detected eyes. Host crops of the preview are the fallback.
+STREAM_PREVIEW_SIZE = (1280, 720)  # Preview sent to the host in PREVIEW_CROPS mode (~41 MB/s at 15 FPS)
+STREAM_CROP_TRANSFER = "NV12" # Eye crop transfer: "BGR" (3 bytes/pixel), "NV12" (1.5 bytes/pixel) or "MJPEG" (encoded on device)
+STREAM_EYE_CROP_SIZE = (288, 480)  # Device crop size: about one grid cell (2560/9 x 1440/3), width a multiple of 16
+STREAM_MAX_EYE_CROPS = 27     # Eyes cropped on the device per frame; the rest fall back to host crops
+STREAM_CROP_TIMEOUT = 0.03    # Seconds to wait for a frame's crops before falling back to host crops
+STREAM_CROP_FRAME_HISTORY = 4 # Full-resolution frames the device keeps, to crop the frame the eyes were found on
+STREAM_CROP_JPEG_QUALITY = 90 # MJPEG quality for STREAM_CROP_TRANSFER = "MJPEG"
+
+# Output settings
+RENDER_SINK = "WINDOW"        # "WINDOW", "SHARED_MEMORY", "RAW_VIDEO" or "NULL"
+# WINDOW: OpenCV window in the main process
+# SHARED_MEMORY: screens published to a shared-memory ring, shown by a separate presenter process
+# RAW_VIDEO: raw BGR24 frames written to RAW_VIDEO_PATH (headless, no keyboard)
+# NULL: screens discarded (benchmarking)
+RENDER_RING_SLOTS = 3         # Frame slots in the shared-memory ring
+RAW_VIDEO_PATH = "-"          # File path, or "-" for stdout (e.g. `python main.py | ffmpeg -f rawvideo -pix_fmt bgr24 -s 2560x1440 -i - ...`)
+
+# Snapshot settings ('s' single, 'b' burst, 't' toggles time-lapse)
+SNAPSHOT_DIR = "."            # Where snapshots are written
+SNAPSHOT_FORMAT = "PNG"       # "PNG" (lossless), "JPEG" or "WEBP"
+SNAPSHOT_PNG_COMPRESSION = 1  # 0-9: higher is smaller but slower to encode
+SNAPSHOT_QUALITY = 95         # JPEG / WEBP quality, 1-100
+SNAPSHOT_WORKERS = 2          # Background encoder threads
+SNAPSHOT_QUEUE_SIZE = 12      # Snapshots waiting to be encoded (~11 MB each); beyond this new ones are skipped, never waited for. Never below a burst
+SNAPSHOT_BURST_FRAMES = 10    # Consecutive frames saved by one burst
+SNAPSHOT_TIMELAPSE_INTERVAL = 5.0  # Seconds between time-lapse snapshots
+
+# On-demand profiling ('p' or `kill -USR1 <pid>` profiles the next PROFILE_FRAMES presented frames)
+PROFILE_FRAMES = 100
+PROFILE_MODE = "DETERMINISTIC"  # "DETERMINISTIC" (every call, presenting thread only) or "SAMPLING" (all threads, low overhead)
+PROFILE_SAMPLE_INTERVAL = 0.005  # Seconds between stack samples in SAMPLING mode
+PROFILE_DIR = "profiles"      # Where .collapsed (flamegraph) and .txt summary files are written
+
+# Session recording settings (python main.py --record DIR / --replay DIR)
+RECORD_ENCODING = "JPEG"      # "JPEG" (compact) or "RAW" (lossless BGR, ~11 MB per 1440p frame)
+RECORD_JPEG_QUALITY = 90
+RECORD_SCALE = 1.0            # Downscale recorded frames (e.g. 0.5); replay scales them back up
+RECORD_CHUNK_FRAMES = 300     # Frames per on-disk chunk
+RECORD_QUEUE_SIZE = 16        # Frames waiting to be encoded and written; beyond this new ones are dropped, never waited for
+
+# Telemetry settings
+TELEMETRY_ENABLED = True      # Background sampler for device readings and host-side counters
+TELEMETRY_INTERVAL = 1.0      # Seconds between samples
+TELEMETRY_HISTORY = 600       # Samples kept per time series (ring buffer)
+TELEMETRY_HTTP_PORT = None    # Set to a port (e.g. 9102) to serve http://127.0.0.1:<port>/metrics; None = off
+TELEMETRY_JSONL_PATH = None   # e.g. "telemetry.jsonl" to also append samples to a rotating JSONL file
+TELEMETRY_JSONL_MAX_BYTES = 10 * 1024 * 1024  # Rotate the JSONL file past this size
+TELEMETRY_JSONL_BACKUPS = 3   # Rotated JSONL files kept
+SYSTEM_LOGGER_RATE = 1        # Device SystemLogger rate in Hz (CPU, DDR, temperature)
+
+# Frame / detection synchronisation
+FRAME_SYNC = True             # Pair RGB frames with the NN detections computed on that same frame
+SYNC_MATCH_BY = "SEQUENCE"    # "SEQUENCE" (sequence number) or "TIMESTAMP" (device timestamp)
+SYNC_BUFFER_SIZE = 8          # Max unmatched frames / detections held in the reorder buffer
+SYNC_MAX_STALENESS = 0.2      # Seconds a frame may wait for its detections before it is shown without them
+# Frames released without detections reuse the last matched eye boxes (no cascade run)
+
+# Eye detection settings
+EYE_DETECTION_WORKERS = 4     # Threads running the eye cascade on face ROIs in parallel (1 = serial)
+# With a single face in view the serial path is always used
+EYE_DETECT_FACE_HEIGHT = 160  # Faces taller than this (pixels) are downscaled to it before the eye cascade
+EYE_BACKEND = "HAAR"          # Eye detector run on face crops: "HAAR" or "DNN_LANDMARKS" (see src/eye_backends.py)
+EYE_HAAR_CASCADE_PATH = cv2.data.haarcascades + 'haarcascade_eye.xml'
+EYE_DNN_MODEL_PATH = os.path.join(MODEL_CACHE_DIR, "landmarks-regression-retail-0009.onnx")  # 5-point landmark regressor
+EYE_DNN_INPUT_SIZE = 48       # Square input of the landmark regressor
+EYE_DNN_EYE_SIZE = 0.25       # Eye box side, as a fraction of the face width, around each predicted eye landmark
+EYE_CASCADE_SCALE_FACTOR = 1.1  # Step between cascade search scales (larger = fewer scales, faster)
+EYE_CASCADE_MIN_NEIGHBORS = 7
+EYE_MIN_SIZE_RATIO = 0.1      # Smallest eye searched for, as a fraction of the face size
+EYE_MAX_SIZE_RATIO = 0.5      # Largest eye searched for, as a fraction of the face size
+EYE_NMS_THRESHOLD = 0.5       # IoU above which two detected eyes count as the same eye
+TRACKING_OVERLAP_THRESHOLD = 0.3  # Min intersection-over-min-area to match an eye to a tracked one (PARSE modes)
+
+# Detect-then-track settings (eye cascade runs only every few frames, eyes are tracked in between)
+EYE_TRACKING = True           # False = run the eye cascade on every face in every frame
+EYE_DETECT_INTERVAL = 5       # Run the cascade on a face at least every N frames
+EYE_REDETECT_MOTION = 0.15    # Re-detect when a face moves/resizes by more than this fraction of its width
+EYE_TRACK_MIN_SCORE = 0.6     # Min template match score (TM_CCOEFF_NORMED) before an eye counts as lost
+EYE_TRACK_SEARCH_MARGIN = 0.5 # Search window around an eye, as a fraction of the eye size on each side
+EYE_TRACK_TEMPLATE_SIZE = 24  # Eye templates larger than this (pixels) are matched at reduced scale
+
 DEBUG_MODE = True
 
+# Main loop settings
+PIPELINE_MODE = "SERIAL"      # "SERIAL" or "THREADED"
+# SERIAL: capture, detection, compositing and display run one after another in a single loop
+# THREADED: one worker per stage, linked by bounded queues that drop the oldest entry
+PIPELINE_QUEUE_SIZE = 2       # Max items waiting between two stages before the oldest is dropped
+PIPELINE_STATS_INTERVAL = 5.0 # Seconds between queue depth / drop count reports (THREADED only)
+EVENT_WAIT_TIMEOUT = 0.1      # Max seconds the loop sleeps waiting for a message before polling the keyboard anyway
+QUEUE_POLL_INTERVAL = 0.002   # Wake-up check interval for queues without callbacks (replay, fakes)
+COMPOSITOR = "TILES"          # "TILES": resize each eye crop into its cells; "REMAP": whole wall in one cv2.remap
+REMAP_CACHE_SIZE = 4          # Remap coordinate maps kept for reuse while eye boxes stay stable
+OUTPUT_BUFFER_COUNT = 4       # Persistent output canvases; THREADED mode keeps up to PIPELINE_QUEUE_SIZE + 2 in flight
+# Must exceed the screens that can be in flight at once (THREADED: queued + being shown + being composed)
+
+# Frame pacing: present on a fixed 1 / FPS cadence and track capture-to-present latency (src/pacing.py)
+PACING_MODE = "MEASURE"       # "MEASURE" (latency stats only, present as soon as ready), "CADENCE" (opt in: hold and drop frames) or "OFF"
+PACING_MAX_LATENCY = 0.2      # Seconds from capture; a frame older than this at its slot is dropped
+PACING_MAX_CONSECUTIVE_DROPS = 2  # After this many drops in a row a late frame is shown anyway
+PACING_HISTORY = 300          # Frames kept for the latency / jitter percentiles
+PACING_MAX_CLOCK_SKEW = 1.0   # Timestamps further than this from the host clock (replays) are re-based on the first frame
+
+# Adaptive quality: step down (and back up) a ladder of cheaper settings to hold the FPS budget
+QUALITY_ADAPTIVE = False      # Opt in with True: changes detection and colour settings at runtime
+QUALITY_DEGRADE_RATIO = 1.1   # Degrade when the mean host frame time exceeds this fraction of 1 / FPS
+QUALITY_RECOVER_RATIO = 0.6   # Recover when it drops below this fraction (the gap is the hysteresis)
+QUALITY_WINDOW = 30           # Frames averaged before each decision
+QUALITY_HOLD_FRAMES = 45      # Frames to wait after a change before the next one
+QUALITY_LOG_PATH = None       # e.g. "quality.jsonl" to also append every quality change to a file
+QUALITY_LADDER = [
+    # (name, cascade scaleFactor, cascade face height, cascade every N frames, grayscale compositing)
+    ("full", EYE_CASCADE_SCALE_FACTOR, EYE_DETECT_FACE_HEIGHT, EYE_DETECT_INTERVAL, False),
+    ("coarse-stride", 1.2, EYE_DETECT_FACE_HEIGHT, EYE_DETECT_INTERVAL, False),
+    ("low-res-cascade", 1.2, 112, EYE_DETECT_INTERVAL, False),
+    ("sparse-cascade", 1.3, 112, 2 * EYE_DETECT_INTERVAL, False),
+    ("grayscale", 1.3, 96, 3 * EYE_DETECT_INTERVAL, True),
+]
+
+# Multi-source settings (several cameras or replayed sessions feeding one wall)
+MULTI_SOURCE_STALE_AFTER = 1.0  # Seconds without a new frame before a source's eyes leave the pool
+
 # Grid layout settings
 GRID_ROWS = 3       # Number of rows in the eye grid
 GRID_COLS = 9       # Number of columns in the eye grid
@@ -2,23 +2,30 @@ import cv2
 import numpy as np
 import time
 import random
+import threading
 from src.config import (
     RGB_RESOLUTION, 
-    MAIN_TEXT_FONT_SCALE, 
-    MAIN_TEXT_FONT_WEIGHT, 
-    MAIN_TEXT_VERTICAL_OFFSET, 
     AVAILABLE_FONTS, 
     FONT_NAMES, 
     GRID_ROWS, 
     GRID_COLS, 
-    DISPLAY_MODE
+    DISPLAY_MODE,
+    TRACKING_OVERLAP_THRESHOLD
 )
+from src.boxes import match_boxes
+from src.compositor import create_compositor
+from src.render_plan import RenderPlan
+from src.slot_allocator import SlotAllocator
+from src.render_sink import create_sink, NO_KEY
+from src.snapshots import SnapshotCapture
+from src.profiler import HotPathProfiler
 
 class Display:
     def __init__(self): 
         self.width, self.height = RGB_RESOLUTION
         self.fullscreen = False
         self.color = True
+        self.quality_gray = False  # Grayscale forced by the quality controller, on top of the 'c' toggle
         self.vertical_flip = False
         self.current_font_index = 0  # Track current font index
         self.display_mode = DISPLAY_MODE  # Track current display mode
@@ -26,39 +33,91 @@ class Display:
         # Eye tracking for PARSE_GRID mode
         self.tracked_eyes = {}  # {eye_id: {'bbox': (x1,y1,x2,y2), 'grid_pos': (row,col)}}
         self.next_eye_id = 0
-        self.used_positions = set()  # Track which grid positions are occupied
+        self.slot_allocator = SlotAllocator(GRID_ROWS, GRID_COLS)  # Index of free grid positions
 
-    def create_output_screen(self, eyes_bounding_boxes, frame):
-        output_screen = np.zeros((self.height, self.width, 3), dtype=np.uint8)
-        if not self.color:
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)  # Convert frame to grayscale
-            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)  # Keep 3 channels for compatibility
+        # Persistent output buffers with precomputed grid cell views (per-tile or single-remap engine)
+        self.compositor = create_compositor(self.width, self.height, GRID_ROWS, GRID_COLS)
+        # Where finished screens go: window, shared-memory presenter process, raw video or nothing
+        self.sink = create_sink(self.width, self.height)
+        # Snapshots are encoded and written on background threads, never on the render thread
+        self.snapshots = SnapshotCapture()
+        # 'p' (or SIGUSR1, see main.py) profiles the next few frames; idle it costs one check per frame
+        self.profiler = HotPathProfiler()
+        self.key_callback = None  # Called with every key press (e.g. to record key events)
+        self.exit_requested = False  # Set by 'q'; loops check it via check_exit_condition
+        # Settings and tracking state: keys and the quality controller change them on the main thread
+        # while THREADED mode composites on a worker, so a key lands between frames, never mid-frame
+        self.state_lock = threading.RLock()
 
+        # Layout, text and no-eyes screen, rebuilt only when a setting it depends on changes
+        self.render_plan = None
+        self.refresh_render_plan()
+        self.frame_plan = self.render_plan  # Plan the current frame is being composited with
+
+    def refresh_render_plan(self):
+        """Recompile the render plan if the display mode, font, flip or colour setting changed."""
+        with self.state_lock:
+            plan = self.render_plan
+            color = self.color and not self.quality_gray
+            key = (self.display_mode, GRID_ROWS, GRID_COLS, self.current_font_index, self.vertical_flip, color)
+            if plan is None or plan.key != key:
+                self.render_plan = RenderPlan(self.width, self.height, GRID_ROWS, GRID_COLS, self.display_mode,
+                                              self.current_font_index, self.vertical_flip, color)
+            return self.render_plan
+
+    def create_output_screen(self, eyes_bounding_boxes, frame, wait=None):
+        """Compose the wall for this frame.
+
+        Returns None if no output buffer was released within wait seconds (see
+        GridCompositor.next_buffer); every screen returned must be shown or released.
+        """
+        # One plan per frame, even if a key press swaps self.render_plan meanwhile (THREADED mode)
+        with self.state_lock:
+            plan = self.frame_plan = self.render_plan
         if not eyes_bounding_boxes:
-            self._display_no_eyes(output_screen)
-        else:
-            self._display_eyes(eyes_bounding_boxes, frame, output_screen)
+            return plan.no_eyes_screen  # Prerendered (and already flipped); read-only
 
+        # FULL_GRID paints every cell, so its buffer does not need clearing first.
+        # Flip and grayscale are applied per crop, so the screen comes out ready to show.
+        # Not locked while waiting: the main thread releases buffers and must not block on keys here.
+        full_cover = plan.display_mode == "FULL_GRID"
+        buffer = self.compositor.next_buffer(full_cover, plan.vertical_flip, wait)
+        if buffer is None:
+            return None  # Every buffer is still on its way to the screen
+        output_screen, self.cell_views = buffer
+        with self.state_lock:
+            self._display_eyes(eyes_bounding_boxes, frame, output_screen)
         return output_screen
 
     def show_output_screen(self, output_screen):
-        """Show the processed eye detection output in a separate window and resize it to fit more space on screen."""
-        # Apply vertical flip if enabled
-        if self.vertical_flip:
-            output_screen = cv2.flip(output_screen, 0)
-            
-        cv2.namedWindow('Eye Detection', cv2.WINDOW_NORMAL)
-        
-        if self.fullscreen:
-            cv2.setWindowProperty('Eye Detection', cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
-        else:
-            cv2.setWindowProperty('Eye Detection', cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_NORMAL)
-            cv2.resizeWindow('Eye Detection', self.width, self.height)
-            
-        cv2.imshow('Eye Detection', output_screen)
+        """Hand the processed eye detection output to the render sink (window, presenter process, video or null)."""
+        self.sink.show(output_screen, self.fullscreen)
+        self.snapshots.on_frame(output_screen)  # Burst / time-lapse capture
+        self.profiler.tick()  # Counts presented frames while a profile is being captured
+
+    def release_output_screen(self, output_screen):
+        """Give an output buffer back for compositing once it was shown (and the keys polled) or dropped."""
+        self.compositor.release(output_screen)
+
+    def _compose(self, frame, placements):
+        plan = self.frame_plan
+        self.compositor.compose(frame, placements, self.cell_views, flip=plan.vertical_flip, gray=not plan.color)
 
     def check_keyboard_interaction(self, frame):
-        key = cv2.waitKey(1) & 0xFF
+        """The single keyboard poll per presented frame (or per idle wait); frame is what 's' saves."""
+        key = self.sink.poll_key(1)
+        if key == NO_KEY:
+            return
+        return self.handle_key(key, frame)
+
+    def handle_key(self, key, frame=None):
+        """Apply one key press: from the keyboard, or replayed from a recorded session (on any thread)."""
+        with self.state_lock:
+            return self._apply_key(key, frame)
+
+    def _apply_key(self, key, frame):
+        if self.key_callback is not None:
+            self.key_callback(key)
         if key == ord('f'):
             self.fullscreen = not self.fullscreen
         if key == ord('c'):
@@ -85,83 +144,42 @@ class Display:
             else:
                 self.display_mode = "PARSE_MODE_X2"  # Switch from FULL_GRID to X2
             print(f"Parse mode changed to: {self.display_mode}")
-        if key == ord('s'):
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            filename = f"snap_{timestamp}.png"
-            cv2.imwrite(filename, frame)
-            print(f"Image saved: {filename}")
+        if key == ord('s') and frame is not None:
+            self.snapshots.single(frame)
+        if key == ord('b'):
+            self.snapshots.start_burst()
+        if key == ord('t'):
+            self.snapshots.toggle_timelapse()
+        if key == ord('p'):
+            self.profiler.request()
+        self.refresh_render_plan()
         if key == ord('q'):
+            self.exit_requested = True
             return True
 
     def check_exit_condition(self):
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q'):
-            return True
+        # No second waitKey: 'q' is picked up by check_keyboard_interaction's poll
+        return self.exit_requested
     
     def destroy_all_windows(self):
-        cv2.destroyAllWindows()
-
-    def _display_no_eyes(self, output_screen):
-        lines = [
-            "WATCHING YOU LOOKING",
-            "AT EVERYTHING BUT ME",
-        ]
-        
-        font = AVAILABLE_FONTS[self.current_font_index]  # Use current font from cycling
-        font_scale = MAIN_TEXT_FONT_SCALE
-        font_thickness = MAIN_TEXT_FONT_WEIGHT
-        text_color = (255, 255, 255)
-        line_spacing = 20  # Space between lines
-        
-        # Calculate the total text block height
-        text_sizes = [cv2.getTextSize(line, font, font_scale, font_thickness)[0] for line in lines]
-        total_text_height = sum(h for w, h in text_sizes) + (len(lines) - 1) * line_spacing
-        
-        # Start position for the first line (centered vertically + offset)
-        start_y = (self.height - total_text_height) // 2 + MAIN_TEXT_VERTICAL_OFFSET
-
-        for i, line in enumerate(lines):
-            text_size = text_sizes[i]
-            text_x = (self.width - text_size[0]) // 2  # Centered horizontally
-            text_y = start_y + sum(text_sizes[j][1] for j in range(i)) + i * line_spacing  # Move down each line
-            
-            cv2.putText(output_screen, line, (text_x, text_y), font, font_scale, text_color, font_thickness)
+        self.sink.close()
+        self.snapshots.close()
 
     def _display_eyes(self, eyes_bounding_boxes, frame, output_screen):
-        if self.display_mode == "FULL_GRID":
+        display_mode = self.frame_plan.display_mode
+        if display_mode == "FULL_GRID":
             self._display_eyes_full_grid(eyes_bounding_boxes, frame, output_screen)
-        elif self.display_mode == "PARSE_MODE_X3":
+        elif display_mode == "PARSE_MODE_X3":
             self._display_eyes_parse_grid_x3(eyes_bounding_boxes, frame, output_screen)
-        elif self.display_mode == "PARSE_MODE_X2":
+        elif display_mode == "PARSE_MODE_X2":
             self._display_eyes_parse_grid_x2(eyes_bounding_boxes, frame, output_screen)
 
     def _display_eyes_full_grid(self, eyes_bounding_boxes, frame, output_screen):
         """Original mode: cycles through detected eyes to fill all grid positions"""
-        rows, cols = GRID_ROWS, GRID_COLS
-        split_width = self.width // cols
-        split_height = self.height // rows
-
-        # Fill the grid with available eyes, cycling through them if needed
-        for row in range(rows):
-            for col in range(cols):
-                grid_index = row * cols + col
-                
-                if eyes_bounding_boxes:
-                    # Cycle through available eyes if we have fewer than total positions
-                    eye_index = grid_index % len(eyes_bounding_boxes)
-                    x1, y1, x2, y2 = eyes_bounding_boxes[eye_index]
-                    eye_img = frame[y1:y2, x1:x2]
-                    
-                    if eye_img.size > 0:
-                        # Resize eye image to fit the grid cell
-                        resized_eye = cv2.resize(eye_img, (split_width, split_height))
-                        
-                        # Calculate position in the grid
-                        start_x = col * split_width
-                        start_y = row * split_height
-                        
-                        # Place the eye image in the grid
-                        output_screen[start_y:start_y + split_height, start_x:start_x + split_width] = resized_eye
+        # Fill the grid with available eyes, cycling through them if needed (cells come from the plan)
+        cells = self.frame_plan.full_grid_cells(len(eyes_bounding_boxes))
+        placements = list(zip(eyes_bounding_boxes, cells))
+        self._compose(frame, placements)
 
     def _display_eyes_parse_grid_x3(self, eyes_bounding_boxes, frame, output_screen):
         """PARSE_MODE_X3: Variable multiplication based on eye count"""
@@ -176,52 +194,50 @@ class Display:
         if not eyes_bounding_boxes:
             # No eyes detected - clear all tracking
             self.tracked_eyes.clear()
-            self.used_positions.clear()
+            self.slot_allocator.reset()
             return
             
-        rows, cols = GRID_ROWS, GRID_COLS
-        total_positions = rows * cols
-        split_width = self.width // cols
-        split_height = self.height // rows
-        
-        # Track which current detections match existing tracked eyes
+        cols = GRID_COLS
         current_detections = list(eyes_bounding_boxes)
-        matched_eye_ids = set()
-        
+
         # Step 1: Match current detections with existing tracked eyes
-        for eye_id, tracked_data in list(self.tracked_eyes.items()):
-            old_bbox = tracked_data['bbox']
-            best_match = None
-            best_overlap = 0
-            
-            for i, new_bbox in enumerate(current_detections):
-                overlap = self._calculate_overlap(old_bbox, new_bbox)
-                if overlap > best_overlap and overlap > 0.3:  # 30% overlap threshold
-                    best_overlap = overlap
-                    best_match = i
-            
-            if best_match is not None:
-                # Update the tracked eye with new bbox
-                self.tracked_eyes[eye_id]['bbox'] = current_detections[best_match]
-                matched_eye_ids.add(eye_id)
-                # Remove matched detection from list
-                current_detections.pop(best_match)
-            else:
+        tracked_ids = list(self.tracked_eyes.keys())
+        detection_ids = [getattr(bbox, 'eye_id', None) for bbox in current_detections]
+        if None not in detection_ids:
+            # The detector already tracks eyes - use its stable IDs directly
+            index_by_id = {eye_id: i for i, eye_id in enumerate(detection_ids)}
+            matches = [(t, index_by_id[eye_id]) for t, eye_id in enumerate(tracked_ids) if eye_id in index_by_id]
+        else:
+            # Optimal assignment on overlap
+            tracked_bboxes = [self.tracked_eyes[eye_id]['bbox'] for eye_id in tracked_ids]
+            matches = match_boxes(tracked_bboxes, current_detections, TRACKING_OVERLAP_THRESHOLD)
+
+        for tracked_index, detection_index in matches:
+            # Update the tracked eye with new bbox
+            self.tracked_eyes[tracked_ids[tracked_index]]['bbox'] = current_detections[detection_index]
+
+        matched_tracked = {tracked_index for tracked_index, _ in matches}
+        for tracked_index, eye_id in enumerate(tracked_ids):
+            if tracked_index not in matched_tracked:
                 # Eye disappeared - free all its grid positions (including multiplied instances)
-                for instance_key in list(self.used_positions):
-                    if isinstance(instance_key, tuple) and len(instance_key) == 2:
-                        if instance_key[0] == eye_id:  # This position belongs to the disappeared eye
-                            self.used_positions.discard(instance_key)
+                self.slot_allocator.release_all(self.tracked_eyes[eye_id].get('grid_positions', {}).values())
                 del self.tracked_eyes[eye_id]
+
+        # Remove matched detections from list
+        matched_detections = {detection_index for _, detection_index in matches}
+        current_detections = [bbox for i, bbox in enumerate(current_detections) if i not in matched_detections]
         
         # Step 2: Assign new detections to new tracked eyes
         for new_bbox in current_detections:
-            # Create new tracked eye
-            self.tracked_eyes[self.next_eye_id] = {
+            # Create new tracked eye (keyed by the detector's ID when it provides one)
+            eye_id = getattr(new_bbox, 'eye_id', None)
+            if eye_id is None:
+                eye_id = self.next_eye_id
+                self.next_eye_id += 1
+            self.tracked_eyes[eye_id] = {
                 'bbox': new_bbox,
                 'grid_positions': {}  # Will store positions for each multiplied instance
             }
-            self.next_eye_id += 1
         
         # Step 3: Determine multiplication factor
         num_eyes = len(self.tracked_eyes)
@@ -245,71 +261,17 @@ class Display:
             # Ensure this eye has positions for all its multiplied instances
             for instance in range(multiplier):
                 if instance not in tracked_data['grid_positions']:
-                    # Find available positions
-                    available_positions = []
-                    for row in range(rows):
-                        for col in range(cols):
-                            pos_key = (eye_id, instance)
-                            grid_pos = (row, col)
-                            # Check if this grid position is free
-                            occupied = False
-                            for other_eye_id, other_data in self.tracked_eyes.items():
-                                if 'grid_positions' in other_data:
-                                    for other_instance, other_pos in other_data['grid_positions'].items():
-                                        if other_pos == grid_pos:
-                                            occupied = True
-                                            break
-                                if occupied:
-                                    break
-                            if not occupied:
-                                available_positions.append(grid_pos)
-                    
-                    if available_positions:
-                        # Randomly assign position to this eye instance
-                        grid_pos = random.choice(available_positions)
+                    # Randomly assign a free position to this eye instance
+                    grid_pos = self.slot_allocator.allocate()
+                    if grid_pos is not None:
                         tracked_data['grid_positions'][instance] = grid_pos
         
-        # Step 5: Render all eye instances
-        for eye_id, tracked_data in self.tracked_eyes.items():
-            x1, y1, x2, y2 = tracked_data['bbox']
-            
-            for instance, grid_pos in tracked_data.get('grid_positions', {}).items():
-                row, col = grid_pos
-                
-                eye_img = frame[y1:y2, x1:x2]
-                
-                if eye_img.size > 0:
-                    # Resize eye image to fit the grid cell
-                    resized_eye = cv2.resize(eye_img, (split_width, split_height))
-                    
-                    # Calculate position in the grid
-                    start_x = col * split_width
-                    start_y = row * split_height
-                    
-                    # Place the eye image in the grid
-                    output_screen[start_y:start_y + split_height, start_x:start_x + split_width] = resized_eye
-
-    def _calculate_overlap(self, bbox1, bbox2):
-        """Calculate overlap ratio between two bounding boxes"""
-        x1_1, y1_1, x2_1, y2_1 = bbox1
-        x1_2, y1_2, x2_2, y2_2 = bbox2
-        
-        # Calculate intersection
-        x1_i = max(x1_1, x1_2)
-        y1_i = max(y1_1, y1_2)
-        x2_i = min(x2_1, x2_2)
-        y2_i = min(y2_1, y2_2)
-        
-        if x2_i <= x1_i or y2_i <= y1_i:
-            return 0.0  # No overlap
-        
-        intersection_area = (x2_i - x1_i) * (y2_i - y1_i)
-        bbox1_area = (x2_1 - x1_1) * (y2_1 - y1_1)
-        bbox2_area = (x2_2 - x1_2) * (y2_2 - y1_2)
-        
-        # Return intersection over minimum area
-        min_area = min(bbox1_area, bbox2_area)
-        return intersection_area / min_area if min_area > 0 else 0.0
+        # Step 5: Render all eye instances (each unique eye is resized once)
+        placements = [
+            (tracked_data['bbox'], [row * cols + col for row, col in tracked_data.get('grid_positions', {}).values()])
+            for tracked_data in self.tracked_eyes.values()
+        ]
+        self._compose(frame, placements)
 
     def _determine_grid_layout(self, num_eyes):
         # Return configurable grid layout
@@ -344,6 +306,8 @@ class DebugDisplay:
             self.last_update_time = current_time  # Update timestamp
 
     def overlay_performance_data(self, frame, perf_data):
+        if not perf_data:
+            return  # No device readings yet
         font = cv2.FONT_HERSHEY_SIMPLEX
         font_scale = 0.9  # Debug text font scale (hardcoded since user doesn't care about it)
         font_thickness = 2
@@ -0,0 +1,113 @@
+"""Eye detectors run on face crops, selectable with EYE_BACKEND in src/config.py.
+
+Every backend returns (x, y, w, h) eye boxes in face-crop coordinates and declares a rough
+cost profile. The cascades take grayscale crops; backends with color_input take BGR. Compare them on your own footage with `python -m benchmarks.eye_backends`.
+"""
+import os
+from abc import ABC, abstractmethod
+from collections import namedtuple
+import cv2
+import numpy as np
+from src.config import (
+    EYE_BACKEND,
+    EYE_HAAR_CASCADE_PATH,
+    EYE_DNN_MODEL_PATH,
+    EYE_DNN_INPUT_SIZE,
+    EYE_DNN_EYE_SIZE
+)
+
+# relative_cost: per-face cost relative to the Haar cascade at the same crop size
+# scales_with: what drives the cost up
+# uses_cascade_settings: whether scaleFactor / minNeighbors (and so the quality ladder's stride rung) apply
+CostProfile = namedtuple("CostProfile", ["relative_cost", "scales_with", "uses_cascade_settings"])
+
+
+class EyeBackend(ABC):
+    """Base class; instances are not shared between threads (see clone())."""
+
+    name = None
+    cost = None
+    color_input = False  # detect() gets BGR face crops instead of grayscale
+
+    @abstractmethod
+    def detect(self, face, min_size, max_size, scale_factor, min_neighbors):
+        """Eye boxes (x, y, w, h) found in face, sized between min_size and max_size pixels."""
+
+    @abstractmethod
+    def clone(self):
+        """A separate instance for another thread."""
+
+
+class CascadeEyeBackend(EyeBackend):
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{self.name} eye cascade not found: {path}")
+        self.path = path
+        self.cascade = cv2.CascadeClassifier(path)
+        if self.cascade.empty():
+            raise ValueError(f"Could not load {self.name} eye cascade from {path}")
+
+    def detect(self, face, min_size, max_size, scale_factor, min_neighbors):
+        return self.cascade.detectMultiScale(
+            face, scaleFactor=scale_factor, minNeighbors=min_neighbors,
+            minSize=(min_size, min_size), maxSize=(max_size, max_size)
+        )
+
+    def clone(self):
+        return type(self)(self.path)
+
+
+class HaarEyeBackend(CascadeEyeBackend):
+    """OpenCV's stock haarcascade_eye.xml (the original detector)."""
+
+    name = "HAAR"
+    cost = CostProfile(1.0, "face crop area x number of search scales", True)
+
+    def __init__(self, path=EYE_HAAR_CASCADE_PATH):
+        super().__init__(path)
+
+
+class DnnLandmarkEyeBackend(EyeBackend):
+    """Facial landmark regressor (OpenCV DNN) run on the face crop; eye boxes are placed around
+    the two predicted eye landmarks, so it always reports exactly two eyes per face.
+
+    Expects a 5-point model such as landmarks-regression-retail-0009 exported to ONNX:
+    BGR input of EYE_DNN_INPUT_SIZE squared, output [x0, y0, x1, y1, ...] normalised to the crop,
+    eyes first.
+    """
+
+    name = "DNN_LANDMARKS"
+    cost = CostProfile(0.5, "constant per face (fixed-size network input)", False)
+    color_input = True
+
+    def __init__(self, model_path=EYE_DNN_MODEL_PATH, input_size=EYE_DNN_INPUT_SIZE, eye_size=EYE_DNN_EYE_SIZE):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Landmark model not found: {model_path}")
+        self.model_path = model_path
+        self.input_size = input_size
+        self.eye_size = eye_size
+        self.net = cv2.dnn.readNet(model_path)
+
+    def detect(self, face, min_size, max_size, scale_factor, min_neighbors):
+        height, width = face.shape[:2]
+        self.net.setInput(cv2.dnn.blobFromImage(face, 1.0, (self.input_size, self.input_size)))
+        landmarks = self.net.forward().reshape(-1)
+
+        side = int(np.clip(width * self.eye_size, min_size, max_size))
+        boxes = []
+        for index in range(2):
+            center_x, center_y = landmarks[2 * index] * width, landmarks[2 * index + 1] * height
+            boxes.append((max(0, int(center_x - side / 2)), max(0, int(center_y - side / 2)), side, side))
+        return np.array(boxes, dtype=int)
+
+    def clone(self):
+        return type(self)(self.model_path, self.input_size, self.eye_size)
+
+
+BACKENDS = {backend.name: backend for backend in (HaarEyeBackend, DnnLandmarkEyeBackend)}
+
+
+def create_eye_backend(kind=EYE_BACKEND):
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown eye backend {kind!r}; choose from {', '.join(BACKENDS)}")
+    return BACKENDS[kind]()
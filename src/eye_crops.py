@@ -0,0 +1,189 @@
+"""Full-resolution eye crops cut on the device (STREAM_MODE = "PREVIEW_CROPS").
+
+The host receives only a downscaled preview, finds the eyes on it and sends their rectangles
+back, tagged with the preview's sequence number. On the device a Script node keeps the last
+few full-resolution frames and crops the one with that sequence number, one ImageManip crop
+per eye. Each crop comes back as BGR, NV12 or MJPEG, its sequence number set to
+sequence * max_crops + index, so the host matches crops to eyes by frame and position. Eyes
+whose crop does not arrive within STREAM_CROP_TIMEOUT keep no image, so the compositor cuts
+them from the preview on the host instead.
+
+The graph builder only calls pipeline.create*() and link(), and DeviceEyeCropper only needs a
+queue with send() and one with tryGet(), so both run offline against fakes. depthai is imported
+only where a DepthAI object is built (the MJPEG encoder preset and rects_message).
+"""
+import time
+import cv2
+from src.boxes import EyeBox
+from src.config import (
+    FPS,
+    STREAM_CROP_TRANSFER,
+    STREAM_EYE_CROP_SIZE,
+    STREAM_MAX_EYE_CROPS,
+    STREAM_CROP_TIMEOUT,
+    STREAM_CROP_FRAME_HISTORY,
+    STREAM_CROP_JPEG_QUALITY,
+    QUEUE_POLL_INTERVAL
+)
+
+RECTS_STREAM = "eye_rects"  # Host -> device: normalised eye rectangles (ImgDetections), tagged with the preview sequence
+CROPS_STREAM = "eye_crops"  # Device -> host: one crop per rectangle, tagged with sequence and index
+TRANSFERS = ("BGR", "NV12", "MJPEG")
+
+# Runs on the device. The frame input holds the last {history} frames (non-blocking), so the
+# frame the rectangles were found on is still there when they arrive. The crop is tagged here,
+# after the ImageManip; the MJPEG encoder keeps the sequence number of its input.
+CROP_SCRIPT = """
+frames = []
+while True:
+    rects = node.io['rects'].get()
+    frame = node.io['frame'].tryGet()
+    while frame is not None:
+        frames.append(frame)
+        frame = node.io['frame'].tryGet()
+    frames = frames[-{history}:]
+
+    sequence = rects.getSequenceNum()
+    match = None
+    for candidate in frames:
+        if candidate.getSequenceNum() == sequence:
+            match = candidate
+    if match is None:
+        continue  # Already gone: the host falls back to cropping the preview
+
+    for index, rect in enumerate(rects.detections[:{max_crops}]):
+        cfg = ImageManipConfig()
+        cfg.setCropRect(rect.xmin, rect.ymin, rect.xmax, rect.ymax)
+        cfg.setResize({width}, {height})
+        cfg.setKeepAspectRatio(False)
+        cfg.setFrameType(ImgFrame.Type.{frame_type})
+        node.io['manip_cfg'].send(cfg)
+        node.io['manip_img'].send(match)
+        crop = node.io['crop'].get()
+        crop.setSequenceNum(sequence * {max_crops} + index)
+        node.io['crops'].send(crop)
+"""
+
+
+def build_crop_graph(pipeline, full_res_output, transfer=STREAM_CROP_TRANSFER, crop_size=STREAM_EYE_CROP_SIZE,
+                     max_crops=STREAM_MAX_EYE_CROPS, history=STREAM_CROP_FRAME_HISTORY):
+    """Add the eye_rects -> Script <-> ImageManip, Script (-> MJPEG encoder) -> eye_crops branch, fed by full_res_output."""
+    if transfer not in TRANSFERS:
+        raise ValueError(f"Unknown crop transfer {transfer!r}; choose from {', '.join(TRANSFERS)}")
+    width, height = crop_size
+    frame_type = "BGR888p" if transfer == "BGR" else "NV12"  # The MJPEG encoder takes NV12
+
+    xin_rects = pipeline.createXLinkIn()
+    xin_rects.setStreamName(RECTS_STREAM)
+
+    script = pipeline.createScript()
+    script.setScript(CROP_SCRIPT.format(width=width, height=height, frame_type=frame_type,
+                                        max_crops=max_crops, history=history))
+    script.inputs['frame'].setBlocking(False)
+    script.inputs['frame'].setQueueSize(history)
+    full_res_output.link(script.inputs['frame'])
+    xin_rects.out.link(script.inputs['rects'])
+
+    manip = pipeline.createImageManip()
+    manip.inputConfig.setWaitForMessage(True)  # One crop per config, never a stale initialConfig
+    manip.setMaxOutputFrameSize(width * height * 3)
+    script.outputs['manip_cfg'].link(manip.inputConfig)
+    script.outputs['manip_img'].link(manip.inputImage)
+    manip.out.link(script.inputs['crop'])
+
+    xout_crops = pipeline.createXLinkOut()
+    xout_crops.setStreamName(CROPS_STREAM)
+    if transfer == "MJPEG":
+        import depthai as dai
+        encoder = pipeline.createVideoEncoder()
+        encoder.setDefaultProfilePreset(FPS, dai.VideoEncoderProperties.Profile.MJPEG)
+        encoder.setQuality(STREAM_CROP_JPEG_QUALITY)
+        script.outputs['crops'].link(encoder.input)
+        encoder.bitstream.link(xout_crops.input)
+    else:
+        script.outputs['crops'].link(xout_crops.input)
+    return script, manip
+
+
+def rects_message(rects, sequence):
+    """ImgDetections carrying normalised (xmin, ymin, xmax, ymax) rectangles of frame sequence to the crop script."""
+    import depthai as dai
+    message = dai.ImgDetections()
+    message.setSequenceNum(sequence)
+    detections = []
+    for xmin, ymin, xmax, ymax in rects:
+        detection = dai.ImgDetection()
+        detection.xmin, detection.ymin, detection.xmax, detection.ymax = xmin, ymin, xmax, ymax
+        detections.append(detection)
+    message.detections = detections
+    return message
+
+
+def decode_crop(message, transfer):
+    if transfer == "MJPEG":
+        return cv2.imdecode(message.getData(), cv2.IMREAD_COLOR)
+    return message.getCvFrame()  # BGR planar or NV12 -> BGR interleaved
+
+
+class DeviceEyeCropper:
+    """Host side: sends each frame's eye rectangles and attaches the returned crops to the eyes.
+
+    Crops are matched by the sequence and index they are tagged with. Crops of an earlier frame
+    that missed its timeout are discarded when they arrive.
+    """
+
+    def __init__(self, q_rects, q_crops, transfer=STREAM_CROP_TRANSFER, max_crops=STREAM_MAX_EYE_CROPS,
+                 timeout=STREAM_CROP_TIMEOUT, poll_interval=QUEUE_POLL_INTERVAL):
+        self.q_rects = q_rects
+        self.q_crops = q_crops
+        self.transfer = transfer
+        self.max_crops = max_crops
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.requested = 0
+        self.received = 0
+        self.late = 0       # Crops that arrived after their frame's timeout
+        self.fallbacks = 0  # Eyes left to the host-side crop of the preview
+
+    def attach(self, eyes, frame, sequence):
+        """Copies of eyes (preview coordinates) carrying their full-resolution crop where it arrived in time.
+
+        sequence is the preview frame's sequence number; without one, the eyes are returned as they are.
+        """
+        if not eyes or sequence is None:
+            return eyes
+        height, width = frame.shape[:2]
+        batch = eyes[:self.max_crops]
+        rects = [(x1 / width, y1 / height, x2 / width, y2 / height) for x1, y1, x2, y2 in batch]
+        self.q_rects.send(rects_message(rects, sequence))
+        self.requested += len(batch)
+
+        crops = self._collect(sequence, len(batch))
+        self.fallbacks += len(eyes) - sum(crop is not None for crop in crops)
+        return [
+            EyeBox(eye, getattr(eye, 'eye_id', None), getattr(eye, 'source', None), crop)
+            for eye, crop in zip(batch, crops)
+        ] + list(eyes[self.max_crops:])
+
+    def _collect(self, sequence, count):
+        crops = [None] * count
+        missing = count
+        deadline = time.perf_counter() + self.timeout
+        while missing:
+            message = self.q_crops.tryGet()
+            if message is None:
+                if time.perf_counter() >= deadline:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            crop_sequence, index = divmod(message.getSequenceNum(), self.max_crops)
+            if crop_sequence != sequence or index >= count or crops[index] is not None:
+                self.late += 1  # Crop of an earlier frame that timed out
+                continue
+            crops[index] = decode_crop(message, self.transfer)
+            missing -= 1
+        self.received += count - missing
+        return crops
+
+    def get_stats(self):
+        return {"requested": self.requested, "received": self.received, "late": self.late, "fallbacks": self.fallbacks}
@@ -0,0 +1,177 @@
+import cv2
+from src.boxes import match_boxes, iou_matrix
+from src.config import (
+    EYE_DETECT_INTERVAL,
+    EYE_REDETECT_MOTION,
+    EYE_TRACK_MIN_SCORE,
+    EYE_TRACK_SEARCH_MARGIN,
+    EYE_TRACK_TEMPLATE_SIZE
+)
+
+FACE_MATCH_THRESHOLD = 0.3  # Min IoU to treat a face box as the same face as in the previous frame
+EYE_MATCH_THRESHOLD = 0.3   # Min IoU to keep an eye's ID across a cascade run
+
+
+def _xyxy(box):
+    x, y, w, h = box
+    return (x, y, x + w, y + h)
+
+
+class TrackedEye:
+    def __init__(self, eye_id, box, template, template_scale):
+        self.eye_id = eye_id
+        self.box = box                        # (x, y, w, h) in full-frame coordinates
+        self.template = template              # Grayscale eye patch from the last cascade run
+        self.template_scale = template_scale  # Scale the template was stored at (<= 1)
+
+
+class FaceTrack:
+    def __init__(self, bbox):
+        self.bbox = bbox          # Current face box (x1, y1, x2, y2)
+        self.detect_bbox = bbox   # Face box at the last cascade run
+        self.frames_since_detect = 0
+        self.eyes = []
+        self.lost_eye = False     # Tracking lost an eye: run the cascade on the next frame
+
+
+class EyeTracker:
+    """Detect-then-track: runs the eye cascade only every few frames and tracks eyes in between.
+
+    Between cascade runs each eye is found again by template matching inside a small search
+    window of its face ROI. A face is re-detected when it is new, when detect_interval frames have
+    passed, when it moved or resized by more than redetect_motion of its width, or when an eye was lost.
+    A face with no eyes found waits for the interval like any other.
+    """
+
+    def __init__(self, detect_interval=EYE_DETECT_INTERVAL, redetect_motion=EYE_REDETECT_MOTION,
+                 min_score=EYE_TRACK_MIN_SCORE, search_margin=EYE_TRACK_SEARCH_MARGIN,
+                 template_size=EYE_TRACK_TEMPLATE_SIZE):
+        self.detect_interval = detect_interval
+        self.redetect_motion = redetect_motion
+        self.min_score = min_score
+        self.search_margin = search_margin
+        self.template_size = template_size
+        self.faces = []
+        self.next_eye_id = 0
+
+        self.cascade_runs = 0
+        self.tracked_updates = 0
+
+    def update(self, face_bboxes, gray_faces, detect_eyes):
+        """Update tracks for this frame's faces.
+
+        gray_faces are the full-resolution grayscale face ROIs, aligned with face_bboxes.
+        detect_eyes(face_indices) must return face-local (x, y, w, h) eyes for each given face.
+        Returns, per face, a list of (eye_id, (x, y, w, h)) in face-local coordinates.
+        """
+        previous = self.faces
+        pairs = dict(match_boxes(face_bboxes, [face.bbox for face in previous], FACE_MATCH_THRESHOLD, overlap=iou_matrix))
+
+        tracks = []
+        shifts = []
+        to_detect = []
+        for i, bbox in enumerate(face_bboxes):
+            if i in pairs:
+                track = previous[pairs[i]]
+                shifts.append((bbox[0] - track.bbox[0], bbox[1] - track.bbox[1]))
+            else:
+                track = FaceTrack(bbox)
+                shifts.append((0, 0))
+            track.bbox = bbox
+            tracks.append(track)
+            if i not in pairs or self._needs_detection(track):
+                to_detect.append(i)
+
+        detected = dict(zip(to_detect, detect_eyes(to_detect))) if to_detect else {}
+        for i, track in enumerate(tracks):
+            if i in detected:
+                self._refresh(track, gray_faces[i], detected[i])
+            else:
+                self._track(track, gray_faces[i], shifts[i])
+
+        self.faces = tracks
+        return [
+            [(eye.eye_id, (eye.box[0] - track.bbox[0], eye.box[1] - track.bbox[1], eye.box[2], eye.box[3])) for eye in track.eyes]
+            for track in tracks
+        ]
+
+    def reset(self):
+        self.faces = []
+
+    def _needs_detection(self, track):
+        if track.lost_eye:
+            return True
+        if track.frames_since_detect + 1 >= self.detect_interval:
+            return True
+
+        x1, y1, x2, y2 = track.bbox
+        dx1, dy1, dx2, dy2 = track.detect_bbox
+        width = max(1, dx2 - dx1)
+        moved = max(abs((x1 + x2) - (dx1 + dx2)), abs((y1 + y2) - (dy1 + dy2))) / 2
+        resized = abs((x2 - x1) - width)
+        return moved > self.redetect_motion * width or resized > self.redetect_motion * width
+
+    def _refresh(self, track, gray_face, local_eyes):
+        """Replace the face's eyes with fresh cascade results, keeping IDs of eyes that overlap."""
+        self.cascade_runs += 1
+        fx, fy = track.bbox[0], track.bbox[1]
+        boxes = [(fx + int(ex), fy + int(ey), int(ew), int(eh)) for (ex, ey, ew, eh) in local_eyes]
+        pairs = dict(match_boxes(
+            [_xyxy(box) for box in boxes], [_xyxy(eye.box) for eye in track.eyes], EYE_MATCH_THRESHOLD, overlap=iou_matrix
+        ))
+
+        eyes = []
+        for k, box in enumerate(boxes):
+            if k in pairs:
+                eye_id = track.eyes[pairs[k]].eye_id
+            else:
+                eye_id = self.next_eye_id
+                self.next_eye_id += 1
+            ex, ey, ew, eh = box[0] - fx, box[1] - fy, box[2], box[3]
+            scale = min(1.0, self.template_size / max(ew, eh, 1))
+            template = self._scaled(gray_face[ey:ey + eh, ex:ex + ew], scale)
+            eyes.append(TrackedEye(eye_id, box, template, scale))
+
+        track.eyes = eyes
+        track.detect_bbox = track.bbox
+        track.frames_since_detect = 0
+        track.lost_eye = False
+
+    def _track(self, track, gray_face, shift):
+        """Move each eye to the best template match near its previous position (shifted with the face)."""
+        self.tracked_updates += 1
+        track.frames_since_detect += 1
+        fx, fy = track.bbox[0], track.bbox[1]
+        face_height, face_width = gray_face.shape[:2]
+
+        kept = []
+        for eye in track.eyes:
+            x, y, w, h = eye.box
+            # Predicted position in face-local coordinates
+            px, py = x + shift[0] - fx, y + shift[1] - fy
+            margin_x, margin_y = int(w * self.search_margin), int(h * self.search_margin)
+            x0, y0 = max(0, px - margin_x), max(0, py - margin_y)
+            x1, y1 = min(face_width, px + w + margin_x), min(face_height, py + h + margin_y)
+
+            window = self._scaled(gray_face[y0:y1, x0:x1], eye.template_scale) if x1 > x0 and y1 > y0 else None
+            template_h, template_w = eye.template.shape[:2]
+            if window is None or window.shape[0] < template_h or window.shape[1] < template_w or template_w == 0:
+                track.lost_eye = True
+                continue
+
+            scores = cv2.matchTemplate(window, eye.template, cv2.TM_CCOEFF_NORMED)
+            _, best_score, _, (bx, by) = cv2.minMaxLoc(scores)
+            if best_score < self.min_score:
+                track.lost_eye = True
+                continue
+
+            eye.box = (fx + x0 + int(bx / eye.template_scale), fy + y0 + int(by / eye.template_scale), w, h)
+            kept.append(eye)
+
+        track.eyes = kept
+
+    def _scaled(self, image, scale):
+        if scale >= 1.0 or image.size == 0:
+            return image.copy()
+        size = (max(1, round(image.shape[1] * scale)), max(1, round(image.shape[0] * scale)))
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
@@ -1,19 +1,39 @@
-import depthai as dai
 import cv2
 import numpy as np
 import time
-from src.config import RGB_RESOLUTION, FACE_DETECT_MODEL, CONFIDENCE_THRESHOLD, FPS, EYE_CROP_SCALE_X, EYE_CROP_SCALE_Y
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.config import RGB_RESOLUTION, CONFIDENCE_THRESHOLD, FPS, EYE_CROP_SCALE_X, EYE_CROP_SCALE_Y, EYE_DETECTION_WORKERS, EYE_NMS_THRESHOLD, FRAME_SYNC, EYE_TRACKING, EYE_DETECT_FACE_HEIGHT, EYE_CASCADE_SCALE_FACTOR, EYE_CASCADE_MIN_NEIGHBORS, EYE_MIN_SIZE_RATIO, EYE_MAX_SIZE_RATIO, STREAM_MODE, STREAM_PREVIEW_SIZE, STREAM_MAX_EYE_CROPS
 from src.utils import frameNorm
+from src.boxes import EyeBox, non_max_suppression
+from src.eye_tracker import EyeTracker
+from src.eye_backends import create_eye_backend
+from src.model_cache import resolve_model
+from src.eye_crops import build_crop_graph, DeviceEyeCropper, RECTS_STREAM, CROPS_STREAM
+from src.sync import FrameSynchronizer, FramePacket, message_timestamp
 
 class FaceDetector:
     def __init__(self, pipeline):
         self.pipeline = pipeline
-        self._setup_pipeline()
-        self.eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
+        if pipeline is not None:  # None = host-side processing only (benchmarks, replay)
+            self._setup_pipeline()
+        self.eye_backend = create_eye_backend()  # Haar or DNN landmarks, per EYE_BACKEND
+        # Backends (CascadeClassifier, dnn.Net) are not thread-safe, so each pool thread clones its own
+        self._thread_local = threading.local()
+        self.eye_executor = ThreadPoolExecutor(max_workers=EYE_DETECTION_WORKERS) if EYE_DETECTION_WORKERS > 1 else None
         self.previous_eyes = []  # Store last detected eye positions
         self.last_detection_time = time.time()
+        self.last_eyes = []  # Eyes returned for the last frame that had fresh detections
+        self.synchronizer = FrameSynchronizer() if FRAME_SYNC else None
+        self.eye_tracker = EyeTracker() if EYE_TRACKING else None
+        # Cascade settings; the quality controller may change them at runtime
+        self.cascade_scale_factor = EYE_CASCADE_SCALE_FACTOR
+        self.cascade_min_neighbors = EYE_CASCADE_MIN_NEIGHBORS
+        self.detect_face_height = EYE_DETECT_FACE_HEIGHT
+        self.eye_cropper = None  # Device-side eye crops; set by connect() in PREVIEW_CROPS mode
 
     def _setup_pipeline(self):
+        import depthai as dai  # Only with a device pipeline: host-only use (replay, benchmarks) runs without it
         cam_rgb = self.pipeline.createColorCamera()
         cam_rgb.setResolution(dai.ColorCameraProperties.SensorResolution.THE_4_K)
         cam_rgb.setPreviewSize(2560, 1440)  # 1440p resolution - balanced quality/performance
@@ -28,7 +48,7 @@ class FaceDetector:
         cam_rgb.preview.link(manip.inputImage)
 
         face_nn = self.pipeline.createMobileNetDetectionNetwork()
-        face_nn.setBlobPath(FACE_DETECT_MODEL)
+        face_nn.setBlobPath(resolve_model())
         face_nn.setConfidenceThreshold(CONFIDENCE_THRESHOLD)
 
         xout_rgb = self.pipeline.createXLinkOut()
@@ -37,10 +57,28 @@ class FaceDetector:
         xout_nn = self.pipeline.createXLinkOut()
         xout_nn.setStreamName("nn")
 
-        cam_rgb.preview.link(xout_rgb.input)
+        if STREAM_MODE == "PREVIEW_CROPS":
+            # Only a downscaled preview crosses XLink; eye pixels come from device-side crops
+            preview_manip = self.pipeline.createImageManip()
+            preview_manip.initialConfig.setResize(*STREAM_PREVIEW_SIZE)
+            preview_manip.setKeepAspectRatio(False)
+            preview_manip.setMaxOutputFrameSize(STREAM_PREVIEW_SIZE[0] * STREAM_PREVIEW_SIZE[1] * 3)
+            cam_rgb.preview.link(preview_manip.inputImage)
+            preview_manip.out.link(xout_rgb.input)
+            build_crop_graph(self.pipeline, cam_rgb.preview)
+        else:
+            cam_rgb.preview.link(xout_rgb.input)
         manip.out.link(face_nn.input)
         face_nn.out.link(xout_nn.input)
 
+    def connect(self, device):
+        """Open the device queues this detector needs besides "rgb" and "nn" (none in FULL mode)."""
+        if STREAM_MODE == "PREVIEW_CROPS":
+            self.eye_cropper = DeviceEyeCropper(
+                device.getInputQueue(RECTS_STREAM),
+                device.getOutputQueue(CROPS_STREAM, maxSize=STREAM_MAX_EYE_CROPS, blocking=True)
+            )
+
     def get_frame(self, q_rgb):
         in_rgb = q_rgb.tryGet()
         return in_rgb.getCvFrame() if in_rgb is not None else None
@@ -49,18 +87,62 @@ class FaceDetector:
         in_nn = q_nn.tryGet()
         return in_nn.detections if in_nn is not None else []
 
-    def process_detections(self, frame, detections):
-        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        new_eyes = []
+    def read(self, q_rgb, q_nn):
+        """Return the next FramePacket, or None if no frame is ready."""
+        if self.synchronizer is None:
+            in_rgb = q_rgb.tryGet()
+            if in_rgb is None:
+                return None
+            # Sequence number and device timestamp are kept for latency tracking (src/pacing.py)
+            return FramePacket(in_rgb.getCvFrame(), self.get_detections(q_nn), in_rgb.getSequenceNum(),
+                               message_timestamp(in_rgb))
+
+        synced = self.synchronizer.poll(q_rgb, q_nn)
+        if synced is None:
+            return None
+        in_rgb, in_nn = synced
+        detections = in_nn.detections if in_nn is not None else None
+        return FramePacket(in_rgb.getCvFrame(), detections, in_rgb.getSequenceNum(), message_timestamp(in_rgb))
+
+    def process_detections(self, frame, detections, sequence=None):
+        eyes = self._find_eyes(frame, detections)
+        if self.eye_cropper is not None:
+            # frame is the preview: full-resolution eye pixels come from the device, host crops are the fallback
+            return self.eye_cropper.attach(eyes, frame, sequence)
+        return eyes
+
+    def _find_eyes(self, frame, detections):
+        # No fresh NN result for this frame: reuse the last matched eye boxes without running the cascade
+        if detections is None:
+            return list(self.last_eyes)
 
-        for detection in detections:
-            bbox = frameNorm(frame, (detection.xmin, detection.ymin, detection.xmax, detection.ymax))
-            face_roi = frame[bbox[1]:bbox[3], bbox[0]:bbox[2]]
-            gray_face = gray_frame[bbox[1]:bbox[3], bbox[0]:bbox[2]]
+        new_eyes = []
 
-            eyes = self.eye_cascade.detectMultiScale(gray_face, scaleFactor=1.1, minNeighbors=7, minSize=(15, 15))
+        face_bboxes = [
+            frameNorm(frame, (detection.xmin, detection.ymin, detection.xmax, detection.ymax))
+            for detection in detections
+        ]
+        face_rois = [frame[bbox[1]:bbox[3], bbox[0]:bbox[2]] for bbox in face_bboxes]
+        color_input = self.eye_backend.color_input
+        # Only the face ROIs are converted to grayscale, never the whole frame; the tracker always needs them
+        gray_faces = [self._gray_roi(roi) for roi in face_rois] if self.eye_tracker is not None or not color_input else None
+        # The cascades take grayscale, a DNN backend the colour crop it was trained on
+        detect_faces = face_rois if color_input else gray_faces
+
+        if self.eye_tracker is not None:
+            # Cascade only on faces due for re-detection; other eyes are carried forward with stable IDs
+            tracked = self.eye_tracker.update(
+                face_bboxes, gray_faces,
+                lambda indices: self._detect_eyes_for_faces([detect_faces[i] for i in indices])
+            )
+            eyes_per_face = [[box for _, box in face_eyes] for face_eyes in tracked]
+            ids_per_face = [[eye_id for eye_id, _ in face_eyes] for face_eyes in tracked]
+        else:
+            eyes_per_face = self._detect_eyes_for_faces(detect_faces)
+            ids_per_face = [[None] * len(eyes) for eyes in eyes_per_face]
 
-            for (ex, ey, ew, eh) in eyes:
+        for bbox, eyes, eye_ids in zip(face_bboxes, eyes_per_face, ids_per_face):
+            for (ex, ey, ew, eh), eye_id in zip(eyes, eye_ids):
                 # Apply crop scaling to eye bounding box
                 center_x = ex + ew // 2
                 center_y = ey + eh // 2
@@ -81,23 +163,65 @@ class FaceDetector:
                 
                 # Only add if we have a valid region
                 if x2 > x1 and y2 > y1:
-                    new_eyes.append((x1, y1, x2, y2))
+                    new_eyes.append(EyeBox((x1, y1, x2, y2), eye_id))
+
+        # Overlapping face ROIs can report the same eye twice; keep one box per eye
+        new_eyes = [new_eyes[i] for i in non_max_suppression(new_eyes, EYE_NMS_THRESHOLD)]
 
         # If no eyes detected, use the last valid detections for 0.5s before switching to "I C U"
         if not new_eyes:
             if time.time() - self.last_detection_time < 0.3:
-                return self.previous_eyes
+                self.last_eyes = self.previous_eyes
+                return list(self.previous_eyes)
             else:
                 self.previous_eyes = []  # Clear buffer if no detections for too long
         else:
             self.previous_eyes = new_eyes
             self.last_detection_time = time.time()
 
-        return new_eyes
-    
-    def _is_duplicate_eye(self, new_eye, prev_eye, threshold=20):
-        """Check if the new eye is too close to a previously detected eye."""
-        return (
-            abs(new_eye[0] - prev_eye[0]) < threshold and
-            abs(new_eye[1] - prev_eye[1]) < threshold
-        )
+        self.last_eyes = new_eyes
+        return list(new_eyes)
+
+    def _detect_eyes_for_faces(self, faces):
+        """Face-local eye boxes for each face ROI (gray, or BGR for a color_input backend), in the same order."""
+        if self.eye_executor is not None and len(faces) > 1:
+            # Fan faces out to the pool; map() keeps results in face order
+            return list(self.eye_executor.map(self._detect_eyes_threaded, faces))
+        return [self._detect_eyes(self.eye_backend, face) for face in faces]
+
+    def _gray_roi(self, face_roi):
+        if face_roi.size == 0:
+            return np.zeros((0, 0), dtype=np.uint8)
+        return cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY)
+
+    def _detect_eyes(self, eye_backend, face):
+        """Run the eye backend on a face downscaled to a canonical height; boxes are returned at full resolution."""
+        if face.size == 0:
+            return ()
+
+        # Close-up faces are shrunk to detect_face_height, so the cascade cost stays flat with face size
+        scale = min(1.0, self.detect_face_height / face.shape[0])
+        if scale < 1.0:
+            face = cv2.resize(face, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        # Eye size bounds follow the face size instead of a fixed minimum
+        face_size = min(face.shape[:2])
+        min_eye = max(10, int(face_size * EYE_MIN_SIZE_RATIO))
+        max_eye = max(min_eye + 1, int(face_size * EYE_MAX_SIZE_RATIO))
+        eyes = eye_backend.detect(face, min_eye, max_eye, self.cascade_scale_factor, self.cascade_min_neighbors)
+
+        if len(eyes) == 0 or scale == 1.0:
+            return eyes
+        # Map back to full-resolution face coordinates for cropping
+        return np.round(np.asarray(eyes) / scale).astype(int)
+
+    def _detect_eyes_threaded(self, face):
+        eye_backend = getattr(self._thread_local, "eye_backend", None)
+        if eye_backend is None:
+            eye_backend = self.eye_backend.clone()
+            self._thread_local.eye_backend = eye_backend
+        return self._detect_eyes(eye_backend, face)
+
+    def close(self):
+        if self.eye_executor is not None:
+            self.eye_executor.shutdown(wait=False)
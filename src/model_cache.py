@@ -0,0 +1,131 @@
+"""Local, hash-verified cache of the DepthAI model blobs.
+
+Models are resolved lazily, only when the device pipeline is built. Warm the cache ahead of
+time (e.g. before taking a kiosk offline) with:
+
+    python -m src.model_cache
+
+A download must match the pinned FACE_DETECT_MODEL_SHA256 before it is recorded in the manifest,
+and a cached blob must match it before it is used. The command above prints the hash to pin; until
+one is pinned the app refuses to load the model (unless MODEL_REQUIRE_PIN is False).
+"""
+import hashlib
+import json
+import os
+import shutil
+from src.config import (
+    MODEL_CACHE_DIR,
+    MODEL_ALLOW_DOWNLOAD,
+    MODEL_REQUIRE_PIN,
+    FACE_DETECT_MODEL_NAME,
+    FACE_DETECT_MODEL_SHAVES,
+    FACE_DETECT_MODEL_SHA256
+)
+
+MANIFEST_NAME = "manifest.json"
+
+
+class ModelCacheError(RuntimeError):
+    pass
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _model_key(name, shaves):
+    return f"{name}_{shaves}shave"
+
+
+def _load_manifest(cache_dir):
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_manifest(cache_dir, manifest):
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _cached_path(name, shaves, cache_dir, sha256=None):
+    """Path of the cached blob if it exists and matches its recorded (and pinned) hash, else None."""
+    entry = _load_manifest(cache_dir).get(_model_key(name, shaves))
+    if entry is None:
+        return None
+    path = os.path.join(cache_dir, entry["file"])
+    if not os.path.exists(path):
+        return None
+    if sha256 is not None and entry["sha256"] != sha256:
+        print(f"Cached model {path} does not match the pinned hash")
+        return None
+    if _sha256(path) != entry["sha256"]:
+        print(f"Cached model {path} failed hash verification")
+        return None
+    return path
+
+
+def _download(name, shaves, cache_dir, sha256=None):
+    """Fetch a blob from the model zoo via blobconverter, verify it and record it in the cache."""
+    import blobconverter  # Only needed when the cache is cold
+
+    os.makedirs(cache_dir, exist_ok=True)
+    downloaded = blobconverter.from_zoo(name, shaves=shaves)
+    file_name = f"{_model_key(name, shaves)}.blob"
+    path = os.path.join(cache_dir, file_name)
+    shutil.copyfile(downloaded, path)
+
+    digest = _sha256(path)
+    if sha256 is None:
+        print(f"Warning: no pinned hash for {name}; downloaded blob is sha256 {digest}")
+    elif digest != sha256:
+        os.remove(path)
+        raise ModelCacheError(f"Downloaded {name} has sha256 {digest}, expected the pinned {sha256}")
+
+    manifest = _load_manifest(cache_dir)
+    manifest[_model_key(name, shaves)] = {"file": file_name, "sha256": digest, "name": name, "shaves": shaves}
+    _save_manifest(cache_dir, manifest)
+    return path
+
+
+def resolve_model(name=FACE_DETECT_MODEL_NAME, shaves=FACE_DETECT_MODEL_SHAVES, cache_dir=MODEL_CACHE_DIR,
+                  allow_download=MODEL_ALLOW_DOWNLOAD, sha256=FACE_DETECT_MODEL_SHA256, require_pin=MODEL_REQUIRE_PIN):
+    """Return the local path of a verified model blob, downloading it only if allowed and missing."""
+    if sha256 is None:
+        if require_pin:
+            raise ModelCacheError(
+                f"No pinned sha256 for model {name}: run `python -m src.model_cache`, check the hash it prints "
+                f"against a trusted copy and set FACE_DETECT_MODEL_SHA256 (or MODEL_REQUIRE_PIN = False to trust it unverified)"
+            )
+        print(f"WARNING: model {name} is not pinned to a sha256; whatever was downloaded first is trusted")
+    path = _cached_path(name, shaves, cache_dir, sha256)
+    if path is not None:
+        return path
+    if not allow_download:
+        raise ModelCacheError(
+            f"Model {name} ({shaves} shaves) is not in {cache_dir}; run `python -m src.model_cache` while online"
+        )
+    return _download(name, shaves, cache_dir, sha256)
+
+
+def prefetch(name=FACE_DETECT_MODEL_NAME, shaves=FACE_DETECT_MODEL_SHAVES, cache_dir=MODEL_CACHE_DIR,
+             sha256=FACE_DETECT_MODEL_SHA256):
+    """Make sure the model is cached and verified; downloads it if needed. Works unpinned, to get the hash to pin."""
+    path = resolve_model(name, shaves, cache_dir, allow_download=True, sha256=sha256, require_pin=False)
+    print(f"Model cached: {path} (sha256 {_sha256(path)})")
+    if sha256 is None:
+        print("Check this hash against a trusted copy, then set FACE_DETECT_MODEL_SHA256 to it in src/config.py")
+    return path
+
+
+if __name__ == "__main__":
+    prefetch()
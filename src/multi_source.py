@@ -0,0 +1,236 @@
+import threading
+import time
+from collections import namedtuple
+from src.boxes import EyeBox
+from src.config import GRID_ROWS, GRID_COLS, MULTI_SOURCE_STALE_AFTER, PIPELINE_STATS_INTERVAL, EVENT_WAIT_TIMEOUT
+from src.sync import MessageWaiter
+
+# One camera (or stand-in): a name, its own FaceDetector, and "rgb"/"nn" queues.
+# Any queue with a non-blocking tryGet() and either addCallback() or has() works - DepthAI
+# output queues, ReplaySource queues or fakes. replay is the ReplaySource behind the queues, if any,
+# so the source can tell a replay that ran out from a camera that is just slow.
+InputSource = namedtuple("InputSource", ["name", "detector", "q_rgb", "q_nn", "replay"], defaults=(None,))
+
+
+def tag_eye(eye, source, frame):
+    """Copy of eye tagged with its source, carrying its own crop; eye IDs are namespaced per source."""
+    x1, y1, x2, y2 = eye
+    eye_id = getattr(eye, 'eye_id', None)
+    image = getattr(eye, 'image', None)  # Already cut on the device in PREVIEW_CROPS mode
+    if image is None:
+        image = frame[y1:y2, x1:x2].copy()
+    return EyeBox(eye, None if eye_id is None else (source, eye_id), source, image)
+
+
+def fair_share(eyes_by_source, capacity):
+    """Merge per-source eye lists round-robin, so every source gets an equal share of the capacity.
+
+    Shares a source cannot fill go to the others.
+    """
+    pending = [eyes for eyes in eyes_by_source if eyes]
+    merged = []
+    index = 0
+    while pending and len(merged) < capacity:
+        for eyes in pending:
+            if len(merged) >= capacity:
+                break
+            merged.append(eyes[index])
+        index += 1
+        pending = [eyes for eyes in pending if len(eyes) > index]
+    return merged
+
+
+class EyePool:
+    """Latest eyes of every source, merged into one list for a single Display."""
+
+    def __init__(self, sources, capacity=GRID_ROWS * GRID_COLS, stale_after=MULTI_SOURCE_STALE_AFTER, clock=time.monotonic):
+        self.capacity = capacity
+        self.stale_after = stale_after
+        self.clock = clock
+        self.version = 0  # Bumped on every publish, and when a source goes stale
+        self._entries = {source: (None, []) for source in sources}  # source -> (publish time, eyes)
+        self._live = set()  # Sources that had published within stale_after at the last check
+        self._condition = threading.Condition()
+
+    def publish(self, source, eyes):
+        with self._condition:
+            self._entries[source] = (self.clock(), eyes)
+            self._live.add(source)
+            self.version += 1
+            self._condition.notify_all()
+
+    def _is_live(self, published, now):
+        return published is not None and now - published <= self.stale_after
+
+    def _expire(self):
+        """Drop sources that went stale from the live set; bump the version if any did."""
+        now = self.clock()
+        live = {source for source, (published, _) in self._entries.items() if self._is_live(published, now)}
+        if live != self._live:
+            self._live = live
+            self.version += 1
+
+    def _until_expiry(self, timeout):
+        """Seconds until the next live source goes stale, capped at timeout."""
+        now = self.clock()
+        expiries = [published + self.stale_after - now for published, _ in self._entries.values()
+                    if self._is_live(published, now)]
+        if not expiries:
+            return timeout
+        until = max(0.0, min(expiries))
+        return until if timeout is None else min(timeout, until)
+
+    def wait(self, version, timeout=None):
+        """Wait until the pool is newer than version (or the timeout passes); return the current version.
+
+        A source going stale counts as a change too, so its eyes leave the screen even when no
+        other source publishes.
+        """
+        with self._condition:
+            if self.version == version:
+                self._condition.wait(self._until_expiry(timeout))
+                self._expire()
+            return self.version
+
+    def merged(self):
+        """Fair-shared eyes of every source that published within stale_after seconds."""
+        now = self.clock()
+        with self._condition:
+            eyes_by_source = [
+                eyes for published, eyes in self._entries.values()
+                if self._is_live(published, now)
+            ]
+        return fair_share(eyes_by_source, self.capacity)
+
+
+class SourceWorker(threading.Thread):
+    """Capture + eye detection for one source; publishes tagged eyes into the shared pool."""
+
+    def __init__(self, source, pool, stop_event, telemetry=None):
+        super().__init__(name=f"source-{source.name}", daemon=True)
+        self.source = source
+        self.pool = pool
+        self.stop_event = stop_event
+        self.telemetry = telemetry
+        self.frames = 0
+        self.eyes = 0
+        self.busy_time = 0.0
+        self.finished = False  # Set once a replay without --loop has run out
+
+    def run(self):
+        source = self.source
+        waiter = MessageWaiter([source.q_rgb, source.q_nn])
+        while not self.stop_event.is_set():
+            packet = source.detector.read(source.q_rgb, source.q_nn)
+            if packet is None:
+                if source.replay is not None and source.replay.finished:
+                    self.finished = True
+                    return
+                waiter.wait(EVENT_WAIT_TIMEOUT)  # Sleep until this source delivers something
+                continue
+
+            start = time.perf_counter()
+            eyes = source.detector.process_detections(packet.frame, packet.detections, packet.sequence)
+            eyes.sort(key=lambda eye: eye[0])
+            self.pool.publish(source.name, [tag_eye(eye, source.name, packet.frame) for eye in eyes])
+            elapsed = time.perf_counter() - start
+
+            self.busy_time += elapsed
+            self.frames += 1
+            self.eyes += len(eyes)
+            if self.telemetry is not None:
+                self.telemetry.record_timing(f"source_{source.name}_detect", elapsed)
+
+
+class MultiSourceRunner:
+    """Runs one SourceWorker per source and composes their merged eye pool on the calling thread.
+
+    Composing and presenting stay on the calling thread because OpenCV's HighGUI must.
+    A new screen is composed whenever any source publishes or goes stale. Runs until 'q', or
+    until every source is a replay that has run out and its last eyes were shown.
+    """
+
+    def __init__(self, sources, display, telemetry=None):
+        self.sources = sources
+        self.display = display
+        self.telemetry = telemetry
+        self.stop_event = threading.Event()
+        self.pool = EyePool([source.name for source in sources])
+        self.workers = [SourceWorker(source, self.pool, self.stop_event, telemetry) for source in sources]
+        self.presented = 0
+        self.present_time = 0.0
+        self.start_time = None
+
+        if telemetry is not None:
+            for worker in self.workers:
+                name = worker.source.name
+                telemetry.add_gauge(f"source_{name}_frames", lambda worker=worker: worker.frames)
+                telemetry.add_gauge(f"source_{name}_eyes", lambda worker=worker: worker.eyes)
+                synchronizer = worker.source.detector.synchronizer
+                if synchronizer is not None:
+                    telemetry.add_gauge(f"source_{name}_sync_frames_dropped", lambda s=synchronizer: s.dropped)
+
+    def run(self):
+        self.start_time = time.time()
+        for worker in self.workers:
+            worker.start()
+
+        version = 0
+        last_stats_time = time.time()
+        try:
+            while True:
+                new_version = self.pool.wait(version, timeout=EVENT_WAIT_TIMEOUT)
+                if new_version != version:
+                    version = new_version
+                    start = time.perf_counter()
+                    # Every eye carries its own crop, so there is no single frame to cut from
+                    output_screen = self.display.create_output_screen(self.pool.merged(), None)
+                    self.display.show_output_screen(output_screen)
+                    elapsed = time.perf_counter() - start
+                    self.present_time += elapsed
+                    self.presented += 1
+                    if self.telemetry is not None:
+                        self.telemetry.record_timing("stage_present", elapsed)
+                        self.telemetry.count("frames_presented")
+                    self.display.check_keyboard_interaction(output_screen)  # One key poll per frame
+                    self.display.release_output_screen(output_screen)
+                else:
+                    self.display.check_keyboard_interaction(None)  # Idle: keep the keyboard responsive
+
+                if self.display.check_exit_condition():
+                    break
+                if all(worker.finished for worker in self.workers) and self.pool.wait(version, timeout=0) == version:
+                    break  # Every replay ran out and nothing was published since the last screen
+
+                if time.time() - last_stats_time >= PIPELINE_STATS_INTERVAL:
+                    print(self.format_stats())
+                    last_stats_time = time.time()
+        finally:
+            self.stop()
+
+    def stop(self):
+        self.stop_event.set()
+        for worker in self.workers:
+            worker.join(timeout=1.0)
+
+    def get_stats(self):
+        """Per-source throughput counters plus the number of composed screens."""
+        elapsed = max(time.time() - self.start_time, 1e-9) if self.start_time else None
+        sources = {
+            worker.source.name: {
+                "frames": worker.frames,
+                "eyes": worker.eyes,
+                "fps": worker.frames / elapsed if elapsed else 0.0,
+                "busy_time": worker.busy_time,
+            }
+            for worker in self.workers
+        }
+        return {"sources": sources, "presented": self.presented, "present_time": self.present_time}
+
+    def format_stats(self):
+        stats = self.get_stats()
+        source_text = " | ".join(
+            f"{name} frames={data['frames']} ({data['fps']:.1f} fps) eyes={data['eyes']}"
+            for name, data in stats["sources"].items()
+        )
+        return f"[sources] {source_text} | presented={stats['presented']}"
@@ -0,0 +1,173 @@
+"""Deadline-based frame pacing with capture-to-present latency tracking.
+
+Frames are presented on a fixed 1 / FPS cadence. A frame waits for the next free slot. A
+frame that would be older than max_latency by its slot is dropped, not queued, unless
+max_consecutive_drops frames in a row were already dropped (the screen must not freeze).
+Latency is measured from the frame's device timestamp (ImgFrame.getTimestamp(), on the host's
+monotonic clock) to the moment it is handed to the display.
+
+The clock and sleep are injectable. Drive FramePacer with a SimulatedClock to test it, or use
+`python -m benchmarks.pacing`.
+"""
+import math
+import time
+from collections import deque
+import numpy as np
+from src.config import (
+    FPS,
+    PACING_MODE,
+    PACING_MAX_LATENCY,
+    PACING_MAX_CONSECUTIVE_DROPS,
+    PACING_HISTORY,
+    PACING_MAX_CLOCK_SKEW
+)
+
+# The cadence phase-locks to the frames. A frame up to SLOT_TOLERANCE periods past a slot takes
+# that slot, and the cadence moves later by the difference. A frame that has to wait pulls the
+# cadence earlier by PHASE_GAIN of its wait. Otherwise a camera running just behind the cadence
+# would wait almost a full period on every frame.
+SLOT_TOLERANCE = 0.25
+PHASE_GAIN = 0.1
+
+
+class SimulatedClock:
+    """Manual clock: calling it reads the time, sleep() and advance() move it forward instantly."""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FramePacer:
+    """Schedules presentation on a fixed cadence and keeps latency / jitter statistics.
+
+    For every frame, call pace(timestamp). If it returns True, present the frame at once and
+    then call presented(timestamp). If it returns False, the frame was dropped.
+    In mode "MEASURE" nothing is delayed or dropped; only the statistics are kept.
+    """
+
+    def __init__(self, fps=FPS, mode=PACING_MODE, max_latency=PACING_MAX_LATENCY,
+                 max_consecutive_drops=PACING_MAX_CONSECUTIVE_DROPS, history=PACING_HISTORY,
+                 max_clock_skew=PACING_MAX_CLOCK_SKEW, clock=time.monotonic, sleep=time.sleep):
+        self.period = 1.0 / fps
+        self.mode = mode
+        self.max_latency = max_latency
+        self.max_consecutive_drops = max_consecutive_drops
+        self.max_clock_skew = max_clock_skew
+        self.clock = clock
+        self.sleep = sleep
+
+        self.anchor = None        # Time of slot 0 of the current cadence
+        self.last_slot = None     # Index of the last slot handed out
+        self.clock_offset = None  # Added to timestamps to bring them onto the host clock
+        self.consecutive_drops = 0
+
+        self.presented_frames = 0
+        self.dropped_late = 0     # Would have been shown older than max_latency
+        self.shown_late = 0       # Shown late anyway, so the screen does not freeze
+        self.superseded = 0       # Skipped because a newer frame was already waiting
+        self.last_latency = None
+        self.latencies = deque(maxlen=history)  # Seconds from capture to present
+        self.intervals = deque(maxlen=history)  # Seconds between consecutive presents
+        self._last_present = None
+
+    def _capture_time(self, timestamp):
+        """Capture time on the host clock, or None without a timestamp."""
+        if timestamp is None:
+            return None
+        if self.clock_offset is None:
+            # Device timestamps are synced to the host's monotonic clock; replayed ones are not
+            skew = self.clock() - timestamp
+            self.clock_offset = skew if abs(skew) > self.max_clock_skew else 0.0
+            if self.clock_offset:
+                print("[pacing] frame timestamps are not on the host clock; latency is measured relative to the first frame")
+        return timestamp + self.clock_offset
+
+    def pace(self, timestamp):
+        """Wait for this frame's slot and return True, or return False if it is dropped."""
+        capture_time = self._capture_time(timestamp)
+        if self.mode != "CADENCE":
+            return True
+
+        now = self.clock()
+        if self.anchor is None or now - (self.anchor + self.last_slot * self.period) > 2 * self.period:
+            # First frame, or after a gap: start a new cadence at this frame
+            self.anchor, self.last_slot = now, -1
+        slot = max(self.last_slot + 1, math.ceil((now - self.anchor) / self.period - SLOT_TOLERANCE))
+        slot_time = max(self.anchor + slot * self.period, now)
+
+        if capture_time is not None and slot_time - capture_time > self.max_latency:
+            if self.consecutive_drops < self.max_consecutive_drops:
+                self.consecutive_drops += 1
+                self.dropped_late += 1
+                return False
+            self.shown_late += 1
+
+        # Phase lock: follow a frame that was slightly late, creep toward one that has to wait
+        wait = slot_time - now
+        self.anchor += now - (self.anchor + slot * self.period) if wait == 0 else -PHASE_GAIN * wait
+        self.last_slot = slot
+        self.consecutive_drops = 0
+        if wait > 0:
+            self.sleep(wait)
+        return True
+
+    def skip(self, count=1):
+        """Record frames skipped in favour of a newer one that was already waiting."""
+        self.superseded += count
+
+    def presented(self, timestamp):
+        now = self.clock()
+        capture_time = self._capture_time(timestamp)
+        if capture_time is not None:
+            self.last_latency = now - capture_time
+            self.latencies.append(self.last_latency)
+        if self._last_present is not None:
+            self.intervals.append(now - self._last_present)
+        self._last_present = now
+        self.presented_frames += 1
+
+    def get_stats(self):
+        """Counters plus latency and jitter percentiles in milliseconds over the last history frames."""
+        stats = {
+            "presented": self.presented_frames,
+            "dropped_late": self.dropped_late,
+            "shown_late": self.shown_late,
+            "superseded": self.superseded,
+        }
+        if self.latencies:
+            latency = np.asarray(self.latencies) * 1000.0
+            stats.update({
+                "latency_p50_ms": float(np.percentile(latency, 50)),
+                "latency_p95_ms": float(np.percentile(latency, 95)),
+                "latency_p99_ms": float(np.percentile(latency, 99)),
+                "latency_max_ms": float(latency.max()),
+            })
+        if self.intervals and sum(self.intervals) > 0:
+            intervals = np.asarray(self.intervals)
+            jitter = np.abs(intervals - self.period) * 1000.0  # Deviation from the ideal cadence
+            stats.update({
+                "fps": float(1.0 / intervals.mean()),
+                "jitter_p50_ms": float(np.percentile(jitter, 50)),
+                "jitter_p95_ms": float(np.percentile(jitter, 95)),
+            })
+        return stats
+
+    def format_stats(self):
+        stats = self.get_stats()
+        text = (f"[pacing] presented={stats['presented']} dropped_late={stats['dropped_late']} "
+                f"shown_late={stats['shown_late']} superseded={stats['superseded']}")
+        if "latency_p50_ms" in stats:
+            text += (f" | latency p50={stats['latency_p50_ms']:.1f}ms p95={stats['latency_p95_ms']:.1f}ms "
+                     f"p99={stats['latency_p99_ms']:.1f}ms")
+        if "fps" in stats:
+            text += f" | {stats['fps']:.1f} fps jitter p95={stats['jitter_p95_ms']:.1f}ms"
+        return text
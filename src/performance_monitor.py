@@ -1,21 +1,42 @@
 import depthai as dai
+from src.config import SYSTEM_LOGGER_RATE
 
 class PerformanceMonitor:
     def __init__(self, pipeline):
         self.system_logger = pipeline.create(dai.node.SystemLogger)
-        self.system_logger.setRate(100)  # Update rate in Hz
+        self.system_logger.setRate(SYSTEM_LOGGER_RATE)  # Update rate in Hz
 
         self.xout_system = pipeline.create(dai.node.XLinkOut)
         self.xout_system.setStreamName("system_logger")
 
         self.system_logger.out.link(self.xout_system.input)
+        self.last_system_info = None
+
+    def read_system_info(self, system_queue):
+        """Drain the system logger queue without blocking; return the newest numeric readings (or the last known ones)."""
+        system_data = None
+        message = system_queue.tryGet()
+        while message is not None:
+            system_data = message
+            message = system_queue.tryGet()
+
+        if system_data is not None:
+            self.last_system_info = {
+                "leon_css_cpu": system_data.leonCssCpuUsage.average,
+                "leon_mss_cpu": system_data.leonMssCpuUsage.average,
+                "ddr_used_mib": system_data.ddrMemoryUsage.used / (1024 * 1024),
+                "ddr_total_mib": system_data.ddrMemoryUsage.total / (1024 * 1024),
+                "chip_temperature": system_data.chipTemperature.average,
+            }
+        return self.last_system_info
 
     def get_performance_data(self, system_queue):
-        system_data = system_queue.get()
+        system_info = self.read_system_info(system_queue)
+        if system_info is None:
+            return {}
 
         return {
-            "CPU Usage": f"{system_data.leonCssCpuUsage.average * 100:.2f}%",
-            "Memory Used": f"{system_data.ddrMemoryUsage.used / (1024 * 1024):.2f} MiB",
-            "Chip Temperature": f"{system_data.chipTemperature.average:.2f}*C",
+            "CPU Usage": f"{system_info['leon_css_cpu'] * 100:.2f}%",
+            "Memory Used": f"{system_info['ddr_used_mib']:.2f} MiB",
+            "Chip Temperature": f"{system_info['chip_temperature']:.2f}*C",
         }
-
@@ -0,0 +1,250 @@
+import threading
+import time
+from collections import deque
+from src.config import PIPELINE_QUEUE_SIZE, PIPELINE_STATS_INTERVAL, EVENT_WAIT_TIMEOUT
+from src.sync import MessageWaiter
+
+END_OF_STREAM = object()  # Passed down the stages once a replay without --loop has run out
+
+
+class LatestQueue:
+    """Bounded queue that drops its oldest entry when full, so consumers always get the newest data."""
+
+    def __init__(self, name, maxsize=PIPELINE_QUEUE_SIZE, on_drop=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.on_drop = on_drop  # Called with each dropped item, e.g. to give its buffer back
+        self.dropped = 0
+        self._items = deque()
+        self._condition = threading.Condition()
+
+    def put(self, item):
+        with self._condition:
+            if len(self._items) >= self.maxsize:
+                dropped = self._items.popleft()
+                self.dropped += 1
+                if self.on_drop is not None:
+                    self.on_drop(dropped)
+            self._items.append(item)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """Return the oldest queued item, or None if nothing arrived within the timeout."""
+        with self._condition:
+            if not self._items:
+                self._condition.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def depth(self):
+        with self._condition:
+            return len(self._items)
+
+
+class StageWorker(threading.Thread):
+    """Runs one pipeline stage in its own thread: takes from input_queue, pushes results to output_queue."""
+
+    def __init__(self, name, func, input_queue, output_queue, stop_event, telemetry=None):
+        super().__init__(name=name, daemon=True)
+        self.telemetry = telemetry
+        self.func = func
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.stop_event = stop_event
+        self.processed = 0
+        self.busy_time = 0.0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if self.input_queue is not None:
+                item = self.input_queue.get(timeout=0.1)
+                if item is None:
+                    continue
+            else:
+                item = None  # Source stage produces its own data
+
+            start = time.perf_counter()
+            result = self.func(item)
+            elapsed = time.perf_counter() - start
+            self.busy_time += elapsed
+
+            if result is not None:
+                self.processed += 1
+                self.output_queue.put(result)
+                if self.telemetry is not None:
+                    self.telemetry.record_timing(f"stage_{self.name}", elapsed)
+
+
+class ThreadedPipeline:
+    """Staged capture -> eye detection -> composite -> present pipeline.
+
+    Capture, detection and compositing each run in a worker thread. Presenting runs on the
+    calling thread because OpenCV's HighGUI (imshow/waitKey) must stay on the main thread.
+    """
+
+    def __init__(self, detector, display, q_rgb, q_nn, telemetry=None, recorder=None, quality=None, pacer=None, replay=None):
+        self.detector = detector
+        self.replay = replay
+        self.recorder = recorder
+        self.quality = quality
+        self.pacer = pacer
+        self.display = display
+        self.q_rgb = q_rgb
+        self.q_nn = q_nn
+        self.waiter = MessageWaiter([q_rgb, q_nn])
+        self.stop_event = threading.Event()
+
+        self.frames_queue = LatestQueue("capture->detect")
+        self.eyes_queue = LatestQueue("detect->composite")
+        self.screens_queue = LatestQueue("composite->present", on_drop=self._release_screen)
+        self.queues = [self.frames_queue, self.eyes_queue, self.screens_queue]
+
+        self.workers = [
+            StageWorker("capture", self._capture, None, self.frames_queue, self.stop_event, telemetry),
+            StageWorker("detect", self._detect, self.frames_queue, self.eyes_queue, self.stop_event, telemetry),
+            StageWorker("composite", self._composite, self.eyes_queue, self.screens_queue, self.stop_event, telemetry),
+        ]
+        self.presented = 0
+        self.present_time = 0.0
+        self.buffer_waits = 0  # Frames not composed because every output buffer was still in flight
+        self._ended = False     # The replay ran out; set on the capture thread
+        self._end_seen = False  # END_OF_STREAM reached the present stage
+
+        self.telemetry = telemetry
+        if telemetry is not None:
+            for queue in self.queues:
+                metric = queue.name.replace("->", "_to_")
+                telemetry.add_gauge(f"queue_{metric}_depth", queue.depth)
+                telemetry.add_gauge(f"queue_{metric}_dropped", lambda queue=queue: queue.dropped)
+
+    def _capture(self, _):
+        if self._ended:
+            self.stop_event.wait(EVENT_WAIT_TIMEOUT)
+            return None
+        packet = self.detector.read(self.q_rgb, self.q_nn)
+        if packet is None:
+            if self.replay is not None and self.replay.finished:
+                self._ended = True
+                return END_OF_STREAM
+            self.waiter.wait(EVENT_WAIT_TIMEOUT)  # Sleep until the device delivers something
+        elif self.recorder is not None:
+            self.recorder.record_packet(packet)
+        return packet
+
+    def _detect(self, packet):
+        if packet is END_OF_STREAM:
+            return packet
+        start = time.perf_counter()
+        frame = packet.frame
+        eyes_bounding_boxes = self.detector.process_detections(frame, packet.detections, packet.sequence)
+        # Sort eyes left to right to avoid duplication issues
+        eyes_bounding_boxes.sort(key=lambda eye: eye[0])
+        return frame, eyes_bounding_boxes, time.perf_counter() - start, packet.sequence, packet.timestamp
+
+    def _composite(self, item):
+        if item is END_OF_STREAM:
+            return item
+        start = time.perf_counter()
+        frame, eyes_bounding_boxes, detect_time, sequence, timestamp = item
+        if self.replay is not None:
+            # Key presses recorded at this frame change the mode it is composed in
+            for key in self.replay.events_for(sequence):
+                self.display.handle_key(key)
+        # Never draw over a screen still waiting to be shown: wait for a free buffer, else skip the frame
+        output_screen = self.display.create_output_screen(eyes_bounding_boxes, frame, wait=EVENT_WAIT_TIMEOUT)
+        if output_screen is None:
+            self.buffer_waits += 1
+            return None
+        # The slowest stage a frame went through limits throughput
+        return output_screen, max(detect_time, time.perf_counter() - start), timestamp
+
+    def _next_screen(self):
+        """The next composed screen; with pacing, the newest one waiting (older ones would only be shown late)."""
+        item = self.screens_queue.get(timeout=EVENT_WAIT_TIMEOUT)
+        if item is not None and item is not END_OF_STREAM and self.pacer is not None:
+            while self.screens_queue.depth():
+                newer = self.screens_queue.get(timeout=0)
+                if newer is None:
+                    break
+                if newer is END_OF_STREAM:
+                    self._end_seen = True  # Still show this last screen
+                    break
+                self._release_screen(item)
+                item = newer
+                self.pacer.skip()
+        return item
+
+    def _release_screen(self, item):
+        if item is not END_OF_STREAM:
+            self.display.release_output_screen(item[0])
+
+    def run(self):
+        for worker in self.workers:
+            worker.start()
+
+        last_stats_time = time.time()
+        try:
+            while True:
+                item = self._next_screen()
+                if item is END_OF_STREAM:
+                    break
+                if item is not None:
+                    output_screen, stage_time, timestamp = item
+                    # Wait for the screen's slot in the FPS cadence, or drop it if it would be shown too late
+                    if self.pacer is None or self.pacer.pace(timestamp):
+                        start = time.perf_counter()
+                        self.display.show_output_screen(output_screen)
+                        elapsed = time.perf_counter() - start
+                        self.present_time += elapsed
+                        self.presented += 1
+                        if self.pacer is not None:
+                            self.pacer.presented(timestamp)
+                        if self.quality is not None:
+                            self.quality.observe(max(stage_time, elapsed))
+                        if self.telemetry is not None:
+                            self.telemetry.record_timing("stage_present", elapsed)
+                            self.telemetry.count("frames_presented")
+                            if self.pacer is not None and self.pacer.last_latency is not None:
+                                self.telemetry.record_timing("capture_to_present", self.pacer.last_latency)
+                    self.display.check_keyboard_interaction(output_screen)  # One key poll per frame
+                    self.display.release_output_screen(output_screen)  # Shown or dropped; 's' has copied it
+                else:
+                    self.display.check_keyboard_interaction(None)  # Idle: keep the keyboard responsive
+
+                if self.display.check_exit_condition() or self._end_seen:
+                    break
+
+                if time.time() - last_stats_time >= PIPELINE_STATS_INTERVAL:
+                    print(self.format_stats())
+                    last_stats_time = time.time()
+        finally:
+            self.stop()
+
+    def stop(self):
+        self.stop_event.set()
+        for worker in self.workers:
+            worker.join(timeout=1.0)
+
+    def get_stats(self):
+        """Per-stage counters plus depth and drop count of each inter-stage queue."""
+        stages = {
+            worker.name: {"processed": worker.processed, "busy_time": worker.busy_time}
+            for worker in self.workers
+        }
+        stages["present"] = {"processed": self.presented, "busy_time": self.present_time}
+        stages["composite"]["buffer_waits"] = self.buffer_waits
+        queues = {
+            queue.name: {"depth": queue.depth(), "dropped": queue.dropped}
+            for queue in self.queues
+        }
+        return {"stages": stages, "queues": queues}
+
+    def format_stats(self):
+        stats = self.get_stats()
+        stage_text = " ".join(f"{name}={data['processed']}" for name, data in stats["stages"].items())
+        queue_text = " | ".join(
+            f"{name} depth={data['depth']} dropped={data['dropped']}"
+            for name, data in stats["queues"].items()
+        )
+        return f"[pipeline] {stage_text} | {queue_text}"
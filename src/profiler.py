@@ -0,0 +1,205 @@
+"""On-demand profiling of the running installation.
+
+Press 'p' (or send SIGUSR1) and the next PROFILE_FRAMES presented frames are profiled. Two
+files are written to PROFILE_DIR:
+    profile_<time>.collapsed   "frame;frame;frame value" lines, for flamegraph.pl / speedscope
+    profile_<time>.txt         per-function summary, hot paths first
+While idle the only cost is one attribute check per presented frame.
+"""
+import os
+import sys
+import threading
+import time
+import types
+from collections import Counter
+from src.config import PROFILE_FRAMES, PROFILE_MODE, PROFILE_SAMPLE_INTERVAL, PROFILE_DIR
+
+# Functions summarised first in the report
+HOT_PATHS = (
+    "process_detections",
+    "create_output_screen",
+    "_display_eyes_full_grid",
+    "_display_eyes_parse_grid_common",
+    "compose",
+)
+SUMMARY_TOP = 25
+
+
+def _code_name(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _c_function_name(function):
+    owner = getattr(function, "__self__", None)
+    if isinstance(owner, types.ModuleType):
+        prefix = owner.__name__  # e.g. time.perf_counter
+    elif owner is not None:
+        prefix = type(owner).__name__  # e.g. ndarray.fill
+    else:
+        prefix = getattr(function, "__module__", None)  # None for cv2's functions
+    return f"{prefix}.{function.__name__}" if prefix else function.__name__
+
+
+class _CallTracer:
+    """sys.setprofile hook: exact self time per call stack and per function."""
+
+    def __init__(self):
+        self.stack = []            # [name, start, time spent in children]
+        self.collapsed = Counter()  # "a;b;c" -> self seconds
+        self.functions = {}        # name -> [calls, inclusive seconds, self seconds]
+
+    def __call__(self, frame, event, arg):
+        now = time.perf_counter()
+        if event == "call":
+            self.stack.append([_code_name(frame.f_code), now, 0.0])
+        elif event == "c_call":
+            self.stack.append([_c_function_name(arg), now, 0.0])
+        elif event in ("return", "c_return", "c_exception"):
+            if not self.stack:
+                return  # Returning from a frame entered before profiling started
+            name, start, child_time = self.stack.pop()
+            total = now - start
+            self.collapsed[";".join([entry[0] for entry in self.stack] + [name])] += total - child_time
+            stats = self.functions.setdefault(name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += total
+            stats[2] += total - child_time
+            if self.stack:
+                self.stack[-1][2] += total
+
+
+class _StackSampler(threading.Thread):
+    """Samples every thread's stack every interval seconds."""
+
+    def __init__(self, interval):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.collapsed = Counter()  # "thread;a;b;c" -> samples
+        self.inclusive = Counter()  # function -> samples with it anywhere on the stack
+        self.exclusive = Counter()  # function -> samples with it on top
+        self.samples = 0
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_code_name(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                self.collapsed[";".join([names.get(thread_id, str(thread_id))] + stack)] += 1
+                for name in set(stack):
+                    self.inclusive[name] += 1
+                if stack:
+                    self.exclusive[stack[-1]] += 1
+            self.samples += 1
+
+    def stop(self):
+        self.stop_event.set()
+        self.join(timeout=1.0)
+
+
+class HotPathProfiler:
+    """Profiles the next `frames` presented frames on request; see the module docstring."""
+
+    def __init__(self, frames=PROFILE_FRAMES, mode=PROFILE_MODE, sample_interval=PROFILE_SAMPLE_INTERVAL,
+                 output_dir=PROFILE_DIR):
+        self.frames = frames
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self.output_dir = output_dir
+        self.pending = False   # Set by request(); picked up on the next tick
+        self.active = False
+        self._remaining = 0
+        self._collector = None
+        self._start_time = None
+        self.last_outputs = None
+
+    def request(self, *args):
+        """Arm a capture; safe to call from a key handler or a signal handler."""
+        if not self.active:
+            self.pending = True
+
+    def tick(self):
+        """Call once per presented frame."""
+        if not (self.pending or self.active):
+            return
+        if self.pending:
+            self.pending = False
+            self._start()
+            return
+        self._remaining -= 1
+        if self._remaining <= 0:
+            self._finish()
+
+    def _start(self):
+        self.active = True
+        self._remaining = self.frames
+        self._start_time = time.perf_counter()
+        if self.mode == "SAMPLING":
+            self._collector = _StackSampler(self.sample_interval)
+            self._collector.start()
+        else:
+            self._collector = _CallTracer()
+            sys.setprofile(self._collector)
+        print(f"[profiler] profiling the next {self.frames} frames ({self.mode.lower()})")
+
+    def _finish(self):
+        if self.mode == "SAMPLING":
+            self._collector.stop()
+        else:
+            sys.setprofile(None)
+        elapsed = time.perf_counter() - self._start_time
+        self.active = False
+        self.last_outputs = self._write(self._collector, elapsed)
+        self._collector = None
+        print(f"[profiler] wrote {' and '.join(self.last_outputs)}")
+
+    def _write(self, collector, elapsed):
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"profile_{time.strftime('%Y%m%d_%H%M%S')}")
+
+        if self.mode == "SAMPLING":
+            # Value = samples; per-function times are estimates (samples x interval)
+            collapsed = collector.collapsed
+            rows = [
+                (name, None, collector.inclusive[name] * self.sample_interval, collector.exclusive[name] * self.sample_interval)
+                for name in collector.inclusive
+            ]
+            header = f"{collector.samples} samples every {self.sample_interval * 1000:.1f} ms, all threads"
+        else:
+            # Value = self time in microseconds (flamegraph tools expect integers)
+            collapsed = Counter({stack: int(seconds * 1e6) for stack, seconds in collector.collapsed.items()})
+            rows = [(name, stats[0], stats[1], stats[2]) for name, stats in collector.functions.items()]
+            header = "every call on the presenting thread (use SAMPLING to see THREADED pipeline workers)"
+
+        collapsed_path = base + ".collapsed"
+        with open(collapsed_path, "w") as f:
+            for stack, value in sorted(collapsed.items()):
+                if value > 0:
+                    f.write(f"{stack} {value}\n")
+
+        summary_path = base + ".txt"
+        with open(summary_path, "w") as f:
+            f.write(f"{self.frames} frames in {elapsed:.3f} s ({self.frames / elapsed:.1f} fps), {self.mode.lower()}: {header}\n\n")
+            hot = [row for row in rows if row[0].split(":")[-1] in HOT_PATHS]
+            f.write("Hot paths\n")
+            f.write(self._format_rows(sorted(hot, key=lambda row: -row[2]), elapsed))
+            f.write(f"\nTop {SUMMARY_TOP} by self time\n")
+            f.write(self._format_rows(sorted(rows, key=lambda row: -row[3])[:SUMMARY_TOP], elapsed))
+        return [collapsed_path, summary_path]
+
+    def _format_rows(self, rows, elapsed):
+        lines = [f"{'function':<60} {'calls':>8} {'incl ms/frame':>14} {'self ms/frame':>14} {'incl %':>7}"]
+        for name, calls, inclusive, exclusive in rows:
+            calls_text = "-" if calls is None else str(calls)
+            lines.append(
+                f"{name:<60} {calls_text:>8} {inclusive * 1000 / self.frames:>14.3f} "
+                f"{exclusive * 1000 / self.frames:>14.3f} {100 * inclusive / elapsed:>6.1f}%"
+            )
+        return "\n".join(lines) + "\n"
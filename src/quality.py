@@ -0,0 +1,93 @@
+import json
+import time
+from collections import deque, namedtuple
+from src.config import (
+    FPS,
+    QUALITY_LADDER,
+    QUALITY_DEGRADE_RATIO,
+    QUALITY_RECOVER_RATIO,
+    QUALITY_WINDOW,
+    QUALITY_HOLD_FRAMES,
+    QUALITY_LOG_PATH
+)
+
+QualityLevel = namedtuple("QualityLevel", ["name", "scale_factor", "face_height", "detect_interval", "gray"])
+
+
+class QualityController:
+    """Feedback controller that trades quality for speed to hold the FPS budget.
+
+    Callers report the host time spent on each frame with observe(). Once QUALITY_WINDOW
+    frames are in, a mean above budget * degrade_ratio moves one step down the ladder and a
+    mean below budget * recover_ratio moves one step back up. After a change the window
+    restarts and no further change happens for hold_frames frames.
+    """
+
+    def __init__(self, detectors, display, ladder=QUALITY_LADDER, target_fps=FPS,
+                 degrade_ratio=QUALITY_DEGRADE_RATIO, recover_ratio=QUALITY_RECOVER_RATIO,
+                 window=QUALITY_WINDOW, hold_frames=QUALITY_HOLD_FRAMES, log_path=QUALITY_LOG_PATH):
+        self.detectors = detectors if isinstance(detectors, (list, tuple)) else [detectors]
+        self.display = display
+        self.ladder = [QualityLevel(*level) for level in ladder]
+        self.budget = 1.0 / target_fps
+        self.degrade_ratio = degrade_ratio
+        self.recover_ratio = recover_ratio
+        self.hold_frames = hold_frames
+        self.log_path = log_path
+
+        self.samples = deque(maxlen=window)
+        self.frames_since_change = 0
+        self.level = 0
+        self.changes = []  # One dict per quality change, for tuning the ladder
+        self._apply(self.ladder[0])
+
+    @property
+    def current(self):
+        return self.ladder[self.level]
+
+    def observe(self, frame_time):
+        """Report the host time (seconds) one frame took; may change the quality level."""
+        self.samples.append(frame_time)
+        self.frames_since_change += 1
+        if len(self.samples) < self.samples.maxlen or self.frames_since_change < self.hold_frames:
+            return
+
+        mean_frame_time = sum(self.samples) / len(self.samples)
+        if mean_frame_time > self.budget * self.degrade_ratio and self.level < len(self.ladder) - 1:
+            self._change(self.level + 1, mean_frame_time)
+        elif mean_frame_time < self.budget * self.recover_ratio and self.level > 0:
+            self._change(self.level - 1, mean_frame_time)
+
+    def _change(self, level, mean_frame_time):
+        previous, previous_level = self.current, self.level
+        self.level = level
+        self._apply(self.current)
+        self.samples.clear()
+        self.frames_since_change = 0
+
+        change = {
+            "time": time.time(),
+            "from": previous.name,
+            "to": self.current.name,
+            "level": level,
+            "frame_time_ms": mean_frame_time * 1000.0,
+            "budget_ms": self.budget * 1000.0,
+            **self.current._asdict(),
+        }
+        self.changes.append(change)
+        direction = "degraded" if level > previous_level else "recovered"
+        print(f"[quality] {direction} {previous.name} -> {self.current.name} "
+              f"(frame time {change['frame_time_ms']:.1f} ms, budget {change['budget_ms']:.1f} ms)")
+        if self.log_path:
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(change) + "\n")
+
+    def _apply(self, quality):
+        for detector in self.detectors:
+            detector.cascade_scale_factor = quality.scale_factor
+            detector.detect_face_height = quality.face_height
+            if detector.eye_tracker is not None:
+                detector.eye_tracker.detect_interval = quality.detect_interval
+        with self.display.state_lock:
+            self.display.quality_gray = quality.gray
+            self.display.refresh_render_plan()
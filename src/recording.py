@@ -0,0 +1,402 @@
+"""Compact session recording and deterministic replay of frames plus NN detections.
+
+A session is a directory:
+    session.json               metadata (resolution, encoding, chunk list)
+    chunk_00000.frames         frame payloads back to back (raw BGR or JPEG), memory-mapped on replay
+    chunk_00000.index.npy      one INDEX_DTYPE record per frame
+    chunk_00000.dets.npy       (N, 6) float32 detections: label, confidence, xmin, ymin, xmax, ymax
+    events.jsonl               key presses, with the frame index they happened at
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+import cv2
+import numpy as np
+from src.config import RECORD_ENCODING, RECORD_JPEG_QUALITY, RECORD_SCALE, RECORD_CHUNK_FRAMES, RECORD_QUEUE_SIZE
+from src.sync import FramePacket
+
+FORMAT_VERSION = 1
+INDEX_DTYPE = np.dtype([
+    ("sequence", np.int64),
+    ("timestamp", np.float64),   # Device timestamp in seconds (host time if the source had none)
+    ("offset", np.int64),        # Byte offset of the frame payload in the chunk's .frames file
+    ("length", np.int64),
+    ("height", np.int32),
+    ("width", np.int32),
+    ("det_start", np.int64),     # First row in the chunk's .dets array
+    ("det_count", np.int32),     # -1 = no fresh detections for this frame
+])
+
+
+class SessionRecorder:
+    """Appends frames, detections and key events to a chunked on-disk session.
+
+    Frames are scaled, encoded and written on a background thread fed by a bounded queue, so
+    recording never holds up the capture loop. When the queue is full the frame is left out of
+    the session (and counted as dropped); key events stay aligned with the frames that were kept.
+    """
+
+    def __init__(self, path, encoding=RECORD_ENCODING, scale=RECORD_SCALE,
+                 jpeg_quality=RECORD_JPEG_QUALITY, chunk_frames=RECORD_CHUNK_FRAMES, queue_size=RECORD_QUEUE_SIZE):
+        self.path = path
+        self.encoding = encoding
+        self.scale = scale
+        self.jpeg_quality = jpeg_quality
+        self.chunk_frames = chunk_frames
+        os.makedirs(path, exist_ok=True)
+
+        self.frame_count = 0    # Frames accepted so far; the index of the next one in the session
+        self.dropped = 0        # Frames left out because the writer fell behind
+        self.frame_size = None  # (width, height) of the source frames
+        self.chunks = []
+        # Chunks and metadata are rewritten from scratch, so the events of an earlier take must go too
+        self._events = open(os.path.join(path, "events.jsonl"), "w")
+        self._start_chunk()
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._writer = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self._writer.start()
+
+    def _chunk_name(self, index):
+        return f"chunk_{index:05d}"
+
+    def _start_chunk(self):
+        name = self._chunk_name(len(self.chunks))
+        self._frames_file = open(os.path.join(self.path, name + ".frames"), "wb")
+        self._index = []
+        self._dets = []
+        self._offset = 0
+
+    def _finish_chunk(self):
+        name = self._chunk_name(len(self.chunks))
+        self._frames_file.close()
+        np.save(os.path.join(self.path, name + ".index.npy"), np.array(self._index, dtype=INDEX_DTYPE))
+        dets = np.array(self._dets, dtype=np.float32).reshape(-1, 6)
+        np.save(os.path.join(self.path, name + ".dets.npy"), dets)
+        self.chunks.append({"name": name, "frames": len(self._index)})
+        self._write_metadata()
+
+    def _write_metadata(self):
+        width, height = self.frame_size or (0, 0)
+        metadata = {
+            "version": FORMAT_VERSION,
+            "width": width,
+            "height": height,
+            "encoding": self.encoding,
+            "scale": self.scale,
+            "frame_count": sum(chunk["frames"] for chunk in self.chunks),
+            "chunks": self.chunks,
+        }
+        tmp_path = os.path.join(self.path, "session.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.path, "session.json"))
+
+    def record(self, frame, detections, sequence=None, timestamp=None):
+        """Queue one frame for recording; detections=None means the frame had no fresh NN result.
+
+        Returns False if the frame was dropped because the writer is behind.
+        """
+        if detections is None:
+            rows = None
+        else:
+            rows = [(getattr(detection, "label", 0), getattr(detection, "confidence", 1.0),
+                     detection.xmin, detection.ymin, detection.xmax, detection.ymax) for detection in detections]
+        item = (frame, rows,
+                self.frame_count if sequence is None else sequence,
+                time.monotonic() if timestamp is None else timestamp)
+        try:
+            # Frames come fresh from getCvFrame() or the replay and are not reused, so no copy is needed
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.frame_count += 1
+        return True
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            finally:
+                self.queue.task_done()
+
+    def _write(self, frame, rows, sequence, timestamp):
+        if self.frame_size is None:
+            self.frame_size = (frame.shape[1], frame.shape[0])
+        if self.scale != 1.0:
+            frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+        if self.encoding == "JPEG":
+            ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            payload = encoded.tobytes() if ok else b""
+        else:
+            payload = np.ascontiguousarray(frame).tobytes()
+        self._frames_file.write(payload)
+
+        det_start = len(self._dets)
+        if rows is None:
+            det_count = -1
+        else:
+            det_count = len(rows)
+            self._dets.extend(rows)
+
+        self._index.append((
+            sequence, timestamp, self._offset, len(payload), frame.shape[0], frame.shape[1], det_start, det_count,
+        ))
+        self._offset += len(payload)
+
+        if len(self._index) >= self.chunk_frames:
+            self._finish_chunk()
+            self._start_chunk()
+
+    def record_packet(self, packet):
+        self.record(packet.frame, packet.detections, packet.sequence, packet.timestamp)
+
+    def record_event(self, key):
+        self._events.write(json.dumps({"frame_index": self.frame_count, "time": time.time(), "key": key}) + "\n")
+        self._events.flush()
+
+    def close(self):
+        """Write every queued frame, then finish the last chunk and the metadata."""
+        self.queue.put(None)
+        self._writer.join()
+        if self.dropped:
+            print(f"Recording: {self.dropped} frames dropped because the writer fell behind")
+        if self._index:
+            self._finish_chunk()
+        else:
+            self._frames_file.close()
+            os.remove(self._frames_file.name)
+            self._write_metadata()
+        self._events.close()
+
+
+class ReplayDetection:
+    def __init__(self, label, confidence, xmin, ymin, xmax, ymax):
+        self.label = int(label)
+        self.confidence = float(confidence)
+        self.xmin = float(xmin)
+        self.ymin = float(ymin)
+        self.xmax = float(xmax)
+        self.ymax = float(ymax)
+
+
+class ReplayMessage:
+    """Mimics the parts of ImgFrame / ImgDetections the app uses."""
+
+    def __init__(self, sequence, timestamp, frame=None, detections=None):
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.frame = frame
+        self.detections = detections
+
+    def getSequenceNum(self):
+        return self.sequence
+
+    def getTimestamp(self):
+        return timedelta(seconds=self.timestamp)
+
+    def getCvFrame(self):
+        return self.frame
+
+
+class RecordedSession:
+    """Random access to a recorded session; frame payloads are memory-mapped, not loaded."""
+
+    def __init__(self, path, restore_size=True):
+        self.path = path
+        self.restore_size = restore_size
+        with open(os.path.join(path, "session.json")) as f:
+            self.metadata = json.load(f)
+        self.width = self.metadata["width"]
+        self.height = self.metadata["height"]
+        self.encoding = self.metadata["encoding"]
+
+        self._chunks = []
+        starts = []
+        total = 0
+        for chunk in self.metadata["chunks"]:
+            base = os.path.join(path, chunk["name"])
+            index = np.load(base + ".index.npy", mmap_mode="r")
+            dets = np.load(base + ".dets.npy", mmap_mode="r")
+            payload_size = int(index["offset"][-1] + index["length"][-1]) if len(index) else 0
+            frames = np.memmap(base + ".frames", dtype=np.uint8, mode="r") if payload_size else None
+            self._chunks.append((index, dets, frames))
+            starts.append(total)
+            total += len(index)
+        self._starts = np.array(starts, dtype=np.int64)
+        self.frame_count = total
+
+        self.events = []
+        events_path = os.path.join(path, "events.jsonl")
+        if os.path.exists(events_path):
+            with open(events_path) as f:
+                self.events = [json.loads(line) for line in f if line.strip()]
+
+    def __len__(self):
+        return self.frame_count
+
+    def _locate(self, frame_index):
+        if not 0 <= frame_index < self.frame_count:
+            raise IndexError(f"frame {frame_index} out of range (0-{self.frame_count - 1})")
+        chunk = int(np.searchsorted(self._starts, frame_index, side="right")) - 1
+        index, dets, frames = self._chunks[chunk]
+        return index[frame_index - self._starts[chunk]], dets, frames
+
+    def record_info(self, frame_index):
+        record, _, _ = self._locate(frame_index)
+        return int(record["sequence"]), float(record["timestamp"])
+
+    def frame(self, frame_index):
+        record, _, frames = self._locate(frame_index)
+        payload = frames[record["offset"]:record["offset"] + record["length"]]
+        if self.encoding == "JPEG":
+            frame = cv2.imdecode(np.asarray(payload), cv2.IMREAD_COLOR)
+        else:
+            frame = np.array(payload).reshape(record["height"], record["width"], 3)
+        if self.restore_size and self.width and (frame.shape[1], frame.shape[0]) != (self.width, self.height):
+            frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_LINEAR)
+        return frame
+
+    def detections(self, frame_index):
+        """Recorded detections for a frame, or None if it had no fresh NN result."""
+        record, dets, _ = self._locate(frame_index)
+        if record["det_count"] < 0:
+            return None
+        rows = dets[record["det_start"]:record["det_start"] + record["det_count"]]
+        return [ReplayDetection(*row) for row in rows]
+
+    def packet(self, frame_index):
+        sequence, timestamp = self.record_info(frame_index)
+        return FramePacket(self.frame(frame_index), self.detections(frame_index), sequence, timestamp)
+
+
+class ReplayQueue:
+    """Non-blocking queue stand-in fed by a ReplaySource."""
+
+    def __init__(self, source, stream):
+        self.source = source
+        self.stream = stream
+
+    def tryGet(self):
+        return self.source._next_message(self.stream)
+
+    def has(self):
+        return self.source._has_message(self.stream)
+
+
+class ReplaySource:
+    """Stands in for the DepthAI "rgb" and "nn" output queues, replaying a recorded session.
+
+    With realtime=True frames are released at their original timing; otherwise as fast as they
+    are consumed: one frame per read cycle (a new frame becomes available once the "nn" queue has
+    been polled), so a draining consumer never sees the whole session at once. Frames recorded
+    without fresh detections are replayed without an nn message.
+
+    Recorded key presses are handed out by events_for(sequence), to be applied before that frame
+    is composed, so display-mode toggles happen at the same frame as in the recording.
+    """
+
+    def __init__(self, session, realtime=False, loop=False, start=0, clock=time.monotonic):
+        self.session = session if isinstance(session, RecordedSession) else RecordedSession(session)
+        self.realtime = realtime
+        self.loop = loop
+        self.clock = clock
+        self.q_rgb = ReplayQueue(self, "rgb")
+        self.q_nn = ReplayQueue(self, "nn")
+
+        self.position = start
+        self.loops = 0
+        # Timestamps keep increasing across loops too: shift each loop by the session's duration
+        self._loop_span = 0.0
+        if len(self.session) > 1:
+            first, last = self.session.record_info(0)[1], self.session.record_info(len(self.session) - 1)[1]
+            self._loop_span = (last - first) * len(self.session) / (len(self.session) - 1)
+        self._pending_nn = []
+        self._awaiting_nn_poll = False
+        self._start_clock = None
+        self._start_timestamp = None
+
+        self._events = sorted(self.session.events, key=lambda event: event["frame_index"])
+        self._event_cursor = 0
+        self._released_events = OrderedDict()  # sequence -> keys due before that frame is composed
+        self._events_lock = threading.Lock()    # Released on the capture thread, consumed on another
+
+    @property
+    def finished(self):
+        return not self.loop and self.position >= len(self.session)
+
+    def _due(self):
+        """True if the frame at self.position may be released now."""
+        if self.finished or len(self.session) == 0:
+            return False
+        if not self.realtime:
+            return not self._awaiting_nn_poll
+        _, timestamp = self.session.record_info(self.position)
+        now = self.clock()
+        if self._start_clock is None:
+            self._start_clock, self._start_timestamp = now, timestamp
+        return now - self._start_clock >= timestamp - self._start_timestamp
+
+    def _has_message(self, stream):
+        if stream == "nn":
+            return bool(self._pending_nn)
+        return self._due()
+
+    def _next_message(self, stream):
+        if stream == "nn":
+            self._awaiting_nn_poll = False
+            return self._pending_nn.pop(0) if self._pending_nn else None
+        if not self._due():
+            return None
+
+        index = self.position
+        sequence, timestamp = self.session.record_info(index)
+        # Keep sequence numbers increasing across loops so synchronisation still works
+        sequence += self.loops * len(self.session)
+        timestamp += self.loops * self._loop_span
+        detections = self.session.detections(index)
+        if detections is not None:
+            self._pending_nn.append(ReplayMessage(sequence, timestamp, detections=detections))
+        self._release_events(index, sequence)
+
+        self.position += 1
+        self._awaiting_nn_poll = True
+        if self.loop and self.position >= len(self.session):
+            self.position = 0
+            self.loops += 1
+            self._start_clock = None
+            self._event_cursor = 0
+        return ReplayMessage(sequence, timestamp, frame=self.session.frame(index))
+
+    def _release_events(self, index, sequence):
+        # A key recorded at frame_index k was pressed after frame k-1 was shown, so it applies to frame k
+        keys = []
+        while self._event_cursor < len(self._events) and self._events[self._event_cursor]["frame_index"] <= index:
+            keys.append(self._events[self._event_cursor]["key"])
+            self._event_cursor += 1
+        if keys:
+            with self._events_lock:
+                self._released_events[sequence] = keys
+
+    def events_for(self, sequence):
+        """Recorded key presses due before the frame with this sequence number is composed.
+
+        Keys of earlier frames the consumer skipped (dropped by synchronisation or a full
+        queue) are included, so no toggle is lost.
+        """
+        keys = []
+        with self._events_lock:
+            while self._released_events:
+                released = next(iter(self._released_events))
+                if released > sequence:
+                    break
+                keys.extend(self._released_events.pop(released))
+        return keys
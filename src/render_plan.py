@@ -0,0 +1,62 @@
+import cv2
+import numpy as np
+from src.config import MAIN_TEXT_FONT_SCALE, MAIN_TEXT_FONT_WEIGHT, MAIN_TEXT_VERTICAL_OFFSET, AVAILABLE_FONTS
+
+NO_EYES_LINES = [
+    "WATCHING YOU LOOKING",
+    "AT EVERYTHING BUT ME",
+]
+NO_EYES_LINE_SPACING = 20  # Space between lines
+
+
+class RenderPlan:
+    """Screen layout compiled once from (display mode, grid, font, flip, colour).
+
+    Display rebuilds it only when a key press changes one of those settings. It holds the
+    prerendered no-eyes screen and the FULL_GRID cell assignment per eye count; flip and
+    grayscale are applied per eye crop by the compositor rather than to whole frames.
+    """
+
+    def __init__(self, width, height, rows, cols, display_mode, font_index, vertical_flip, color):
+        self.width = width
+        self.height = height
+        self.rows = rows
+        self.cols = cols
+        self.display_mode = display_mode
+        self.font_index = font_index
+        self.vertical_flip = vertical_flip
+        self.color = color
+
+        self.no_eyes_screen = self._render_no_eyes()
+        self._full_grid_cells = {}  # num_eyes -> [cell indices per eye]
+
+    @property
+    def key(self):
+        return (self.display_mode, self.rows, self.cols, self.font_index, self.vertical_flip, self.color)
+
+    def _render_no_eyes(self):
+        font = AVAILABLE_FONTS[self.font_index]
+        text_sizes = [cv2.getTextSize(line, font, MAIN_TEXT_FONT_SCALE, MAIN_TEXT_FONT_WEIGHT)[0] for line in NO_EYES_LINES]
+        total_text_height = sum(h for w, h in text_sizes) + (len(NO_EYES_LINES) - 1) * NO_EYES_LINE_SPACING
+
+        # Text block centred vertically (plus offset), each line centred horizontally
+        start_y = (self.height - total_text_height) // 2 + MAIN_TEXT_VERTICAL_OFFSET
+        screen = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        for i, line in enumerate(NO_EYES_LINES):
+            text_x = (self.width - text_sizes[i][0]) // 2
+            text_y = start_y + sum(text_sizes[j][1] for j in range(i)) + i * NO_EYES_LINE_SPACING
+            cv2.putText(screen, line, (text_x, text_y), font, MAIN_TEXT_FONT_SCALE, (255, 255, 255), MAIN_TEXT_FONT_WEIGHT)
+
+        if self.vertical_flip:
+            screen = cv2.flip(screen, 0)
+        screen.flags.writeable = False  # Shared by every no-eyes frame until the plan changes
+        return screen
+
+    def full_grid_cells(self, num_eyes):
+        """Cells for each eye in FULL_GRID: eye i goes to cells i, i + num_eyes, i + 2 * num_eyes, ..."""
+        cells = self._full_grid_cells.get(num_eyes)
+        if cells is None:
+            total_positions = self.rows * self.cols
+            cells = [list(range(eye_index, total_positions, num_eyes)) for eye_index in range(min(num_eyes, total_positions))]
+            self._full_grid_cells[num_eyes] = cells
+        return cells
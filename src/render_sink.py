@@ -0,0 +1,240 @@
+import multiprocessing
+import os
+import queue
+import sys
+import cv2
+import numpy as np
+from multiprocessing import shared_memory
+from src.config import RENDER_SINK, RENDER_RING_SLOTS, RAW_VIDEO_PATH
+
+WINDOW_NAME = 'Eye Detection'
+NO_KEY = 255  # What cv2.waitKey(...) & 0xFF gives when no key was pressed
+
+
+class WindowSink:
+    """Shows screens in an OpenCV window in this process."""
+
+    def __init__(self, width, height, window_name=WINDOW_NAME):
+        self.width = width
+        self.height = height
+        self.window_name = window_name
+        self._window_created = False
+        self._fullscreen = None  # Unknown until the first frame
+
+    def show(self, output_screen, fullscreen):
+        if not self._window_created:
+            cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
+            self._window_created = True
+        if fullscreen != self._fullscreen:
+            _apply_fullscreen(self.window_name, fullscreen, self.width, self.height)
+            self._fullscreen = fullscreen
+        cv2.imshow(self.window_name, output_screen)
+
+    def poll_key(self, delay=1):
+        return cv2.waitKey(delay) & 0xFF
+
+    def close(self):
+        cv2.destroyAllWindows()
+
+
+def _apply_fullscreen(window_name, fullscreen, width, height):
+    # Window properties are only touched when the fullscreen state actually changes
+    if fullscreen:
+        cv2.setWindowProperty(window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+    else:
+        cv2.setWindowProperty(window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_NORMAL)
+        cv2.resizeWindow(window_name, width, height)
+
+
+class SharedFrameRing:
+    """Ring of frame slots in multiprocessing shared memory with sequence counters.
+
+    Header (int64): [latest published sequence, closed flag, sequence stored in each slot...].
+    A slot's sequence is -1 while it is being written, so readers can skip torn frames.
+    """
+
+    def __init__(self, width, height, slots=RENDER_RING_SLOTS, name=None):
+        self.width = width
+        self.height = height
+        self.slots = slots
+        self.frame_bytes = width * height * 3
+        self.header_bytes = 8 * (2 + slots)
+
+        create = name is None
+        self.shm = shared_memory.SharedMemory(
+            name=name, create=create, size=self.header_bytes + slots * self.frame_bytes
+        )
+        self.header = np.ndarray((2 + slots,), dtype=np.int64, buffer=self.shm.buf[:self.header_bytes])
+        self.frames = [
+            np.ndarray((height, width, 3), dtype=np.uint8,
+                       buffer=self.shm.buf[self.header_bytes + i * self.frame_bytes:self.header_bytes + (i + 1) * self.frame_bytes])
+            for i in range(slots)
+        ]
+        if create:
+            self.header[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def publish(self, output_screen):
+        sequence = int(self.header[0]) + 1
+        slot = sequence % self.slots
+        self.header[2 + slot] = -1
+        self.frames[slot][...] = output_screen
+        self.header[2 + slot] = sequence
+        self.header[0] = sequence
+        return sequence
+
+    def latest(self):
+        """(sequence, frame view) of the newest complete frame, or (0, None). The view is zero-copy."""
+        sequence = int(self.header[0])
+        if sequence == 0:
+            return 0, None
+        slot = sequence % self.slots
+        if self.header[2 + slot] != sequence:
+            return sequence, None  # Being overwritten right now
+        return sequence, self.frames[slot]
+
+    def is_stale(self, sequence):
+        """True if the slot holding `sequence` has been rewritten since it was read."""
+        return self.header[2 + sequence % self.slots] != sequence
+
+    @property
+    def closed(self):
+        return bool(self.header[1])
+
+    def close(self, unlink=False):
+        if unlink:
+            self.header[1] = 1
+        # Drop our numpy views before releasing the mapping
+        self.header = None
+        self.frames = []
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _presenter_main(ring_name, width, height, slots, control_queue, key_queue):
+    """Presenter process: shows the newest ring frame and forwards key presses back."""
+    ring = SharedFrameRing(width, height, slots, name=ring_name)
+    cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_NORMAL)
+    fullscreen = None
+    last_sequence = 0
+    try:
+        while not ring.closed:
+            try:
+                while True:
+                    command, value = control_queue.get_nowait()
+                    if command == "fullscreen" and value != fullscreen:
+                        _apply_fullscreen(WINDOW_NAME, value, width, height)
+                        fullscreen = value
+            except queue.Empty:
+                pass
+
+            sequence, frame = ring.latest()
+            if frame is not None and sequence != last_sequence:
+                cv2.imshow(WINDOW_NAME, frame)
+                # If the writer lapped the ring during imshow the frame may be torn; show again next time
+                last_sequence = 0 if ring.is_stale(sequence) else sequence
+
+            key = cv2.waitKey(1) & 0xFF
+            if key != NO_KEY:
+                key_queue.put(key)
+    finally:
+        frame = None  # Release the shared-memory view before unmapping
+        cv2.destroyAllWindows()
+        ring.close()
+
+
+class SharedMemorySink:
+    """Publishes screens into a SharedFrameRing; a separate presenter process shows them."""
+
+    def __init__(self, width, height, slots=RENDER_RING_SLOTS):
+        self.ring = SharedFrameRing(width, height, slots)
+        self.control_queue = multiprocessing.Queue()
+        self.key_queue = multiprocessing.Queue()
+        self._fullscreen = None
+        self.process = multiprocessing.Process(
+            target=_presenter_main,
+            args=(self.ring.name, width, height, slots, self.control_queue, self.key_queue),
+            name="presenter",
+            daemon=True,
+        )
+        self.process.start()
+
+    def show(self, output_screen, fullscreen):
+        if fullscreen != self._fullscreen:
+            self.control_queue.put(("fullscreen", fullscreen))
+            self._fullscreen = fullscreen
+        self.ring.publish(output_screen)
+
+    def poll_key(self, delay=1):
+        try:
+            return self.key_queue.get_nowait()
+        except queue.Empty:
+            return NO_KEY
+
+    def close(self):
+        self.ring.header[1] = 1  # Ask the presenter to exit
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close(unlink=True)
+
+
+class RawVideoSink:
+    """Writes raw BGR24 frames to a file or, with path "-", to stdout (e.g. piped into ffmpeg).
+
+    Stdout is written through a private duplicate of its file descriptor; sys.stdout itself is
+    left alone, so whoever runs the sink decides where console messages go (main.py sends them
+    to stderr). There is no keyboard: stop it with Ctrl-C (SIGINT, see main.py).
+    """
+
+    def __init__(self, width, height, path=RAW_VIDEO_PATH):
+        self.width = width
+        self.height = height
+        self.path = path
+        self.uses_stdout = path == "-"
+        if self.uses_stdout:
+            sys.stdout.flush()
+            self._file = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+        else:
+            self._file = open(path, "wb")
+        self.frames_written = 0
+
+    def show(self, output_screen, fullscreen):
+        self._file.write(np.ascontiguousarray(output_screen).data)
+        self.frames_written += 1
+
+    def poll_key(self, delay=1):
+        return NO_KEY  # Headless: no keyboard
+
+    def close(self):
+        self._file.close()
+
+
+class NullSink:
+    """Discards screens; for benchmarking everything except presentation. Stop it with Ctrl-C."""
+
+    def __init__(self, width=None, height=None):
+        self.frames_shown = 0
+
+    def show(self, output_screen, fullscreen):
+        self.frames_shown += 1
+
+    def poll_key(self, delay=1):
+        return NO_KEY
+
+    def close(self):
+        pass
+
+
+def create_sink(width, height, kind=RENDER_SINK):
+    if kind == "SHARED_MEMORY":
+        return SharedMemorySink(width, height)
+    if kind == "RAW_VIDEO":
+        return RawVideoSink(width, height)
+    if kind == "NULL":
+        return NullSink(width, height)
+    return WindowSink(width, height)
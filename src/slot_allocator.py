@@ -0,0 +1,52 @@
+import random
+
+
+class SlotAllocator:
+    """Indexed pool of free grid cells.
+
+    Free cells live in a list plus a {cell: list index} map, so a random free cell can be taken
+    and a cell can be handed back in O(1) (swap-with-last removal).
+    """
+
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.reset()
+
+    def reset(self):
+        """Mark every grid cell as free."""
+        self._free = [(row, col) for row in range(self.rows) for col in range(self.cols)]
+        self._free_index = {slot: i for i, slot in enumerate(self._free)}
+
+    def allocate(self):
+        """Take a random free (row, col) cell, or return None if the grid is full."""
+        if not self._free:
+            return None
+        slot = self._free[random.randrange(len(self._free))]
+        self._remove(slot)
+        return slot
+
+    def release(self, slot):
+        """Hand a cell back to the free pool."""
+        if slot in self._free_index:
+            return
+        self._free_index[slot] = len(self._free)
+        self._free.append(slot)
+
+    def release_all(self, slots):
+        for slot in slots:
+            self.release(slot)
+
+    def is_free(self, slot):
+        return slot in self._free_index
+
+    def free_count(self):
+        return len(self._free)
+
+    def _remove(self, slot):
+        index = self._free_index.pop(slot)
+        last = self._free.pop()
+        if last != slot:
+            # Move the last free cell into the hole left by the removed one
+            self._free[index] = last
+            self._free_index[last] = index
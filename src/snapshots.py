@@ -0,0 +1,151 @@
+import os
+import queue
+import threading
+import time
+import cv2
+from src.config import (
+    SNAPSHOT_DIR,
+    SNAPSHOT_FORMAT,
+    SNAPSHOT_PNG_COMPRESSION,
+    SNAPSHOT_QUALITY,
+    SNAPSHOT_WORKERS,
+    SNAPSHOT_QUEUE_SIZE,
+    SNAPSHOT_BURST_FRAMES,
+    SNAPSHOT_TIMELAPSE_INTERVAL
+)
+
+EXTENSIONS = {"PNG": ".png", "JPEG": ".jpg", "WEBP": ".webp"}
+
+
+def encoder_params(encoding, png_compression=SNAPSHOT_PNG_COMPRESSION, quality=SNAPSHOT_QUALITY):
+    if encoding == "PNG":
+        return [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+    if encoding == "JPEG":
+        return [cv2.IMWRITE_JPEG_QUALITY, quality]
+    if encoding == "WEBP":
+        return [cv2.IMWRITE_WEBP_QUALITY, quality]
+    raise ValueError(f"Unknown snapshot format: {encoding}")
+
+
+class SnapshotWriter:
+    """Encodes and writes snapshots on background threads fed by a bounded queue.
+
+    submit() copies the screen and returns at once. When the queue is full the snapshot is
+    skipped (and counted as dropped) so rendering never waits for the encoder.
+    Worker threads start on the first submit.
+    """
+
+    def __init__(self, directory=SNAPSHOT_DIR, encoding=SNAPSHOT_FORMAT, png_compression=SNAPSHOT_PNG_COMPRESSION,
+                 quality=SNAPSHOT_QUALITY, workers=SNAPSHOT_WORKERS, queue_size=SNAPSHOT_QUEUE_SIZE):
+        self.directory = directory
+        self.extension = EXTENSIONS[encoding]
+        self.params = encoder_params(encoding, png_compression, quality)
+        self.worker_count = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.workers = []
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def _start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        for index in range(self.worker_count):
+            worker = threading.Thread(target=self._run, name=f"snapshot-{index}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def submit(self, image, prefix="snap"):
+        """Queue a copy of image for writing; returns the file name, or None if it was dropped."""
+        if not self.workers:
+            self._start()
+        self._counter += 1
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        filename = os.path.join(self.directory, f"{prefix}_{timestamp}_{self._counter:04d}{self.extension}")
+        try:
+            # Output buffers are reused, so the writer needs its own copy
+            self.queue.put_nowait((filename, image.copy()))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return None
+        return filename
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                filename, image = item
+                ok = cv2.imwrite(filename, image, self.params)
+                with self._lock:
+                    if ok:
+                        self.written += 1
+                    else:
+                        self.failed += 1
+                print(f"Image saved: {filename}" if ok else f"Failed to save image: {filename}")
+            finally:
+                self.queue.task_done()
+
+    def close(self):
+        """Finish writing everything queued, then stop the workers."""
+        if not self.workers:
+            return
+        self.queue.join()
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join(timeout=2.0)
+        self.workers = []
+
+
+class SnapshotCapture:
+    """Single, burst and time-lapse capture on top of a SnapshotWriter.
+
+    on_frame() is called with every presented screen and submits the ones a running
+    burst or time-lapse wants. A burst is submitted faster than it is encoded, so the default
+    writer's queue holds at least a whole burst.
+    """
+
+    def __init__(self, writer=None, burst_frames=SNAPSHOT_BURST_FRAMES,
+                 timelapse_interval=SNAPSHOT_TIMELAPSE_INTERVAL, clock=time.monotonic):
+        if writer is None:
+            writer = SnapshotWriter(queue_size=max(SNAPSHOT_QUEUE_SIZE, burst_frames))
+        self.writer = writer
+        self.burst_frames = burst_frames
+        self.timelapse_interval = timelapse_interval
+        self.clock = clock
+        self.burst_remaining = 0
+        self.timelapse = False
+        self._next_timelapse = None
+
+    def single(self, image):
+        return self.writer.submit(image, "snap")
+
+    def start_burst(self, frames=None):
+        self.burst_remaining = frames or self.burst_frames
+        print(f"Burst: capturing {self.burst_remaining} frames")
+
+    def toggle_timelapse(self):
+        self.timelapse = not self.timelapse
+        self._next_timelapse = self.clock() if self.timelapse else None
+        print(f"Time-lapse {'on, every ' + str(self.timelapse_interval) + ' s' if self.timelapse else 'off'}")
+
+    def on_frame(self, image):
+        if self.burst_remaining > 0:
+            self.burst_remaining -= 1
+            self.writer.submit(image, "burst")
+        if self.timelapse:
+            now = self.clock()
+            if now >= self._next_timelapse:
+                self.writer.submit(image, "timelapse")
+                # Keep to the schedule, but never queue up missed shots
+                self._next_timelapse = max(self._next_timelapse + self.timelapse_interval, now)
+
+    def get_stats(self):
+        return {"written": self.writer.written, "dropped": self.writer.dropped, "failed": self.writer.failed}
+
+    def close(self):
+        self.writer.close()
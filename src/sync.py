@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from src.config import SYNC_MATCH_BY, SYNC_BUFFER_SIZE, SYNC_MAX_STALENESS, QUEUE_POLL_INTERVAL
+
+# detections is None when the frame has no fresh NN result (callers reuse the last eye boxes)
+FramePacket = namedtuple("FramePacket", ["frame", "detections", "sequence", "timestamp"])
+
+
+def message_timestamp(message):
+    """Device timestamp of a DepthAI message in seconds."""
+    return message.getTimestamp().total_seconds()
+
+
+class FrameSynchronizer:
+    """Pairs ImgFrame and ImgDetections messages coming from two queues.
+
+    Messages are matched by sequence number (or device timestamp) inside a bounded reorder
+    buffer. A frame still unmatched once a newer frame is more than max_staleness seconds ahead of it
+    - or once detections for later frames have arrived - is released without detections.
+
+    Queues only need a non-blocking tryGet(); messages need getSequenceNum() and getTimestamp().
+    """
+
+    def __init__(self, match_by=SYNC_MATCH_BY, max_buffer=SYNC_BUFFER_SIZE, max_staleness=SYNC_MAX_STALENESS):
+        self.match_by = match_by
+        self.max_buffer = max_buffer
+        self.max_staleness = max_staleness
+        self.frames = OrderedDict()      # key -> ImgFrame, in arrival order
+        self.detections = OrderedDict()  # key -> ImgDetections, in arrival order
+
+        self.matched = 0
+        self.unmatched = 0  # Frames released without detections
+        self.dropped = 0    # Frames skipped because a newer one was released
+
+    def _key(self, message):
+        if self.match_by == "TIMESTAMP":
+            return round(message_timestamp(message), 6)
+        return message.getSequenceNum()
+
+    def _add(self, buffer, message):
+        buffer[self._key(message)] = message
+        while len(buffer) > self.max_buffer:
+            buffer.popitem(last=False)
+            if buffer is self.frames:
+                self.dropped += 1
+
+    def poll(self, q_rgb, q_nn):
+        """Drain both queues and return (frame_message, detections_message or None), or None."""
+        message = q_rgb.tryGet()
+        while message is not None:
+            self._add(self.frames, message)
+            message = q_rgb.tryGet()
+        message = q_nn.tryGet()
+        while message is not None:
+            self._add(self.detections, message)
+            message = q_nn.tryGet()
+
+        if not self.frames:
+            return None
+
+        # Newest frame that has its detections
+        matched_keys = [key for key in self.frames if key in self.detections]
+        if matched_keys:
+            key = max(matched_keys)
+            self.matched += 1
+            return self._release(key, self.detections[key])
+
+        # Newest frame that will never get detections (too old, or detections have moved past it)
+        newest_frame_time = max(message_timestamp(frame) for frame in self.frames.values())
+        newest_detection_key = max(self.detections) if self.detections else None
+        expired_keys = [
+            key for key, frame in self.frames.items()
+            if newest_frame_time - message_timestamp(frame) > self.max_staleness
+            or (newest_detection_key is not None and key < newest_detection_key)
+        ]
+        if expired_keys:
+            self.unmatched += 1
+            return self._release(max(expired_keys), None)
+
+        return None
+
+    def _release(self, key, detections):
+        frame = self.frames.pop(key)
+        # Everything older than the released frame is superseded
+        for old_key in [k for k in self.frames if k < key]:
+            del self.frames[old_key]
+            self.dropped += 1
+        for old_key in [k for k in self.detections if k <= key]:
+            del self.detections[old_key]
+        return frame, detections
+
+
+class MessageWaiter:
+    """Blocks until one of the queues has a new message, instead of spinning on tryGet().
+
+    DepthAI output queues wake it through addCallback(). Queues without callbacks (replay,
+    fakes) are checked with has() every QUEUE_POLL_INTERVAL seconds while waiting.
+    Messages are still read with tryGet() afterwards; the waiter only says when to look.
+    """
+
+    def __init__(self, queues, poll_interval=QUEUE_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._event = threading.Event()
+        self._polled = []
+        for queue in queues:
+            if hasattr(queue, "addCallback"):
+                queue.addCallback(self._on_message)
+            else:
+                self._polled.append(queue)
+
+    def _on_message(self, *args):
+        self._event.set()  # Called from the DepthAI callback thread
+
+    def wait(self, timeout):
+        """Return True once a message may be waiting, False if the timeout passed without one."""
+        if not self._polled:
+            woken = self._event.wait(timeout)
+        else:
+            deadline = time.monotonic() + timeout
+            woken = self._event.is_set() or any(queue.has() for queue in self._polled)
+            while not woken and time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                woken = self._event.is_set() or any(queue.has() for queue in self._polled)
+        # Cleared before the caller drains the queues, so a message arriving meanwhile wakes the next wait
+        self._event.clear()
+        return woken
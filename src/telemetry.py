@@ -0,0 +1,198 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from src.config import (
+    TELEMETRY_INTERVAL,
+    TELEMETRY_HISTORY,
+    TELEMETRY_HTTP_PORT,
+    TELEMETRY_JSONL_PATH,
+    TELEMETRY_JSONL_MAX_BYTES,
+    TELEMETRY_JSONL_BACKUPS
+)
+
+
+class TelemetrySampler(threading.Thread):
+    """Background sampler combining device readings with host-side counters.
+
+    Device readings come from PerformanceMonitor.read_system_info, which drains the system
+    logger queue with tryGet() and never blocks; any object with tryGet() can stand in for it.
+    The frame loop only calls record_timing / count, which take a lock and append to a ring buffer.
+    """
+
+    def __init__(self, performance_monitor=None, system_queue=None, interval=TELEMETRY_INTERVAL,
+                 history=TELEMETRY_HISTORY, jsonl_path=TELEMETRY_JSONL_PATH):
+        super().__init__(name="telemetry", daemon=True)
+        self.performance_monitor = performance_monitor
+        self.system_queue = system_queue
+        self.interval = interval
+        self.history = history
+        self.stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+        self.series = {}        # name -> deque of (time, value), sampled every interval
+        self.timings = {}       # name -> deque of recent durations in seconds
+        self.counters = {}      # name -> running total
+        self.gauges = {}        # name -> callable returning the current value
+        self._last_counters = {}
+        self._last_sample_time = None
+
+        self.exporter = JsonlExporter(jsonl_path) if jsonl_path else None
+
+    def record_timing(self, name, seconds):
+        with self._lock:
+            if name not in self.timings:
+                self.timings[name] = deque(maxlen=self.history)
+            self.timings[name].append(seconds)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_gauge(self, name, func):
+        """Register func() to be sampled every interval (e.g. a queue's drop counter)."""
+        with self._lock:
+            self.gauges[name] = func
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self.stop_event.set()
+        self.join(timeout=2 * self.interval)
+        if self.exporter is not None:
+            self.exporter.close()
+
+    def sample(self):
+        """Take one sample of every source and append it to the ring-buffered series."""
+        now = time.time()
+        values = {}
+
+        if self.performance_monitor is not None and self.system_queue is not None:
+            system_info = self.performance_monitor.read_system_info(self.system_queue)
+            if system_info is not None:
+                values.update({f"device_{key}": value for key, value in system_info.items()})
+
+        with self._lock:
+            elapsed = now - self._last_sample_time if self._last_sample_time else None
+            for name, total in self.counters.items():
+                values[name] = total
+                if elapsed:
+                    values[f"{name}_per_second"] = (total - self._last_counters.get(name, 0)) / elapsed
+            self._last_counters = dict(self.counters)
+            self._last_sample_time = now
+
+            for name, durations in self.timings.items():
+                if durations:
+                    ms = np.asarray(durations) * 1000.0
+                    values[f"{name}_p50_ms"] = float(np.percentile(ms, 50))
+                    values[f"{name}_p95_ms"] = float(np.percentile(ms, 95))
+            gauges = list(self.gauges.items())
+
+        for name, func in gauges:
+            try:
+                values[name] = func()
+            except Exception as error:  # A broken gauge must not kill the sampler
+                print(f"Telemetry gauge {name} failed: {error}")
+
+        with self._lock:
+            for name, value in values.items():
+                if name not in self.series:
+                    self.series[name] = deque(maxlen=self.history)
+                self.series[name].append((now, value))
+
+        if self.exporter is not None:
+            self.exporter.write({"time": now, **values})
+        return values
+
+    def snapshot(self):
+        """Latest value of every series."""
+        with self._lock:
+            return {name: points[-1][1] for name, points in self.series.items() if points}
+
+    def format_text(self):
+        """Plain-text exposition, one "name value" line per metric."""
+        lines = []
+        for name, value in sorted(self.snapshot().items()):
+            if isinstance(value, (int, float, np.integer, np.floating)):
+                lines.append(f"ins_{name} {float(value):.6g}")
+        return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def stage_timer(telemetry, name):
+    """Record the duration of the with-block as timing `name`; no-op when telemetry is None."""
+    if telemetry is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        telemetry.record_timing(name, time.perf_counter() - start)
+
+
+class JsonlExporter:
+    """Appends one JSON object per sample, rotating file -> file.1 -> ... when it gets too big."""
+
+    def __init__(self, path, max_bytes=TELEMETRY_JSONL_MAX_BYTES, backups=TELEMETRY_JSONL_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file = open(path, "a")
+
+    def write(self, record):
+        self._file.write(json.dumps(record, default=float) + "\n")
+        self._file.flush()
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "a")
+
+    def close(self):
+        self._file.close()
+
+
+class TelemetryHttpServer:
+    """Serves the sampler's text exposition on http://127.0.0.1:<port>/metrics from a daemon thread."""
+
+    def __init__(self, sampler, port=TELEMETRY_HTTP_PORT, host="127.0.0.1"):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = sampler.format_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # Keep the console for the installation's own messages
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="telemetry-http", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,295 @@
+import time
+import types
+from collections import defaultdict
+import numpy as np
+import pytest
+from src import eye_crops
+from src.boxes import EyeBox
+from src.eye_crops import CROP_SCRIPT, DeviceEyeCropper, build_crop_graph
+
+MAX_CROPS = 4
+
+
+class FakeRects:
+    """What rects_message carries, without depthai: a sequence number and normalised rectangles."""
+
+    def __init__(self, rects, sequence):
+        self.sequence = sequence
+        self.detections = [types.SimpleNamespace(xmin=x1, ymin=y1, xmax=x2, ymax=y2) for x1, y1, x2, y2 in rects]
+
+    def getSequenceNum(self):
+        return self.sequence
+
+
+@pytest.fixture(autouse=True)
+def plain_rects_message(monkeypatch):
+    monkeypatch.setattr(eye_crops, "rects_message", FakeRects)
+
+
+class FakeCrop:
+    def __init__(self, tag, index):
+        self.tag = tag
+        self.image = np.full((4, 4, 3), index, dtype=np.uint8)
+
+    def getSequenceNum(self):
+        return self.tag
+
+    def getCvFrame(self):
+        return self.image
+
+
+class FakeDevice:
+    """send() takes rectangles, tryGet() returns crops tagged like the crop script's.
+
+    Batches are held back while delayed is set, like a device that misses the timeout.
+    """
+
+    def __init__(self):
+        self.delayed = False
+        self.held = []
+        self.out = []
+
+    def send(self, message):
+        sequence = message.getSequenceNum()
+        crops = [FakeCrop(sequence * MAX_CROPS + index, index + 1) for index in range(len(message.detections))]
+        (self.held if self.delayed else self.out).extend(crops)
+
+    def release(self):
+        self.out.extend(self.held)
+        self.held = []
+
+    def tryGet(self):
+        return self.out.pop(0) if self.out else None
+
+
+def make_cropper(device, timeout=0.005):
+    return DeviceEyeCropper(device, device, transfer="NV12", max_crops=MAX_CROPS, timeout=timeout, poll_interval=0.001)
+
+
+FRAME = np.zeros((100, 200, 3), dtype=np.uint8)
+EYES = [EyeBox((10, 10, 30, 20), 1), EyeBox((50, 10, 70, 20), 2)]
+
+
+def test_crops_are_attached_by_index():
+    device = FakeDevice()
+    eyes = make_cropper(device).attach(EYES, FRAME, sequence=7)
+    assert [eye.image[0, 0, 0] for eye in eyes] == [1, 2]
+    assert [eye.eye_id for eye in eyes] == [1, 2]
+    assert tuple(eyes[0]) == (10, 10, 30, 20)
+
+
+def test_rectangles_are_sent_normalised_with_the_frame_sequence():
+    sent = []
+    device = FakeDevice()
+    device.send = sent.append
+    make_cropper(device).attach(EYES, FRAME, sequence=7)
+    assert sent[0].getSequenceNum() == 7
+    first = sent[0].detections[0]
+    assert (first.xmin, first.ymin, first.xmax, first.ymax) == (0.05, 0.1, 0.15, 0.2)
+
+
+def test_timeout_leaves_eyes_to_the_host_crop():
+    device = FakeDevice()
+    device.delayed = True
+    cropper = make_cropper(device, timeout=0.03)
+    start = time.perf_counter()
+    eyes = cropper.attach(EYES, FRAME, sequence=7)
+    waited = time.perf_counter() - start
+    assert [eye.image for eye in eyes] == [None, None]
+    assert cropper.get_stats()["fallbacks"] == 2
+    assert 0.03 <= waited < 0.5  # Gives up at the timeout instead of blocking on the device
+
+
+def test_late_crops_are_discarded_and_later_frames_stay_aligned():
+    device = FakeDevice()
+    cropper = make_cropper(device)
+    device.delayed = True
+    cropper.attach(EYES, FRAME, sequence=7)
+
+    device.delayed = False
+    device.release()  # Frame 7's crops arrive ahead of frame 8's
+    eyes = cropper.attach(EYES[::-1], FRAME, sequence=8)
+    assert [eye.eye_id for eye in eyes] == [2, 1]
+    assert [eye.image[0, 0, 0] for eye in eyes] == [1, 2]
+    assert cropper.get_stats()["late"] == 2
+
+
+def test_partial_batch_keeps_the_crops_that_arrived():
+    device = FakeDevice()
+    cropper = make_cropper(device)
+    device.send = lambda message: device.out.append(FakeCrop(message.getSequenceNum() * MAX_CROPS + 1, 9))
+    eyes = cropper.attach(EYES, FRAME, sequence=3)
+    assert eyes[0].image is None and eyes[1].image[0, 0, 0] == 9
+
+
+def test_eyes_beyond_max_crops_fall_back():
+    device = FakeDevice()
+    eyes = [EyeBox((i * 10, 0, i * 10 + 5, 5), i) for i in range(MAX_CROPS + 2)]
+    attached = make_cropper(device).attach(eyes, FRAME, sequence=1)
+    assert sum(eye.image is not None for eye in attached) == MAX_CROPS
+    assert len(attached) == len(eyes)
+
+
+def test_eyes_without_a_sequence_are_returned_as_they_are():
+    device = FakeDevice()
+    assert make_cropper(device).attach(EYES, FRAME, sequence=None) is EYES
+    assert device.out == []
+
+
+class Port:
+    def __init__(self, node, name):
+        self.node = node
+        self.name = name
+        self.settings = {}
+
+    def link(self, other):
+        self.node.pipeline.links.append((f"{self.node.kind}.{self.name}", f"{other.node.kind}.{other.name}"))
+
+    def setBlocking(self, blocking):
+        self.settings["blocking"] = blocking
+
+    def setQueueSize(self, size):
+        self.settings["queue_size"] = size
+
+    def setWaitForMessage(self, wait):
+        self.settings["wait"] = wait
+
+
+class Ports(dict):
+    def __init__(self, node):
+        super().__init__()
+        self.node = node
+
+    def __missing__(self, name):
+        self[name] = Port(self.node, name)
+        return self[name]
+
+
+class Node:
+    """Records what build_crop_graph sets and links; any other setter is accepted and ignored."""
+
+    def __init__(self, pipeline, kind):
+        self.pipeline = pipeline
+        self.kind = kind
+        self.inputs = Ports(self)
+        self.outputs = Ports(self)
+        self.stream_name = None
+        self.script = None
+
+    def setStreamName(self, name):
+        self.stream_name = name
+
+    def setScript(self, script):
+        self.script = script
+
+    def __getattr__(self, name):
+        if name.startswith("set"):
+            return lambda *args: None
+        port = Port(self, name)  # out, input, inputImage, inputConfig, bitstream
+        setattr(self, name, port)
+        return port
+
+
+class StubPipeline:
+    def __init__(self):
+        self.links = []
+        self.nodes = defaultdict(list)
+
+    def __getattr__(self, name):
+        if not name.startswith("create"):
+            raise AttributeError(name)
+        kind = name[len("create"):]
+
+        def create():
+            node = Node(self, kind)
+            self.nodes[kind].append(node)
+            return node
+        return create
+
+
+@pytest.mark.parametrize("transfer,frame_type", [("BGR", "BGR888p"), ("NV12", "NV12")])
+def test_crop_graph_links_the_script_to_the_manip_and_the_streams(transfer, frame_type):
+    pipeline = StubPipeline()
+    camera = Node(pipeline, "Camera")
+    script, manip = build_crop_graph(pipeline, camera.video, transfer=transfer, crop_size=(64, 32), max_crops=3, history=5)
+
+    assert set(pipeline.links) == {
+        ("Camera.video", "Script.frame"),
+        ("XLinkIn.out", "Script.rects"),
+        ("Script.manip_cfg", "ImageManip.inputConfig"),
+        ("Script.manip_img", "ImageManip.inputImage"),
+        ("ImageManip.out", "Script.crop"),
+        ("Script.crops", "XLinkOut.input"),
+    }
+    assert pipeline.nodes["XLinkIn"][0].stream_name == eye_crops.RECTS_STREAM
+    assert pipeline.nodes["XLinkOut"][0].stream_name == eye_crops.CROPS_STREAM
+    assert script.inputs["frame"].settings == {"blocking": False, "queue_size": 5}
+    assert manip.inputConfig.settings == {"wait": True}
+    assert f"ImgFrame.Type.{frame_type}" in script.script and "setResize(64, 32)" in script.script
+
+
+def test_unknown_transfer_is_rejected():
+    with pytest.raises(ValueError):
+        build_crop_graph(StubPipeline(), None, transfer="H265")
+
+
+class ScriptStop(Exception):
+    pass
+
+
+class ScriptQueue:
+    def __init__(self, messages=()):
+        self.messages = list(messages)
+        self.sent = []
+
+    def get(self):
+        if not self.messages:
+            raise ScriptStop  # Ends the script's loop once the test's messages are used up
+        return self.messages.pop(0)
+
+    def tryGet(self):
+        return self.messages.pop(0) if self.messages else None
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+class ScriptFrame:
+    def __init__(self, sequence):
+        self.sequence = sequence
+
+    def getSequenceNum(self):
+        return self.sequence
+
+    def setSequenceNum(self, sequence):
+        self.sequence = sequence
+
+
+class ScriptManipConfig:
+    def __getattr__(self, name):
+        return lambda *args: None
+
+
+def run_crop_script(frames, rects, max_crops=3, history=2):
+    """Runs CROP_SCRIPT with the Script node's io; each manip_img sent comes back as the crop."""
+    manip_img = ScriptQueue()
+    crop = ScriptQueue()
+    manip_img.send = lambda frame: crop.messages.append(ScriptFrame(frame.getSequenceNum()))
+    io = {"frame": ScriptQueue(frames), "rects": ScriptQueue(rects), "manip_cfg": ScriptQueue(),
+          "manip_img": manip_img, "crop": crop, "crops": ScriptQueue()}
+    script = CROP_SCRIPT.format(width=64, height=32, frame_type="NV12", max_crops=max_crops, history=history)
+    image_frame = types.SimpleNamespace(Type=types.SimpleNamespace(NV12="NV12"))
+    with pytest.raises(ScriptStop):
+        exec(script, {"node": types.SimpleNamespace(io=io), "ImageManipConfig": ScriptManipConfig,
+                      "ImgFrame": image_frame})
+    return [message.getSequenceNum() for message in io["crops"].sent]
+
+
+def test_crop_script_tags_crops_with_sequence_and_index():
+    tags = run_crop_script([ScriptFrame(9), ScriptFrame(10)], [FakeRects([(0, 0, 1, 1)] * 5, 10)])
+    assert tags == [30, 31, 32]  # Capped at max_crops; divmod(tag, 3) == (10, index)
+
+
+def test_crop_script_skips_frames_that_left_the_history():
+    frames = [ScriptFrame(sequence) for sequence in (7, 8, 9)]
+    assert run_crop_script(frames, [FakeRects([(0, 0, 1, 1)], 7)]) == []
@@ -0,0 +1,66 @@
+import hashlib
+import sys
+import types
+import pytest
+from src import model_cache
+
+BLOB = b"face-detection blob"
+BLOB_SHA256 = hashlib.sha256(BLOB).hexdigest()
+
+
+@pytest.fixture
+def model_zoo(tmp_path, monkeypatch):
+    """blobconverter stand-in serving BLOB; counts downloads."""
+    downloaded = tmp_path / "zoo.blob"
+    downloaded.write_bytes(BLOB)
+    zoo = types.SimpleNamespace(downloads=0)
+
+    def from_zoo(name, shaves):
+        zoo.downloads += 1
+        return str(downloaded)
+
+    monkeypatch.setitem(sys.modules, "blobconverter", types.SimpleNamespace(from_zoo=from_zoo))
+    return zoo
+
+
+def test_download_matching_the_pin_is_cached(tmp_path, model_zoo):
+    cache_dir = str(tmp_path / "models")
+    path = model_cache.resolve_model("face", 6, cache_dir, allow_download=True, sha256=BLOB_SHA256)
+    assert open(path, "rb").read() == BLOB
+    assert model_cache.resolve_model("face", 6, cache_dir, allow_download=False, sha256=BLOB_SHA256) == path
+    assert model_zoo.downloads == 1
+
+
+def test_download_not_matching_the_pin_is_rejected(tmp_path, model_zoo):
+    cache_dir = tmp_path / "models"
+    with pytest.raises(model_cache.ModelCacheError):
+        model_cache.resolve_model("face", 6, str(cache_dir), allow_download=True, sha256="0" * 64)
+    assert list(cache_dir.iterdir()) == []  # Neither the blob nor a manifest entry is kept
+
+
+def test_cached_blob_not_matching_the_pin_is_not_used(tmp_path, model_zoo):
+    cache_dir = str(tmp_path / "models")
+    model_cache.resolve_model("face", 6, cache_dir, allow_download=True, sha256=BLOB_SHA256)
+    with pytest.raises(model_cache.ModelCacheError):
+        model_cache.resolve_model("face", 6, cache_dir, allow_download=False, sha256="1" * 64)
+
+
+def test_tampered_cached_blob_is_not_used(tmp_path, model_zoo):
+    cache_dir = str(tmp_path / "models")
+    path = model_cache.resolve_model("face", 6, cache_dir, allow_download=True, sha256=BLOB_SHA256)
+    with open(path, "ab") as f:
+        f.write(b"!")
+    with pytest.raises(model_cache.ModelCacheError):
+        model_cache.resolve_model("face", 6, cache_dir, allow_download=False, sha256=BLOB_SHA256)
+
+
+def test_unpinned_model_is_refused(tmp_path, model_zoo):
+    with pytest.raises(model_cache.ModelCacheError):
+        model_cache.resolve_model("face", 6, str(tmp_path / "models"), allow_download=True, sha256=None, require_pin=True)
+    assert model_zoo.downloads == 0
+
+
+def test_prefetch_works_unpinned_to_get_the_hash(tmp_path, model_zoo, capsys):
+    path = model_cache.prefetch("face", 6, str(tmp_path / "models"), sha256=None)
+    assert open(path, "rb").read() == BLOB
+    assert BLOB_SHA256 in capsys.readouterr().out
@@ -0,0 +1,110 @@
+import threading
+from src.multi_source import EyePool, InputSource, MultiSourceRunner, fair_share
+from src.pacing import SimulatedClock
+from src.sync import FramePacket
+
+
+def test_fair_share_round_robins_sources():
+    merged = fair_share([["a1", "a2", "a3"], ["b1", "b2", "b3"]], capacity=4)
+    assert merged == ["a1", "b1", "a2", "b2"]
+
+
+def test_fair_share_gives_unused_share_to_other_sources():
+    merged = fair_share([["a1"], [], ["c1", "c2", "c3", "c4"]], capacity=4)
+    assert merged == ["a1", "c1", "c2", "c3"]
+
+
+def test_fair_share_with_room_to_spare_keeps_everything():
+    assert fair_share([["a1"], ["b1", "b2"]], capacity=10) == ["a1", "b1", "b2"]
+
+
+def test_pool_merges_only_live_sources():
+    clock = SimulatedClock()
+    pool = EyePool(["a", "b"], capacity=4, stale_after=1.0, clock=clock)
+    pool.publish("a", ["a1", "a2"])
+    clock.advance(0.5)
+    pool.publish("b", ["b1"])
+    assert pool.merged() == ["a1", "b1", "a2"]
+
+    clock.advance(0.6)  # "a" last published 1.1 s ago
+    assert pool.merged() == ["b1"]
+
+
+def test_stale_source_bumps_the_version_without_a_publish():
+    clock = SimulatedClock()
+    pool = EyePool(["a", "b"], stale_after=1.0, clock=clock)
+    pool.publish("a", ["a1"])
+    pool.publish("b", ["b1"])
+    version = pool.wait(0, timeout=0)
+    assert version == 2
+
+    clock.advance(0.5)
+    assert pool.wait(version, timeout=0) == version  # Nothing changed
+
+    clock.advance(0.6)
+    version = pool.wait(version, timeout=0)
+    assert version == 3
+    assert pool.merged() == []
+    assert pool.wait(version, timeout=0) == version  # Reported once
+
+
+class FakeReplay:
+    """Hands out a fixed number of frames on its "rgb" queue, then reports finished."""
+
+    def __init__(self, frames):
+        self.remaining = frames
+
+    @property
+    def finished(self):
+        return self.remaining == 0
+
+    def tryGet(self):
+        if self.finished:
+            return None
+        self.remaining -= 1
+        return self.remaining
+
+    def has(self):
+        return not self.finished
+
+
+class FakeDetector:
+    synchronizer = None
+
+    def read(self, q_rgb, q_nn):
+        sequence = q_rgb.tryGet()
+        return None if sequence is None else FramePacket(None, [], sequence, 0.0)
+
+    def process_detections(self, frame, detections, sequence):
+        return []
+
+
+class FakeDisplay:
+    def __init__(self):
+        self.shown = 0
+
+    def create_output_screen(self, eyes, frame):
+        return object()
+
+    def show_output_screen(self, output_screen):
+        self.shown += 1
+
+    def release_output_screen(self, output_screen):
+        pass
+
+    def check_keyboard_interaction(self, frame):
+        pass
+
+    def check_exit_condition(self):
+        return False
+
+
+def test_runner_ends_once_every_replay_has_run_out():
+    replays = [FakeReplay(3), FakeReplay(5)]
+    sources = [InputSource(f"replay{index}", FakeDetector(), replay, replay, replay) for index, replay in enumerate(replays)]
+    runner = MultiSourceRunner(sources, FakeDisplay())
+    thread = threading.Thread(target=runner.run, daemon=True)
+    thread.start()
+    thread.join(timeout=5.0)
+    assert not thread.is_alive()
+    assert [worker.frames for worker in runner.workers] == [3, 5]
@@ -0,0 +1,92 @@
+import pytest
+from src.pacing import FramePacer, SimulatedClock
+
+FPS = 10
+PERIOD = 1.0 / FPS
+
+
+def make_pacer(clock, **kwargs):
+    options = dict(fps=FPS, mode="CADENCE", max_latency=0.2, max_consecutive_drops=2, max_clock_skew=1.0)
+    options.update(kwargs)
+    return FramePacer(clock=clock, sleep=clock.sleep, **options)
+
+
+def present(pacer, timestamp):
+    shown = pacer.pace(timestamp)
+    if shown:
+        pacer.presented(timestamp)
+    return shown
+
+
+def test_frames_are_presented_on_the_cadence():
+    clock = SimulatedClock(start=100.0)
+    pacer = make_pacer(clock)
+    times = []
+    for frame in range(5):
+        timestamp = clock()
+        clock.advance(0.03)  # Processing finishes early every frame
+        assert present(pacer, timestamp)
+        times.append(clock())
+        clock.advance(max(0.0, timestamp + PERIOD - clock()))  # Idle until the next capture
+    intervals = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert intervals == pytest.approx([PERIOD] * 4, abs=0.01)
+
+
+def test_late_frames_are_dropped_up_to_the_cap():
+    clock = SimulatedClock(start=100.0)
+    pacer = make_pacer(clock)
+    assert present(pacer, clock())
+
+    results = []
+    for _ in range(4):
+        clock.advance(PERIOD)
+        results.append(present(pacer, clock() - 0.5))  # Captured 0.5 s ago, over max_latency
+    # Two drops in a row, then one shown late so the screen does not freeze, then dropping again
+    assert results == [False, False, True, False]
+    assert pacer.dropped_late == 3 and pacer.shown_late == 1
+
+
+def test_measure_mode_never_delays_or_drops():
+    clock = SimulatedClock(start=100.0)
+    pacer = make_pacer(clock, mode="MEASURE")
+    for _ in range(3):
+        start = clock()
+        assert present(pacer, clock() - 0.5)
+        assert clock() == start
+        clock.advance(PERIOD)
+    assert pacer.get_stats()["latency_p50_ms"] == pytest.approx(500.0)
+    assert pacer.dropped_late == 0
+
+
+def test_cadence_restarts_after_a_gap():
+    clock = SimulatedClock(start=100.0)
+    pacer = make_pacer(clock)
+    assert present(pacer, clock())
+    clock.advance(PERIOD)
+    assert present(pacer, clock())
+
+    clock.advance(5.0)  # Camera stalled
+    start = clock()
+    assert present(pacer, clock())
+    assert clock() == start  # Shown at once, not held for an old slot
+    assert pacer.last_slot == 0
+
+
+def test_timestamps_off_the_host_clock_are_rebased():
+    clock = SimulatedClock(start=1000.0)
+    pacer = make_pacer(clock)
+    # Replayed timestamps start near zero: latency is measured from the first frame instead
+    assert present(pacer, 0.0)
+    assert pacer.clock_offset == pytest.approx(1000.0)
+    clock.advance(PERIOD)
+    assert present(pacer, PERIOD - 0.02)
+    assert pacer.last_latency == pytest.approx(0.02, abs=1e-6)
+    assert pacer.dropped_late == 0
+
+
+def test_small_skew_is_treated_as_the_host_clock():
+    clock = SimulatedClock(start=1000.0)
+    pacer = make_pacer(clock)
+    assert present(pacer, clock() - 0.05)
+    assert pacer.clock_offset == 0.0
+    assert pacer.last_latency == pytest.approx(0.05)
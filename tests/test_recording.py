@@ -0,0 +1,64 @@
+import threading
+import types
+import numpy as np
+from src.recording import RecordedSession, SessionRecorder
+
+FRAME_SHAPE = (24, 32, 3)
+
+
+def detection(xmin):
+    return types.SimpleNamespace(label=1, confidence=0.9, xmin=xmin, ymin=0.1, xmax=xmin + 0.2, ymax=0.5)
+
+
+def frame(value):
+    return np.full(FRAME_SHAPE, value, dtype=np.uint8)
+
+
+def test_recorded_frames_and_detections_replay_in_order(tmp_path):
+    recorder = SessionRecorder(str(tmp_path), encoding="RAW", chunk_frames=2)
+    for index in range(5):
+        assert recorder.record(frame(index), None if index == 3 else [detection(index / 10)], 100 + index, index / 10)
+    recorder.close()
+
+    session = RecordedSession(str(tmp_path))
+    assert len(session) == 5
+    assert [int(session.frame(index)[0, 0, 0]) for index in range(5)] == [0, 1, 2, 3, 4]
+    assert session.record_info(2) == (102, 0.2)
+    assert session.detections(3) is None
+    assert session.detections(4)[0].xmin == np.float32(0.4)
+
+
+def test_full_queue_drops_frames_and_keeps_events_aligned(tmp_path, monkeypatch):
+    writing = threading.Event()
+    resume = threading.Event()
+    write = SessionRecorder._write
+
+    def slow_write(recorder, *item):
+        writing.set()
+        resume.wait(5.0)
+        write(recorder, *item)
+
+    monkeypatch.setattr(SessionRecorder, "_write", slow_write)
+    recorder = SessionRecorder(str(tmp_path), encoding="RAW", queue_size=1)
+    assert recorder.record(frame(0), [], 0, 0.0)
+    writing.wait(5.0)  # The writer is busy with frame 0
+    assert recorder.record(frame(1), [], 1, 0.1)  # Waits in the queue
+    assert not recorder.record(frame(2), [], 2, 0.2)
+    recorder.record_event(ord("w"))  # Happens before the next kept frame
+    assert recorder.record(frame(3), [], 3, 0.3) is False  # Still full
+    resume.set()
+    recorder.close()
+
+    session = RecordedSession(str(tmp_path))
+    assert [session.record_info(index)[0] for index in range(len(session))] == [0, 1]
+    assert recorder.dropped == 2
+    assert session.events[0]["frame_index"] == 2
+
+
+def test_recording_again_replaces_the_earlier_events(tmp_path):
+    for key in ("w", "x"):
+        recorder = SessionRecorder(str(tmp_path), encoding="RAW")
+        recorder.record(frame(0), [], 0, 0.0)
+        recorder.record_event(ord(key))
+        recorder.close()
+    assert [event["key"] for event in RecordedSession(str(tmp_path)).events] == [ord("x")]
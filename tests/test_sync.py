@@ -0,0 +1,80 @@
+from datetime import timedelta
+from src.sync import FrameSynchronizer
+
+
+class Message:
+    def __init__(self, sequence, timestamp, detections=None):
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.detections = detections
+
+    def getSequenceNum(self):
+        return self.sequence
+
+    def getTimestamp(self):
+        return timedelta(seconds=self.timestamp)
+
+
+class FakeQueue:
+    def __init__(self, messages=()):
+        self.messages = list(messages)
+
+    def tryGet(self):
+        return self.messages.pop(0) if self.messages else None
+
+
+def test_pairs_by_sequence_number():
+    synchronizer = FrameSynchronizer(match_by="SEQUENCE", max_staleness=1.0)
+    frames = FakeQueue([Message(1, 0.00), Message(2, 0.07)])
+    detections = FakeQueue([Message(1, 0.00, ["a"])])
+
+    frame, detection = synchronizer.poll(frames, detections)
+    assert frame.sequence == 1 and detection.detections == ["a"]
+    assert synchronizer.poll(frames, detections) is None  # Frame 2 waits for its detections
+
+    detections.messages.append(Message(2, 0.07, ["b"]))
+    frame, detection = synchronizer.poll(frames, detections)
+    assert frame.sequence == 2 and detection.detections == ["b"]
+    assert synchronizer.matched == 2 and synchronizer.dropped == 0
+
+
+def test_pairs_by_timestamp_across_sequence_mismatch():
+    synchronizer = FrameSynchronizer(match_by="TIMESTAMP", max_staleness=1.0)
+    # Sequence numbers differ between the streams, timestamps agree
+    frames = FakeQueue([Message(10, 0.5)])
+    detections = FakeQueue([Message(3, 0.5, ["a"])])
+
+    frame, detection = synchronizer.poll(frames, detections)
+    assert frame.sequence == 10 and detection.sequence == 3
+
+
+def test_newest_matched_frame_drops_older_ones():
+    synchronizer = FrameSynchronizer(match_by="SEQUENCE", max_staleness=1.0)
+    frames = FakeQueue([Message(1, 0.0), Message(2, 0.1), Message(3, 0.2)])
+    detections = FakeQueue([Message(3, 0.2, ["c"])])
+
+    frame, detection = synchronizer.poll(frames, detections)
+    assert frame.sequence == 3
+    assert synchronizer.dropped == 2
+    assert synchronizer.poll(frames, detections) is None
+
+
+def test_stale_frame_is_released_without_detections():
+    synchronizer = FrameSynchronizer(match_by="SEQUENCE", max_staleness=0.1)
+    frames = FakeQueue([Message(1, 0.0)])
+    detections = FakeQueue()
+    assert synchronizer.poll(frames, detections) is None  # Still young enough to wait
+
+    frames.messages.append(Message(2, 0.2))
+    frame, detection = synchronizer.poll(frames, detections)
+    assert frame.sequence == 1 and detection is None
+    assert synchronizer.unmatched == 1
+
+
+def test_frame_passed_by_detections_is_released_without_them():
+    synchronizer = FrameSynchronizer(match_by="SEQUENCE", max_staleness=1.0)
+    frames = FakeQueue([Message(1, 0.0)])
+    detections = FakeQueue([Message(2, 0.07, ["b"])])  # Detections for frame 1 were lost
+
+    frame, detection = synchronizer.poll(frames, detections)
+    assert frame.sequence == 1 and detection is None
@@ -0,0 +1,70 @@
+import json
+from src.telemetry import TelemetrySampler
+
+
+class FakeQueue:
+    def __init__(self, messages=()):
+        self.messages = list(messages)
+
+    def tryGet(self):
+        return self.messages.pop(0) if self.messages else None
+
+
+class FakeMonitor:
+    """Stands in for PerformanceMonitor: drains the queue, keeps the newest reading."""
+
+    def __init__(self):
+        self.last_system_info = None
+
+    def read_system_info(self, system_queue):
+        message = system_queue.tryGet()
+        while message is not None:
+            self.last_system_info = message
+            message = system_queue.tryGet()
+        return self.last_system_info
+
+
+def test_sample_combines_device_readings_counters_timings_and_gauges():
+    system_queue = FakeQueue([{"chip_temperature": 40.0}, {"chip_temperature": 41.5}])
+    telemetry = TelemetrySampler(FakeMonitor(), system_queue, history=4, jsonl_path=None)
+    telemetry.count("frames_presented", 3)
+    for seconds in (0.010, 0.020, 0.030):
+        telemetry.record_timing("stage_detect", seconds)
+    telemetry.add_gauge("queue_depth", lambda: 2)
+
+    values = telemetry.sample()
+    assert values["device_chip_temperature"] == 41.5  # Newest reading only
+    assert values["frames_presented"] == 3
+    assert abs(values["stage_detect_p50_ms"] - 20.0) < 1e-6
+    assert values["queue_depth"] == 2
+    assert system_queue.tryGet() is None
+
+
+def test_idle_device_queue_keeps_the_last_reading():
+    system_queue = FakeQueue([{"chip_temperature": 40.0}])
+    telemetry = TelemetrySampler(FakeMonitor(), system_queue, jsonl_path=None)
+    telemetry.sample()
+    assert telemetry.sample()["device_chip_temperature"] == 40.0
+
+
+def test_broken_gauge_does_not_stop_sampling():
+    telemetry = TelemetrySampler(jsonl_path=None)
+    telemetry.add_gauge("broken", lambda: 1 / 0)
+    telemetry.add_gauge("working", lambda: 7)
+    values = telemetry.sample()
+    assert "broken" not in values and values["working"] == 7
+
+
+def test_series_are_ring_buffered_and_exported(tmp_path):
+    path = tmp_path / "telemetry.jsonl"
+    telemetry = TelemetrySampler(history=3, jsonl_path=str(path))
+    for frame in range(5):
+        telemetry.count("frames_presented")
+        telemetry.sample()
+    telemetry.exporter.close()
+
+    assert [value for _, value in telemetry.series["frames_presented"]] == [3, 4, 5]
+    assert telemetry.snapshot()["frames_presented"] == 5
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["frames_presented"] for record in records] == [1, 2, 3, 4, 5]
+    assert "ins_frames_presented 5" in telemetry.format_text()